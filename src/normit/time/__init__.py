@@ -5,8 +5,9 @@ text.
 
 from .ops import *  # noqa: F401
 from .xml import *  # noqa: F401
+from .binary import *  # noqa: F401
 
-__all__ = ops.__all__ + xml.__all__
+__all__ = ops.__all__ + xml.__all__ + binary.__all__
 
 for _name in __all__:
     _obj = globals()[_name]
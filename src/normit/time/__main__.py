@@ -1,32 +1,58 @@
 import argparse
+import concurrent.futures
 import datetime
+import functools
+import json
 import pathlib
 import sys
 import traceback
-import xml.etree.ElementTree as et
+import typing
 
 from normit.time import *
 
 
-parser = argparse.ArgumentParser()
-subparser = parser.add_subparsers()
-xml_parser = subparser.add_parser("xml")
-xml_parser.add_argument("xml_dir")
-xml_parser.add_argument("--xml-suffix", default=".TimeNorm.gold.completed.xml")
-xml_parser.add_argument("--text-dir")
-xml_parser.add_argument("--dct-dir")
-xml_parser.add_argument("--silent", action="store_true")
-xml_parser.add_argument("--flatten", action="store_true")
-args = parser.parse_args()
+def json_record(xml_path: pathlib.Path,
+                obj: Shift | Interval | Intervals) -> dict:
+    """
+    Describes an object read from an Anafora XML file in JSON-compatible types.
 
-n_errors = 0
+    :param xml_path: The path of the Anafora XML file
+    :param obj: The object
+    :return: The path, span, type, and start and end of the object, where each
+        start and end is in ISO 8601 format, or None if missing.
+        For Intervals, "intervals" holds the start and end of each interval.
+    """
+    def isoformat(point: datetime.datetime | None) -> str | None:
+        return None if point is None else point.isoformat()
 
-# iterate over the selected Anafora XML paths
-xml_paths = list(pathlib.Path(args.xml_dir).glob(f"**/*{args.xml_suffix}"))
-if not xml_paths:
-    message = f"no such paths: {args.xml_dir}/**/*.{args.xml_suffix}\n"
-    parser.exit(message=message)
-for xml_path in xml_paths:
+    span = getattr(obj, "span", None)
+    start = end = intervals = None
+    match obj:
+        case Interval():
+            start = isoformat(obj.start)
+            end = isoformat(obj.end)
+        case Intervals():
+            intervals = [[isoformat(i.start), isoformat(i.end)] for i in obj]
+    return {"path": str(xml_path),
+            "span": None if span is None else list(span),
+            "type": obj.__class__.__name__,
+            "start": start,
+            "end": end,
+            "intervals": intervals}
+
+
+def process_xml(xml_path: pathlib.Path,
+                args: argparse.Namespace) -> tuple[str, str, int]:
+    """
+    Parses a single Anafora XML file.
+
+    :param xml_path: The path of the Anafora XML file
+    :param args: The command-line arguments
+    :return: The text for stdout, the text for stderr, and the number of errors
+    """
+    out_lines = []
+    err_lines = []
+    n_errors = 0
 
     # load the document creation time, if provided
     if args.dct_dir is not None:
@@ -43,13 +69,17 @@ for xml_path in xml_paths:
         doc_time = Interval.of(today.year, today.month, today.day)
 
     # parse the Anafora XML into Intervals, Shifts, etc.
-    elem = et.parse(xml_path).getroot()
+    elem = parse_xml(xml_path, backend=args.xml_backend)
     try:
         for obj in from_xml(elem, known_intervals={(None, None): doc_time}):
             if args.flatten:
                 obj = flatten(obj)
             if not args.silent:
-                print(obj)
+                if args.output_format == "jsonl":
+                    out_lines.append(json.dumps(json_record(xml_path, obj)))
+                    out_lines.append("\n")
+                else:
+                    out_lines.append(f"{obj}\n")
     except AnaforaXMLParsingError as e:
         text_name = xml_path.name.replace(args.xml_suffix, "")
         if args.text_dir:
@@ -62,11 +92,66 @@ for xml_path in xml_paths:
         start, end = e.trigger_span
         pre_text = text[max(0, start - 100):start]
         post_text = text[end:min(len(text), end + 100)]
-        traceback.print_exception(e.__cause__)
-        print(f"\nContext:\n{pre_text}[[{text[start:end]}]]{post_text}"
-              f"\nXML:\n{e}"
-              f"\nFile:\n{xml_path}\n", file=sys.stderr)
+        err_lines.extend(traceback.format_exception(e.__cause__))
+        err_lines.append(f"\nContext:\n{pre_text}[[{text[start:end]}]]"
+                         f"{post_text}"
+                         f"\nXML:\n{e}"
+                         f"\nFile:\n{xml_path}\n\n")
         n_errors += 1
 
-if n_errors:
-    print(f"Errors: {n_errors}", file=sys.stderr)
+    return "".join(out_lines), "".join(err_lines), n_errors
+
+
+def write_results(results: typing.Iterable[tuple[str, str, int]]) -> int:
+    """
+    Writes the output of :func:`process_xml` for each document, as soon as it
+    and those before it finish.
+
+    :param results: The stdout text, stderr text and number of errors of each
+        document, in order
+    :return: The total number of errors
+    """
+    n_errors = 0
+    for out_text, err_text, n_file_errors in results:
+        sys.stdout.write(out_text)
+        sys.stderr.write(err_text)
+        n_errors += n_file_errors
+    return n_errors
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    subparser = parser.add_subparsers()
+    xml_parser = subparser.add_parser("xml")
+    xml_parser.add_argument("xml_dir")
+    xml_parser.add_argument("--xml-suffix",
+                            default=".TimeNorm.gold.completed.xml")
+    xml_parser.add_argument("--text-dir")
+    xml_parser.add_argument("--dct-dir")
+    xml_parser.add_argument("--silent", action="store_true")
+    xml_parser.add_argument("--flatten", action="store_true")
+    xml_parser.add_argument("--jobs", type=int, default=1)
+    xml_parser.add_argument("--output-format", choices=["repr", "jsonl"],
+                            default="repr")
+    xml_parser.add_argument("--xml-backend", choices=["etree", "lxml"],
+                            default="etree")
+    args = parser.parse_args()
+
+    # iterate over the selected Anafora XML paths
+    xml_paths = list(pathlib.Path(args.xml_dir).glob(f"**/*{args.xml_suffix}"))
+    if not xml_paths:
+        message = f"no such paths: {args.xml_dir}/**/*.{args.xml_suffix}\n"
+        parser.exit(message=message)
+    process = functools.partial(process_xml, args=args)
+    if args.jobs > 1:
+        # several chunks per worker balances the load while keeping the
+        # per-task overhead low; map yields results in the order of the paths
+        chunk_size = max(1, len(xml_paths) // (args.jobs * 4))
+        with concurrent.futures.ProcessPoolExecutor(args.jobs) as executor:
+            n_errors = write_results(
+                executor.map(process, xml_paths, chunksize=chunk_size))
+    else:
+        n_errors = write_results(map(process, xml_paths))
+
+    if n_errors:
+        print(f"Errors: {n_errors}", file=sys.stderr)
@@ -0,0 +1,416 @@
+import datetime
+import struct
+import typing
+
+from .ops import *
+from .ops import _ReadOnlyDict
+
+
+__all__ = ['to_binary', 'from_binary']
+
+
+# the start of every serialized object graph, followed by the format version
+_MAGIC = b"NTIM"
+_VERSION = 2
+
+# the serialized fields of repeating Shifts, which share a single layout
+_REPEATING_FIELDS = ("unit", "range", "value", "n_units", "rrule_kwargs",
+                     "span", "trigger_span")
+
+# the classes that may be serialized, each with the fields that are serialized
+# for it, in order; each class is identified by its index, so classes must only
+# ever be appended to this list, and changing any class's fields requires a new
+# format version.
+# Intervals store their start and end, so loading does not re-evaluate them,
+# while Shifts are rebuilt from their init fields.
+_FORMAT = [
+    (Interval, ("start", "end", "span", "trigger_span")),
+    (Period, ("unit", "n", "span", "trigger_span")),
+    (PeriodSum, ("periods", "span", "trigger_span")),
+    (Repeating, _REPEATING_FIELDS),
+    (Spring, _REPEATING_FIELDS),
+    (Summer, _REPEATING_FIELDS),
+    (Fall, _REPEATING_FIELDS),
+    (Winter, _REPEATING_FIELDS),
+    (Weekend, _REPEATING_FIELDS),
+    (Morning, _REPEATING_FIELDS),
+    (Noon, _REPEATING_FIELDS),
+    (Afternoon, _REPEATING_FIELDS),
+    (Day, _REPEATING_FIELDS),
+    (Evening, _REPEATING_FIELDS),
+    (Night, _REPEATING_FIELDS),
+    (Midnight, _REPEATING_FIELDS),
+    (EveryNth, ("shift", "n", "span", "trigger_span")),
+    (ShiftUnion, ("shifts", "span", "trigger_span")),
+    (RepeatingIntersection, ("shifts", "span", "trigger_span")),
+    (Year, ("start", "end", "digits", "n_missing_digits", "span",
+            "trigger_span")),
+    (YearSuffix, ("start", "end", "interval", "digits", "n_missing_digits",
+                  "span", "trigger_span")),
+    (Last, ("start", "end", "interval", "shift", "interval_included", "span",
+            "trigger_span")),
+    (Next, ("start", "end", "interval", "shift", "interval_included", "span",
+            "trigger_span")),
+    (Before, ("start", "end", "interval", "shift", "n", "interval_included",
+              "span", "trigger_span")),
+    (After, ("start", "end", "interval", "shift", "n", "interval_included",
+             "span", "trigger_span")),
+    (Nth, ("start", "end", "interval", "shift", "index", "from_end", "span",
+           "trigger_span")),
+    (This, ("start", "end", "interval", "shift", "span", "trigger_span")),
+    (Between, ("start", "end", "start_interval", "end_interval",
+               "start_included", "end_included", "span", "trigger_span")),
+    (Intersection, ("start", "end", "intervals", "span", "trigger_span")),
+    (LastN, ("interval", "shift", "n", "interval_included", "base_class",
+             "span", "trigger_span")),
+    (NextN, ("interval", "shift", "n", "interval_included", "base_class",
+             "span", "trigger_span")),
+    (NthN, ("interval", "shift", "index", "n", "from_end", "span",
+            "trigger_span")),
+    (These, ("interval", "shift", "span", "trigger_span")),
+    (IntervalArray, ("bytes",)),
+]
+_CLASSES = [cls for cls, _ in _FORMAT]
+_CLASS_FIELDS = [fields for _, fields in _FORMAT]
+_CLASS_TAGS = {cls: tag for tag, cls in enumerate(_CLASSES)}
+_UNITS = list(Unit)
+_UNIT_TAGS = {unit: tag for tag, unit in enumerate(_UNITS)}
+
+
+# the tags that start each serialized value; these are plain ints rather than
+# an IntEnum, since comparing against enum members dominates the time to load
+_NONE = 0
+_FALSE = 1
+_TRUE = 2
+_INT = 3
+_FLOAT = 4
+_STR = 5
+_DATETIME = 6
+_UNIT = 7
+_TUPLE = 8
+_LIST = 9
+_DICT = 10
+_NODE = 11
+_CLASS = 12
+_BYTES = 13
+_SPAN = 14
+
+
+_INT64 = struct.Struct("<q")
+# spans, the most common tuples, are a pair of offsets, read with a single call
+_SPAN_OFFSETS = struct.Struct("<II")
+_MAX_OFFSET = 0xFFFFFFFF
+_FLOAT64 = struct.Struct("<d")
+_MIN_DATETIME = datetime.datetime.min
+_MICROSECOND = datetime.timedelta(microseconds=1)
+
+
+def to_binary(objects: typing.Iterable[Shift | Interval | Intervals]) -> bytes:
+    """
+    Serializes Intervals, Shifts and Intervals collections, e.g., those read
+    by :func:`from_xml`, to a compact, versioned binary format.
+    Objects that are shared between several objects (e.g., a document creation
+    time) are serialized once, and are shared again by :func:`from_binary`.
+
+    :param objects: The objects to serialize
+    :return: The serialized objects
+    """
+    node_ids = {}
+    nodes = bytearray()
+
+    def write_uint(out: bytearray, n: int):
+        while n >= 0x80:
+            out.append(n & 0x7F | 0x80)
+            n >>= 7
+        out.append(n)
+
+    def write_value(out: bytearray, value: typing.Any):
+        match value:
+            case None:
+                out.append(_NONE)
+            case bool():
+                out.append(_TRUE if value else _FALSE)
+            case int():
+                out.append(_INT)
+                # zigzag encoding, so small negative numbers are short
+                write_uint(out, value << 1 if value >= 0 else ~value << 1 | 1)
+            case float():
+                out.append(_FLOAT)
+                out += _FLOAT64.pack(value)
+            case str():
+                data = value.encode("utf-8")
+                out.append(_STR)
+                write_uint(out, len(data))
+                out += data
+            case datetime.datetime() if value.tzinfo is None:
+                out.append(_DATETIME)
+                out += _INT64.pack((value - datetime.datetime.min) //
+                                   _MICROSECOND)
+            case Unit():
+                out.append(_UNIT)
+                out.append(_UNIT_TAGS[value])
+            case (int() as start, int() as end) if \
+                    type(start) is type(end) is int and \
+                    0 <= start <= _MAX_OFFSET and 0 <= end <= _MAX_OFFSET:
+                out.append(_SPAN)
+                out += _SPAN_OFFSETS.pack(start, end)
+            case tuple() | list():
+                out.append(_TUPLE if isinstance(value, tuple) else _LIST)
+                write_uint(out, len(value))
+                for item in value:
+                    write_value(out, item)
+            case dict():
+                out.append(_DICT)
+                write_uint(out, len(value))
+                for key, item in value.items():
+                    write_value(out, key)
+                    write_value(out, item)
+            case type() if value in _CLASS_TAGS:
+                out.append(_CLASS)
+                out.append(_CLASS_TAGS[value])
+            case bytes():
+                out.append(_BYTES)
+                write_uint(out, len(value))
+                out += value
+            case _ if value.__class__ in _CLASS_TAGS:
+                out.append(_NODE)
+                write_uint(out, write_node(value))
+            case other:
+                raise NotImplementedError(other)
+
+    def write_node(obj: Shift | Interval | Intervals) -> int:
+        node_id = node_ids.get(id(obj))
+        if node_id is None:
+            tag = _CLASS_TAGS[obj.__class__]
+            if obj.__class__ is IntervalArray:
+                values = [obj.to_bytes()]
+            else:
+                values = [getattr(obj, name) for name in _CLASS_FIELDS[tag]]
+            # the shared rrule arguments of repeating intervals are derived
+            # from their unit, range and value, so they are written as empty,
+            # and loading shares them again rather than re-deriving a copy
+            if isinstance(obj, Repeating) and \
+                    isinstance(obj.rrule_kwargs, _ReadOnlyDict):
+                values[_REPEATING_FIELDS.index("rrule_kwargs")] = {}
+            # writing the values writes any child nodes first, so that nodes
+            # only ever refer to earlier nodes
+            node = bytearray([tag])
+            for value in values:
+                write_value(node, value)
+            nodes.extend(node)
+            node_id = node_ids[id(obj)] = len(node_ids)
+        return node_id
+
+    roots = bytearray()
+    n_roots = 0
+    for obj in objects:
+        write_value(roots, obj)
+        n_roots += 1
+    out = bytearray(_MAGIC)
+    out.append(_VERSION)
+    write_uint(out, len(node_ids))
+    out += nodes
+    write_uint(out, n_roots)
+    out += roots
+    return bytes(out)
+
+
+def from_binary(data: typing.Any) -> list[Shift | Interval | Intervals]:
+    """
+    Deserializes objects serialized by :func:`to_binary`.
+
+    The data is only read, never copied as a whole or executed, so it may be,
+    e.g., a :class:`mmap.mmap` over a large file, and it is safe to deserialize
+    data from untrusted sources: truncated or malformed data raises a
+    ValueError.
+
+    :param data: A bytes-like object containing the serialized objects
+    :return: The deserialized objects
+    """
+    # release the view on return, so that, e.g., an mmap can be closed
+    with memoryview(data) as view:
+        if bytes(view[:len(_MAGIC)]) != _MAGIC:
+            raise ValueError("not a serialized normit.time object graph")
+        try:
+            return _read_graph(view)
+        except (IndexError, KeyError, TypeError, OverflowError, struct.error,
+                UnicodeDecodeError, RecursionError) as e:
+            raise ValueError(
+                f"malformed serialized normit.time object graph: {e!r}") from e
+
+
+def _read_values(view: memoryview, pos: int, count: int,
+                 nodes: list) -> tuple[list, int]:
+    """
+    Reads serialized values.
+
+    This is the inner loop of :func:`from_binary`, so it reads the values
+    with a single chain of comparisons against the tags, ordered from the most
+    common, and only calls itself for the items of containers.
+
+    :param view: The serialized object graph
+    :param pos: The position of the first value
+    :param count: The number of values to read
+    :param nodes: The nodes read so far, which values may refer to
+    :return: The values, and the position after the last value
+    """
+    # every value takes at least one byte, so no valid count is larger than
+    # the rest of the data; checking this avoids huge allocations
+    if count > len(view) - pos:
+        raise ValueError(f"size {count} at {pos} exceeds the data")
+    values = []
+    append = values.append
+    for _ in range(count):
+        tag = view[pos]
+        pos += 1
+        if tag == _NONE:
+            append(None)
+        elif tag == _SPAN:
+            append(_SPAN_OFFSETS.unpack_from(view, pos))
+            pos += 8
+        elif tag == _DATETIME:
+            [microseconds] = _INT64.unpack_from(view, pos)
+            pos += 8
+            value = _datetimes.get(microseconds)
+            if value is None:
+                if len(_datetimes) >= _DATETIMES_MAXSIZE:
+                    _datetimes.clear()
+                value = _datetimes[microseconds] = \
+                    _MIN_DATETIME + microseconds * _MICROSECOND
+            append(value)
+        elif tag == _NODE:
+            n = view[pos]
+            pos += 1
+            if n & 0x80:
+                n, pos = _read_uint(view, pos, n)
+            if n >= len(nodes):
+                raise ValueError(f"unknown node {n} at {pos}")
+            append(nodes[n])
+        elif tag == _INT:
+            n = view[pos]
+            pos += 1
+            if n & 0x80:
+                n, pos = _read_uint(view, pos, n)
+            append(~(n >> 1) if n & 1 else n >> 1)
+        elif tag == _UNIT:
+            append(_UNITS[view[pos]])
+            pos += 1
+        elif tag == _FALSE or tag == _TRUE:
+            append(tag == _TRUE)
+        elif tag == _DICT:
+            size, pos = _read_uint(view, pos)
+            if size:
+                items, pos = _read_values(view, pos, 2 * size, nodes)
+                append(dict(zip(items[::2], items[1::2])))
+            else:
+                # e.g., the rrule arguments of most repeating intervals
+                append({})
+        elif tag == _TUPLE or tag == _LIST:
+            size, pos = _read_uint(view, pos)
+            items, pos = _read_values(view, pos, size, nodes)
+            append(tuple(items) if tag == _TUPLE else items)
+        elif tag == _FLOAT:
+            [value] = _FLOAT64.unpack_from(view, pos)
+            pos += 8
+            append(value)
+        elif tag == _STR or tag == _BYTES:
+            size, pos = _read_uint(view, pos)
+            if size > len(view) - pos:
+                raise ValueError(f"size {size} at {pos} exceeds the data")
+            data = bytes(view[pos:pos + size])
+            pos += size
+            append(data.decode("utf-8") if tag == _STR else data)
+        elif tag == _CLASS:
+            append(_CLASSES[view[pos]])
+            pos += 1
+        else:
+            raise ValueError(f"unknown value tag {tag} at {pos - 1}")
+    return values, pos
+
+
+# the datetimes read by _read_values, keyed by their microseconds since
+# datetime.min; datetimes are immutable, so loads may share them, and the
+# same few datetimes (e.g., document creation times) recur across a corpus
+_datetimes = {}
+_DATETIMES_MAXSIZE = 4096
+
+
+def _read_uint(view: memoryview, pos: int, byte: int = None) -> tuple[int, int]:
+    # reads a variable-length unsigned int, starting from its first byte if
+    # that has already been read
+    if byte is None:
+        byte = view[pos]
+        pos += 1
+    n = byte & 0x7F
+    shift = 7
+    while byte & 0x80:
+        byte = view[pos]
+        pos += 1
+        n |= (byte & 0x7F) << shift
+        shift += 7
+    return n, pos
+
+
+def _compile_restorer(cls: type, names: tuple[str, ...]) -> \
+        typing.Callable[[list], typing.Any]:
+    """
+    Compiles a function that constructs an object of a serializable class from
+    the values of its serialized fields.
+
+    Shifts are constructed from their init fields, so that any derived fields
+    are initialized, while Intervals and Intervals collections have their
+    fields restored directly, so that they are not evaluated again.
+    As for the methods that :mod:`dataclasses` generates, the function is
+    compiled, since a single assignment to all of the fields takes a fraction
+    of the time of one setattr per field; the compiled code is built only from
+    the field names pinned in _FORMAT, never from serialized data.
+
+    :param cls: The class to construct
+    :param names: The names of the serialized fields of the class
+    :return: A function from the list of field values to the object
+    """
+    if cls is IntervalArray:
+        return lambda values: IntervalArray.from_bytes(*values)
+    if issubclass(cls, Shift):
+        body = [f"{', '.join(names)}, = values",
+                f"return cls({', '.join(f'{n}={n}' for n in names)})"]
+    else:
+        body = ["obj = new(cls)",
+                f"{', '.join(f'obj.{n}' for n in names)}, = values",
+                "return obj"]
+    namespace = {}
+    exec("\n    ".join(["def restore(values):"] + body),
+         {"cls": cls, "new": object.__new__}, namespace)
+    return namespace["restore"]
+
+
+# the functions that construct each class, indexed by the tag of the class
+_RESTORERS = [_compile_restorer(cls, names) for cls, names in _FORMAT]
+
+
+def _read_graph(view: memoryview) -> list[Shift | Interval | Intervals]:
+    version = view[len(_MAGIC)]
+    if version != _VERSION:
+        raise ValueError(f"unsupported version {version}, expected "
+                         f"{_VERSION}")
+    n_nodes, pos = _read_uint(view, len(_MAGIC) + 1)
+    if n_nodes > len(view) - pos:
+        raise ValueError(f"size {n_nodes} at {pos} exceeds the data")
+    nodes = []
+    for _ in range(n_nodes):
+        tag = view[pos]
+        pos += 1
+        if tag >= len(_CLASSES):
+            raise ValueError(f"unknown class tag {tag} at {pos - 1}")
+        values, pos = _read_values(view, pos, len(_CLASS_FIELDS[tag]), nodes)
+        try:
+            obj = _RESTORERS[tag](values)
+        except Exception as e:
+            # the values may be of any type, so initialization may fail in any
+            # way
+            raise ValueError(f"invalid {_CLASSES[tag].__name__} fields before "
+                             f"{pos}: {e!r}") from e
+        nodes.append(obj)
+    n_roots, pos = _read_uint(view, pos)
+    roots, _ = _read_values(view, pos, n_roots, nodes)
+    return roots
@@ -1,11 +1,19 @@
 import abc
+import calendar
 import collections
+import contextlib
+import contextvars
 import dataclasses
 import datetime
+import functools
+import itertools
+import operator
+import threading
 
 import dateutil.relativedelta
 import dateutil.rrule
 import enum
+import numpy
 import typing
 
 # noinspection PyUnresolvedReferences
@@ -55,16 +63,26 @@ __all__ = [  # noqa: F822
     'Between',
     'Intersection',
     'Intervals',
+    'IntervalArray',
     'LastN',
     'NextN',
     'NthN',
     'These',
+    'Plan',
+    'compile_plan',
     'flatten',
+    'evaluation_cache',
+    'lazy_evaluation',
+    'rrule_cache_info',
+    'rrule_cache_clear',
 ]
 
 
 def _dataclass(cls):
-    cls = dataclasses.dataclass(repr=False)(cls)
+    # slots avoid a per-instance __dict__, which dominates the memory of the
+    # many small objects in a tree of operators; note that zero-argument
+    # super() does not work in the methods of the resulting classes
+    cls = dataclasses.dataclass(repr=False, slots=True)(cls)
 
     def __repr__(self):
         fields = [f for f in dataclasses.fields(self)
@@ -80,7 +98,7 @@ def _dataclass(cls):
     return cls
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Interval:
     """
     An interval on the timeline, defined by a starting point (inclusive) and an
@@ -96,6 +114,14 @@ class Interval:
     """
     start: datetime.datetime | None
     end: datetime.datetime | None
+    # the character offsets of the annotation that the interval was read from,
+    # and of the annotation's own trigger (see from_xml); these are keyword-only
+    # so that subclasses may add required fields, and subclasses redefine span
+    # to include it in comparisons
+    span: (int, int) = dataclasses.field(
+        default=None, repr=False, compare=False, kw_only=True)
+    trigger_span: (int, int) = dataclasses.field(
+        default=None, repr=False, compare=False, kw_only=True)
 
     @classmethod
     def fromisoformat(cls, string: str):
@@ -165,24 +191,53 @@ class Interval:
         end_str = "..." if self.end is None else self.end.isoformat()
         return f"{start_str} {end_str}"
 
+    def granularity(self) -> "Unit | None":
+        """
+        Finds the calendar unit that this interval is exactly one of.
+        For example, the granularity of :code:`Interval.of(1990)` is YEAR,
+        and the granularity of :code:`Interval.of(1990, 6, 1, 13)` is HOUR.
+
+        Only years, months, days, hours, minutes and seconds are considered.
+
+        :return: The unit, or None if the interval does not start at the
+            beginning of one of those units and end one unit later.
+        """
+        start = self.start
+        end = self.end
+        if start is None or end is None or start.microsecond:
+            return None
+        delta = end - start
+        # check the alignment of the start only as far as is needed
+        if delta < _ONE_DAY:
+            if delta == _ONE_SECOND:
+                return Unit.SECOND
+            elif start.second:
+                return None
+            elif delta == _ONE_MINUTE:
+                return Unit.MINUTE
+            elif start.minute:
+                return None
+            elif delta == _ONE_HOUR:
+                return Unit.HOUR
+            return None
+        elif start.hour or start.minute or start.second:
+            return None
+        elif delta == _ONE_DAY:
+            return Unit.DAY
+        elif start.day != 1 or end.day != 1 or delta.seconds or \
+                delta.microseconds:
+            return None
+        months = (end.year - start.year) * 12 + end.month - start.month
+        if months == 1:
+            return Unit.MONTH
+        elif months == 12 and start.month == 1:
+            return Unit.YEAR
+        return None
+
     def __repr__(self):
-        delta = dateutil.relativedelta.relativedelta(self.end, self.start)
-        if delta == dateutil.relativedelta.relativedelta(years=+1):
-            tuple_index = 1
-        elif delta == dateutil.relativedelta.relativedelta(months=+1):
-            tuple_index = 2
-        elif delta == dateutil.relativedelta.relativedelta(days=+1):
-            tuple_index = 3
-        elif delta == dateutil.relativedelta.relativedelta(hours=+1):
-            tuple_index = 4
-        elif delta == dateutil.relativedelta.relativedelta(minutes=+1):
-            tuple_index = 5
-        elif delta == dateutil.relativedelta.relativedelta(seconds=+1):
-            tuple_index = 6
-        else:
-            tuple_index = None
-        if tuple_index is not None:
-            tup = self.start.timetuple()[:tuple_index]
+        unit = self.granularity()
+        if unit is not None:
+            tup = self.start.timetuple()[:_INTERVAL_OF_N_ARGS[unit]]
             return f"Interval.of({', '.join(map(repr, tup))})"
         elif self.start is not None and self.end is not None:
             start = self.start.isoformat()
@@ -246,45 +301,54 @@ class Unit(enum.Enum):
         :param dt: The datetime to truncate
         :return: The truncated datetime
         """
+        return self._truncate(dt)
+
+    def truncate_many(self, points: typing.Any) -> numpy.ndarray:
+        """
+        Sets all units smaller than this one to zero in each of an array of
+        time points, like :meth:`truncate`.
+
+        :param points: An array-like of time points, e.g., a numpy datetime64
+            array
+        :return: The datetime64[us] array of truncated time points
+        """
+        points = numpy.asarray(points, dtype="datetime64[us]")
         match self:
+            case Unit.MICROSECOND:
+                return points.copy()
             case Unit.MILLISECOND:
-                dt = dt.replace(microsecond=dt.microsecond // 1000 * 1000)
-            case Unit.SECOND:
-                dt = dt.replace(microsecond=0)
-            case Unit.MINUTE:
-                dt = dt.replace(second=0, microsecond=0)
-            case Unit.HOUR:
-                dt = dt.replace(minute=0, second=0, microsecond=0)
-            case Unit.DAY:
-                dt = dt.replace(hour=0, minute=0, second=0, microsecond=0)
+                return points.astype("datetime64[ms]").astype("datetime64[us]")
+            case Unit.SECOND | Unit.MINUTE | Unit.HOUR | Unit.DAY:
+                code = _NUMPY_FIXED_UNITS[self]
+                return points.astype(f"datetime64[{code}]").astype(
+                    "datetime64[us]")
             case Unit.WEEK:
-                timetuple = dt.timetuple()
-                diff = timetuple.tm_yday - timetuple.tm_wday
-                ordinal = diff if diff >= 1 else diff + 7
-                start = datetime.date.fromordinal(ordinal)
-                dt = datetime.datetime(dt.year, start.month, start.day)
-                if diff < 1:
-                    dt = dt + dateutil.relativedelta.relativedelta(days=-7)
-            case Unit.MONTH:
-                dt = datetime.datetime(dt.year, dt.month, 1)
-            case Unit.QUARTER_YEAR:
-                dt = datetime.datetime(dt.year, (dt.month - 1) // 3 * 3 + 1, 1)
+                days = points.astype("datetime64[D]")
+                # 1 Jan 1970 was a Thursday, i.e., weekday 3
+                days -= (days.astype(numpy.int64) + 3) % 7
+                return days.astype("datetime64[us]")
+            case Unit.MONTH | Unit.QUARTER_YEAR:
+                months = points.astype("datetime64[M]")
+                months -= months.astype(numpy.int64) % _UNIT_MONTHS[self]
+                return months.astype("datetime64[us]")
             case Unit.YEAR:
-                dt = datetime.datetime(dt.year, 1, 1)
-            case Unit.DECADE:
-                dt = datetime.datetime(dt.year // 10 * 10, 1, 1)
-            case Unit.QUARTER_CENTURY:
-                dt = datetime.datetime(dt.year // 25 * 25, 1, 1)
-            case Unit.CENTURY:
-                year = dt.year // 100 * 100
-                year = 1 if year == 0 else year  # year 0 does not exist
-                dt = datetime.datetime(year, 1, 1)
-        return dt
-
+                return points.astype("datetime64[Y]").astype("datetime64[us]")
+            case Unit.DECADE | Unit.QUARTER_CENTURY | Unit.CENTURY:
+                n_years = _UNIT_MONTHS[self] // 12
+                years = points.astype("datetime64[Y]").astype(numpy.int64)
+                years = (years + 1970) // n_years * n_years
+                if self is Unit.CENTURY:
+                    years[years == 0] = 1  # year 0 does not exist
+                return (years - 1970).astype("datetime64[Y]").astype(
+                    "datetime64[us]")
+
+    @functools.lru_cache(maxsize=4096)
     def relativedelta(self, n) -> dateutil.relativedelta.relativedelta:
         """
         Constructs a :class:`dateutil.relativedelta.relativedelta` object
         representing of a number of repetitions of this unit.
+        The objects are cached and shared, so they must not be modified.
+
         :param n: The number of repetitions
         :return: The constructed relativedelta
         """
@@ -302,6 +366,25 @@ class Unit(enum.Enum):
             raise NotImplementedError
         return dateutil.relativedelta.relativedelta(**kwargs)
 
+    @functools.lru_cache(maxsize=4096)
+    def delta(self, n) -> datetime.timedelta | \
+            dateutil.relativedelta.relativedelta:
+        """
+        Constructs the fastest object for adding a number of repetitions of
+        this unit to a datetime.
+        For units with a fixed width (MICROSECOND through WEEK), this is a
+        :class:`datetime.timedelta`, which is much faster in arithmetic than a
+        :class:`dateutil.relativedelta.relativedelta`.
+        For other units, this is the same as :meth:`relativedelta`.
+
+        :param n: The number of repetitions
+        :return: The timedelta or relativedelta
+        """
+        if self._n <= Unit.WEEK._n and self._relativedelta_name is not None:
+            # timedelta argument names are the same as relativedelta ones
+            return datetime.timedelta(**{self._relativedelta_name: n})
+        return self.relativedelta(n)
+
     def expand(self, interval: Interval, n: int = 1) -> Interval:
         """
         Expands an interval to the width of a number of repetitions of this
@@ -311,7 +394,7 @@ class Unit(enum.Enum):
         :param n: The number of repetitions
         :return: The expanded interval
         """
-        if interval.start + self.relativedelta(n) > interval.end:
+        if interval.start + self.delta(n) > interval.end:
             mid = interval.start + (interval.end - interval.start) / 2
             if n % 2 == 0 or self in {Unit.MILLISECOND,
                                       Unit.MICROSECOND,
@@ -320,16 +403,16 @@ class Unit(enum.Enum):
                                       Unit.HOUR,
                                       Unit.DAY,
                                       Unit.WEEK}:
-                half = self.relativedelta(n / 2)
+                half = self.delta(n / 2)
             elif self is Unit.MONTH:
-                half = Unit.DAY.relativedelta(30 / 2)
+                half = Unit.DAY.delta(30 / 2)
             elif self is Unit.YEAR:
-                half = Unit.DAY.relativedelta(365 / 2)
+                half = Unit.DAY.delta(365 / 2)
             else:
                 raise NotImplementedError(f"don't know how to take {n}/2 "
                                           f"of {self}")
             start = mid - half
-            interval = Interval(start, start + self.relativedelta(n))
+            interval = Interval(start, start + self.delta(n))
         return interval
 
 
@@ -337,20 +420,402 @@ class Unit(enum.Enum):
 globals().update(Unit.__members__)
 
 
+# truncation functions for each unit, built with positional constructor calls,
+# which are much faster than keyword replace calls
+_UNIT_TRUNCATORS = {
+    Unit.MICROSECOND: lambda dt: dt,
+    Unit.MILLISECOND: lambda dt: datetime.datetime(
+        dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second,
+        dt.microsecond // 1000 * 1000, dt.tzinfo),
+    Unit.SECOND: lambda dt: datetime.datetime(
+        dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second, 0,
+        dt.tzinfo),
+    Unit.MINUTE: lambda dt: datetime.datetime(
+        dt.year, dt.month, dt.day, dt.hour, dt.minute, 0, 0, dt.tzinfo),
+    Unit.HOUR: lambda dt: datetime.datetime(
+        dt.year, dt.month, dt.day, dt.hour, 0, 0, 0, dt.tzinfo),
+    Unit.DAY: lambda dt: datetime.datetime(
+        dt.year, dt.month, dt.day, 0, 0, 0, 0, dt.tzinfo),
+    # the Monday on or before the day
+    Unit.WEEK: lambda dt: datetime.datetime.fromordinal(
+        dt.toordinal() - dt.weekday()),
+    Unit.MONTH: lambda dt: datetime.datetime(dt.year, dt.month, 1),
+    Unit.QUARTER_YEAR: lambda dt: datetime.datetime(
+        dt.year, (dt.month - 1) // 3 * 3 + 1, 1),
+    Unit.YEAR: lambda dt: datetime.datetime(dt.year, 1, 1),
+    Unit.DECADE: lambda dt: datetime.datetime(dt.year // 10 * 10, 1, 1),
+    Unit.QUARTER_CENTURY: lambda dt: datetime.datetime(
+        dt.year // 25 * 25, 1, 1),
+    # year 0 does not exist
+    Unit.CENTURY: lambda dt: datetime.datetime(
+        max(dt.year // 100 * 100, 1), 1, 1),
+}
+for _unit, _truncator in _UNIT_TRUNCATORS.items():
+    _unit._truncate = _truncator
+
+
+# the numpy datetime64 codes for units that have a fixed width
+_NUMPY_FIXED_UNITS = {
+    Unit.MICROSECOND: "us",
+    Unit.SECOND: "s",
+    Unit.MINUTE: "m",
+    Unit.HOUR: "h",
+    Unit.DAY: "D",
+    Unit.WEEK: "W",
+}
+
+# the number of months in units that are multiples of months
+_UNIT_MONTHS = {
+    Unit.MONTH: 1,
+    Unit.QUARTER_YEAR: 3,
+    Unit.YEAR: 12,
+    Unit.DECADE: 10 * 12,
+    Unit.QUARTER_CENTURY: 25 * 12,
+    Unit.CENTURY: 100 * 12,
+}
+
+_NAT = numpy.datetime64("NaT", "us")
+
+# the durations of the fixed-width units that Interval.granularity finds
+_ONE_SECOND = datetime.timedelta(seconds=1)
+_ONE_MINUTE = datetime.timedelta(minutes=1)
+_ONE_HOUR = datetime.timedelta(hours=1)
+_ONE_DAY = datetime.timedelta(days=1)
+
+# the number of Interval.of arguments for each unit Interval.granularity finds
+_INTERVAL_OF_N_ARGS = {
+    Unit.YEAR: 1,
+    Unit.MONTH: 2,
+    Unit.DAY: 3,
+    Unit.HOUR: 4,
+    Unit.MINUTE: 5,
+    Unit.SECOND: 6,
+}
+
+
+def _add_many(unit: Unit, points: numpy.ndarray, n: int) -> numpy.ndarray:
+    """
+    Adds a number of repetitions of a unit to each of an array of time points,
+    with the same semantics as adding :meth:`Unit.relativedelta`.
+
+    :param unit: The unit to add
+    :param points: The datetime64[us] array of time points
+    :param n: The number of repetitions of the unit
+    :return: The datetime64[us] array of shifted time points
+    """
+    if unit in _NUMPY_FIXED_UNITS and unit is not Unit.WEEK:
+        return points + numpy.timedelta64(n, _NUMPY_FIXED_UNITS[unit])
+    elif unit is Unit.WEEK:
+        return points + numpy.timedelta64(7 * n, "D")
+    elif unit in _UNIT_MONTHS:
+        # like relativedelta, clip the day to the end of the target month
+        months = points.astype("datetime64[M]")
+        days = points.astype("datetime64[D]")
+        month_day = days - months.astype("datetime64[D]")
+        months += _UNIT_MONTHS[unit] * n
+        first_days = months.astype("datetime64[D]")
+        month_lengths = (months + 1).astype("datetime64[D]") - first_days
+        month_day = numpy.minimum(month_day, month_lengths - 1)
+        return first_days + month_day + (points - days)
+    else:
+        raise NotImplementedError
+
+
+def _expand_many(unit: Unit,
+                 starts: numpy.ndarray,
+                 ends: numpy.ndarray,
+                 n: int) -> tuple[numpy.ndarray, numpy.ndarray]:
+    """
+    Expands each of an array of intervals, with the same semantics as
+    :meth:`Unit.expand`.
+
+    :param unit: The unit to expand to
+    :param starts: The datetime64[us] array of interval starts
+    :param ends: The datetime64[us] array of interval ends
+    :param n: The number of repetitions of the unit
+    :return: The datetime64[us] arrays of expanded interval starts and ends
+    """
+    expand = _add_many(unit, starts, n) > ends
+    if not expand.any():
+        return starts, ends
+    starts = starts.copy()
+    ends = ends.copy()
+    # like timedelta division, round half microseconds to even
+    half_widths, odd = numpy.divmod(
+        (ends[expand] - starts[expand]).astype(numpy.int64), 2)
+    half_widths += odd & (half_widths % 2)
+    mids = starts[expand] + half_widths.astype("timedelta64[us]")
+    if n % 2 == 0 or unit in _NUMPY_FIXED_UNITS:
+        # n / 2 of any unit with a fixed width is a whole number of
+        # microseconds; n / 2 of other units is a whole number of units
+        if unit in _NUMPY_FIXED_UNITS:
+            width = numpy.timedelta64(1, _NUMPY_FIXED_UNITS[unit]).astype(
+                "timedelta64[us]").astype(numpy.int64)
+            half_width = n * width // 2
+            if n * width % 2:
+                half_width += half_width % 2
+            new_starts = mids - numpy.timedelta64(half_width, "us")
+        else:
+            new_starts = _add_many(unit, mids, -(n // 2))
+    elif unit is Unit.MONTH:
+        new_starts = mids - numpy.timedelta64(15, "D")
+    elif unit is Unit.YEAR:
+        new_starts = mids - numpy.timedelta64(365 * 12, "h")
+    else:
+        raise NotImplementedError(f"don't know how to take {n}/2 of {unit}")
+    starts[expand] = new_starts
+    ends[expand] = _add_many(unit, new_starts, n)
+    return starts, ends
+
+
+def _apply_many(method: typing.Callable, points: typing.Any) -> \
+        tuple[numpy.ndarray, numpy.ndarray]:
+    """
+    Applies an array-level method to the non-NaT time points of an array.
+
+    :param method: A method that takes a one-dimensional datetime64[us] array
+        with no NaT values, and returns arrays of interval starts and ends
+    :param points: An array-like of time points
+    :return: Arrays of interval starts and ends with the shape of the input,
+        with NaT wherever the time point was NaT or the Interval was open
+    """
+    points = numpy.asarray(points, dtype="datetime64[us]")
+    flat_points = points.ravel()
+    valid = ~numpy.isnat(flat_points)
+    starts = numpy.full(flat_points.shape, _NAT)
+    ends = numpy.full(flat_points.shape, _NAT)
+    starts[valid], ends[valid] = method(flat_points[valid])
+    # match the errors of the datetime operations
+    lower = numpy.datetime64(datetime.datetime.min, "us")
+    upper = numpy.datetime64(datetime.datetime.max, "us")
+    for array in [starts, ends]:
+        if ((array < lower) | (array > upper)).any():
+            raise OverflowError("date value out of range")
+    return starts.reshape(points.shape), ends.reshape(points.shape)
+
+
+def _scalar_many(method: typing.Callable[[datetime.datetime], Interval],
+                 points: numpy.ndarray,
+                 keys: numpy.ndarray = None) -> \
+        tuple[numpy.ndarray, numpy.ndarray]:
+    """
+    Applies a scalar method to each of an array of time points, evaluating it
+    only once for each distinct key.
+
+    :param method: A method that takes a time point and returns an Interval
+    :param points: The datetime64[us] array of time points
+    :param keys: An array of the same length as points, such that points with
+        the same key are guaranteed to produce the same Interval.
+        If None, the points themselves are used as the keys.
+    :return: Arrays of interval starts and ends
+    """
+    if keys is None:
+        keys = points
+    _, indices, inverse = numpy.unique(keys, return_index=True,
+                                       return_inverse=True)
+    intervals = [method(point) for point in points[indices].astype(object)]
+    starts = numpy.array([i.start for i in intervals], dtype="datetime64[us]")
+    ends = numpy.array([i.end for i in intervals], dtype="datetime64[us]")
+    return starts[inverse], ends[inverse]
+
+
+# the instances handed out by Shift.shared, keyed by class and arguments,
+# each with a snapshot of its fields, so that an instance that has been
+# modified is replaced rather than handed out again; the least recently used
+# instances are dropped once there are more than _SHARED_SHIFTS_MAXSIZE
+_shared_shifts = collections.OrderedDict()
+_shared_shifts_lock = threading.RLock()
+_SHARED_SHIFTS_MAXSIZE = 1024
+
+
+def _shift_snapshot(shift: "Shift") -> typing.Any:
+    """
+    Captures the values of the fields of a shift, so that a later snapshot
+    differs if any of its fields has been assigned a different value.
+    """
+    getter = _shift_field_getters.get(shift.__class__)
+    if getter is None:
+        names = [field.name for field in dataclasses.fields(shift)]
+        getter = _shift_field_getters[shift.__class__] = \
+            operator.attrgetter(*names)
+    return getter(shift)
+
+
+_shift_field_getters = {}
+
+
 class Shift:
     """
     An object that can be added or subtracted from a time point yielding an
     Interval
     """
+    __slots__ = ()
 
     unit: Unit
 
+    @classmethod
+    def shared(cls, *args, **kwargs):
+        """
+        Gets a shared instance of this class, constructing it only the first
+        time that it is requested with the given arguments.
+        For example, every call to :code:`Summer.shared()` returns the same
+        object, as does every call to
+        :code:`Repeating.shared(DAY, WEEK, value=4)`.
+
+        Shared instances must not be modified, so they cannot be given a span.
+        An instance that is modified anyway is not handed out again: the next
+        request with the same arguments constructs a new shared instance.
+        Only the most recently requested instances are kept, so a request for
+        rarely used arguments may also construct a new instance.
+
+        :param args: The positional arguments to the constructor, which must
+            be hashable
+        :param kwargs: The keyword arguments to the constructor, which must be
+            hashable
+        :return: The shared instance
+        """
+        if "span" in kwargs:
+            raise ValueError(f"shared {cls.__name__} objects cannot have "
+                             f"a span")
+        key = (cls, args, tuple(sorted(kwargs.items())))
+        with _shared_shifts_lock:
+            entry = _shared_shifts.get(key)
+            if entry is not None and _shift_snapshot(entry[0]) == entry[1]:
+                _shared_shifts.move_to_end(key)
+                return entry[0]
+            shift = cls(*args, **kwargs)
+            _shared_shifts[key] = shift, _shift_snapshot(shift)
+            _shared_shifts.move_to_end(key)
+            if len(_shared_shifts) > _SHARED_SHIFTS_MAXSIZE:
+                _shared_shifts.popitem(last=False)
+            return shift
+
     def __rsub__(self, other: datetime.datetime) -> Interval:
         raise NotImplementedError
 
     def __radd__(self, other: datetime.datetime) -> Interval:
         raise NotImplementedError
 
+    def rsub_many(self, points: typing.Any) -> \
+            tuple[numpy.ndarray, numpy.ndarray]:
+        """
+        Subtracts this shift from each of an array of time points.
+        The result is the same as subtracting it from each time point, but
+        calendar arithmetic is applied to the whole array where possible.
+
+        :param points: An array-like of time points, e.g., a numpy datetime64
+            array
+        :return: A datetime64[us] array of interval starts and a datetime64[us]
+            array of interval ends, with NaT for missing time points and for
+            missing interval starts or ends
+        """
+        return _apply_many(self._rsub_many, points)
+
+    def radd_many(self, points: typing.Any) -> \
+            tuple[numpy.ndarray, numpy.ndarray]:
+        """
+        Adds this shift to each of an array of time points.
+        The result is the same as adding it to each time point, but
+        calendar arithmetic is applied to the whole array where possible.
+
+        :param points: An array-like of time points, e.g., a numpy datetime64
+            array
+        :return: A datetime64[us] array of interval starts and a datetime64[us]
+            array of interval ends, with NaT for missing time points and for
+            missing interval starts or ends
+        """
+        return _apply_many(self._radd_many, points)
+
+    def rsub_repeated(self, other: datetime.datetime, n: int) -> Interval:
+        """
+        Subtracts this shift from a time point n times, each time subtracting
+        it from the start of the previous interval.
+        The result is the same as subtracting it n times, but where possible,
+        the intermediate intervals are skipped rather than constructed.
+
+        :param other: The time point
+        :param n: The number of times to subtract the shift
+        :return: The interval produced by the nth subtraction
+        """
+        return self._repeated(other - self, n - 1, forward=False)
+
+    def radd_repeated(self, other: datetime.datetime, n: int) -> Interval:
+        """
+        Adds this shift to a time point n times, each time adding it to the
+        end of the previous interval.
+        The result is the same as adding it n times, but where possible, the
+        intermediate intervals are skipped rather than constructed.
+
+        :param other: The time point
+        :param n: The number of times to add the shift
+        :return: The interval produced by the nth addition
+        """
+        return self._repeated(other + self, n - 1, forward=True)
+
+    def _rsub_many(self, points: numpy.ndarray) -> \
+            tuple[numpy.ndarray, numpy.ndarray]:
+        return _scalar_many(self.__rsub__, points)
+
+    def _radd_many(self, points: numpy.ndarray) -> \
+            tuple[numpy.ndarray, numpy.ndarray]:
+        return _scalar_many(self.__radd__, points)
+
+    def _step(self, interval: Interval) -> \
+            datetime.timedelta | dateutil.relativedelta.relativedelta | None:
+        """
+        Finds the constant step, if there is one, from an interval produced by
+        this shift to the interval produced by applying the shift again.
+
+        :param interval: An interval produced by this shift
+        :return: The step, or None if the step is not the same every time
+        """
+        return None
+
+    def _repeated(self,
+                  interval: Interval,
+                  n: int,
+                  forward: bool,
+                  limit: datetime.datetime | None = None) -> Interval | None:
+        """
+        Applies this shift n more times to an interval that it produced,
+        adding it to the end of the interval or subtracting it from the start.
+
+        :param interval: An interval produced by this shift
+        :param n: The number of times to apply the shift
+        :param forward: True to add the shift, False to subtract it
+        :param limit: If provided, stop early once the intervals move past
+            this time point
+        :return: The interval produced by the last application, or None if
+            the limit was passed
+        """
+        def passed(i: Interval) -> bool:
+            if limit is None:
+                return False
+            elif forward:
+                return i.end is not None and i.end > limit
+            else:
+                return i.start is not None and i.start < limit
+
+        if n <= 0:
+            return None if passed(interval) else interval
+        step = self._step(interval)
+        if step is not None:
+            step = step * n if forward else -step * n
+            try:
+                interval = Interval(interval.start + step, interval.end + step)
+            except (OverflowError, ValueError):
+                # the interval left the representable range, so it passed any
+                # limit; without a limit, report the error as a step would
+                if limit is None:
+                    raise
+                return None
+        else:
+            for _ in range(n):
+                if passed(interval):
+                    return None
+                interval = interval + self if forward else interval - self
+        return None if passed(interval) else interval
+
 
 @_dataclass
 class Period(Shift):
@@ -367,22 +832,61 @@ class Period(Shift):
     unit: Unit
     n: int | None
     span: (int, int) = dataclasses.field(default=None, repr=False)
+    trigger_span: (int, int) = dataclasses.field(
+        default=None, repr=False, compare=False, kw_only=True)
 
     def __radd__(self, other: datetime.datetime) -> Interval:
         if self.unit is None or self.n is None:
             return Interval(other, None)
         else:
-            end = other + self.unit.relativedelta(self.n)
+            end = other + self.unit.delta(self.n)
             # in the first century, there's only 99 years
             if other == datetime.datetime.min and self.unit is Unit.CENTURY:
-                end -= Unit.YEAR.relativedelta(1)
+                end -= Unit.YEAR.delta(1)
             return Interval(other, end)
 
     def __rsub__(self, other: datetime.datetime) -> Interval:
         if self.unit is None or self.n is None:
             return Interval(None, other)
         else:
-            return Interval(other - self.unit.relativedelta(self.n), other)
+            return Interval(other - self.unit.delta(self.n), other)
+
+    def _radd_many(self, points: numpy.ndarray) -> \
+            tuple[numpy.ndarray, numpy.ndarray]:
+        if self.unit is None or self.n is None:
+            return points, numpy.full(points.shape, _NAT)
+        elif not isinstance(self.n, int) or self.unit is Unit.MILLISECOND:
+            return Shift._radd_many(self, points)
+        else:
+            ends = _add_many(self.unit, points, self.n)
+            # in the first century, there's only 99 years
+            if self.unit is Unit.CENTURY:
+                first = points == numpy.datetime64(datetime.datetime.min)
+                ends[first] = _add_many(Unit.YEAR, ends[first], -1)
+            return points, ends
+
+    def _rsub_many(self, points: numpy.ndarray) -> \
+            tuple[numpy.ndarray, numpy.ndarray]:
+        if self.unit is None or self.n is None:
+            return numpy.full(points.shape, _NAT), points
+        elif not isinstance(self.n, int) or self.unit is Unit.MILLISECOND:
+            return Shift._rsub_many(self, points)
+        else:
+            return _add_many(self.unit, points, -self.n), points
+
+    def _step(self, interval: Interval) -> \
+            datetime.timedelta | dateutil.relativedelta.relativedelta | None:
+        if self.unit is None or not isinstance(self.n, int) or \
+                self.unit is Unit.MILLISECOND or \
+                not interval.is_defined() or \
+                interval.start == datetime.datetime.min:
+            return None
+        delta = self.unit.delta(self.n)
+        # month arithmetic only repeats exactly when no day is clipped
+        if isinstance(delta, datetime.timedelta) or \
+                (interval.start.day <= 28 and interval.end.day <= 28):
+            return delta
+        return None
 
 
 @_dataclass
@@ -395,6 +899,9 @@ class PeriodSum(Shift):
     """
     periods: list[Period]
     span: (int, int) = dataclasses.field(default=None, repr=False)
+    trigger_span: (int, int) = dataclasses.field(
+        default=None, repr=False, compare=False, kw_only=True)
+    unit: Unit = dataclasses.field(init=False, repr=False, compare=False)
 
     def __post_init__(self):
         self.unit = max(self.periods, key=lambda p: p.unit).unit
@@ -411,6 +918,552 @@ class PeriodSum(Shift):
             start = (start - period).start
         return Interval(start, other)
 
+    def _radd_many(self, points: numpy.ndarray) -> \
+            tuple[numpy.ndarray, numpy.ndarray]:
+        ends = points
+        for period in self.periods:
+            _, ends = period._radd_many(ends)
+        return points, ends
+
+    def _rsub_many(self, points: numpy.ndarray) -> \
+            tuple[numpy.ndarray, numpy.ndarray]:
+        starts = points
+        for period in self.periods:
+            starts, _ = period._rsub_many(starts)
+        return starts, points
+
+    def _step(self, interval: Interval) -> datetime.timedelta | None:
+        if not all(isinstance(p.unit, Unit) and isinstance(p.n, int) and
+                   p.unit is not Unit.MILLISECOND and
+                   isinstance(p.unit.delta(1), datetime.timedelta)
+                   for p in self.periods):
+            return None
+        return sum((p.unit.delta(p.n) for p in self.periods),
+                   datetime.timedelta())
+
+
+def _previous_occurrence(unit: Unit,
+                         rrule_kwargs: dict,
+                         point: datetime.datetime) -> datetime.datetime | None:
+    """
+    Finds the latest occurrence at or before the point of an rrule whose
+    dtstart is truncated to the given unit, using only calendar arithmetic.
+
+    :param unit: The unit to which the rrule dtstart is truncated
+    :param rrule_kwargs: The rrule arguments, other than dtstart
+    :param point: The latest time point that may be returned
+    :return: The latest occurrence, or None if rrule_kwargs are not in one of
+        the forms produced by Repeating, in which case the rrule itself must be
+        used to find the occurrence
+    """
+    day = datetime.timedelta(days=1)
+    match unit, rrule_kwargs:
+        case (Unit.SECOND, {"freq": dateutil.rrule.MINUTELY,
+                            "bysecond": int(second), **rest}) \
+                if not rest and 0 <= second < 60:
+            start = point.replace(second=second, microsecond=0)
+            if start > point:
+                start -= datetime.timedelta(minutes=1)
+        case (Unit.MINUTE, {"freq": dateutil.rrule.HOURLY,
+                            "byminute": int(minute), **rest}) \
+                if not rest and 0 <= minute < 60:
+            start = point.replace(minute=minute, second=0, microsecond=0)
+            if start > point:
+                start -= datetime.timedelta(hours=1)
+        case (Unit.HOUR, {"freq": dateutil.rrule.DAILY,
+                          "byhour": int(hour), **rest}) \
+                if not rest and 0 <= hour < 24:
+            start = point.replace(hour=hour, minute=0, second=0, microsecond=0)
+            if start > point:
+                start -= day
+        case (Unit.MINUTE, {"freq": dateutil.rrule.DAILY,
+                            "byhour": int(hour), "byminute": int(minute),
+                            **rest}) \
+                if not rest and 0 <= hour < 24 and 0 <= minute < 60:
+            start = point.replace(hour=hour, minute=minute,
+                                  second=0, microsecond=0)
+            if start > point:
+                start -= day
+        case (Unit.DAY, {"freq": dateutil.rrule.DAILY | dateutil.rrule.WEEKLY,
+                         "byweekday": int(weekday), **rest}) \
+                if not rest and 0 <= weekday < 7:
+            start = Unit.DAY.truncate(point)
+            start -= (start.weekday() - weekday) % 7 * day
+        case (Unit.DAY, {"freq": dateutil.rrule.MONTHLY,
+                         "bymonthday": int(month_day), **rest}) \
+                if not rest and 1 <= month_day <= 31:
+            # at most two months back (e.g., from 30 Apr to 31 Mar)
+            year, month = point.year, point.month
+            while True:
+                if month_day <= calendar.monthrange(year, month)[1]:
+                    start = datetime.datetime(year, month, month_day)
+                    if start <= point:
+                        break
+                year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+        case (Unit.DAY, {"freq": dateutil.rrule.YEARLY,
+                         "byyearday": int(year_day), **rest}) \
+                if not rest and 1 <= year_day <= 366:
+            # at most eight years back (e.g., day 366 from 1904 to 1896)
+            year = point.year
+            while True:
+                if year_day <= 365 + calendar.isleap(year):
+                    start = datetime.datetime(year, 1, 1) + (year_day - 1) * day
+                    if start <= point:
+                        break
+                year -= 1
+        case (Unit.MONTH, {"freq": dateutil.rrule.YEARLY,
+                           "bymonth": int(month), **rest}) \
+                if not rest and 1 <= month <= 12:
+            start = datetime.datetime(point.year, month, 1)
+            if start > point:
+                start = start.replace(year=start.year - 1)
+        case _:
+            # NOTE: byweekno is deliberately left to rrule, which does not
+            # follow ISO 8601 for some days at the start of January
+            start = None
+    return start
+
+
+def _occurrence_cycle(unit: Unit, rrule_kwargs: dict) -> \
+        datetime.timedelta | dateutil.relativedelta.relativedelta | None:
+    """
+    Finds the constant distance between consecutive occurrences of an rrule
+    whose dtstart is truncated to the given unit.
+
+    :param unit: The unit to which the rrule dtstart is truncated
+    :param rrule_kwargs: The rrule arguments, other than dtstart
+    :return: The distance, or None if rrule_kwargs are not in one of the
+        single-valued forms produced by Repeating
+    """
+    match unit, rrule_kwargs:
+        case (Unit.SECOND, {"freq": dateutil.rrule.MINUTELY,
+                            "bysecond": int(), **rest}) if not rest:
+            return datetime.timedelta(minutes=1)
+        case (Unit.MINUTE, {"freq": dateutil.rrule.HOURLY,
+                            "byminute": int(), **rest}) if not rest:
+            return datetime.timedelta(hours=1)
+        case (Unit.HOUR, {"freq": dateutil.rrule.DAILY,
+                          "byhour": int(), **rest}) if not rest:
+            return datetime.timedelta(days=1)
+        case (Unit.MINUTE, {"freq": dateutil.rrule.DAILY,
+                            "byhour": int(), "byminute": int(), **rest}) \
+                if not rest:
+            return datetime.timedelta(days=1)
+        case (Unit.DAY, {"freq": dateutil.rrule.DAILY | dateutil.rrule.WEEKLY,
+                         "byweekday": int(), **rest}) if not rest:
+            return datetime.timedelta(days=7)
+        case (Unit.MONTH, {"freq": dateutil.rrule.YEARLY,
+                           "bymonth": int(), **rest}) if not rest:
+            return Unit.YEAR.delta(1)
+    return None
+
+
+def _nearest_occurrences(unit: Unit,
+                         rrule_kwargs: dict,
+                         points: numpy.ndarray,
+                         after: bool) -> numpy.ndarray | None:
+    """
+    Finds, for each of an array of time points, the earliest occurrence at or
+    after the point, or the latest occurrence at or before the point, of an
+    rrule whose dtstart is truncated to the given unit, using only calendar
+    arithmetic over the whole array.
+
+    :param unit: The unit to which the rrule dtstart is truncated
+    :param rrule_kwargs: The rrule arguments, other than dtstart
+    :param points: The datetime64[us] array of time points
+    :param after: True to find occurrences at or after the points, False to
+        find occurrences at or before the points
+    :return: The datetime64[us] array of occurrences, or None if rrule_kwargs
+        are not in one of the forms produced by Repeating, in which case each
+        time point must be handled separately
+    """
+    match unit, rrule_kwargs:
+        case (Unit.SECOND, {"freq": dateutil.rrule.MINUTELY,
+                            "bysecond": int(second), **rest}) \
+                if not rest and 0 <= second < 60:
+            cycle_starts = points.astype("datetime64[m]")
+            offset = numpy.timedelta64(second, "s")
+            cycle = numpy.timedelta64(1, "m")
+        case (Unit.MINUTE, {"freq": dateutil.rrule.HOURLY,
+                            "byminute": int(minute), **rest}) \
+                if not rest and 0 <= minute < 60:
+            cycle_starts = points.astype("datetime64[h]")
+            offset = numpy.timedelta64(minute, "m")
+            cycle = numpy.timedelta64(1, "h")
+        case (Unit.HOUR, {"freq": dateutil.rrule.DAILY,
+                          "byhour": int(hour), **rest}) \
+                if not rest and 0 <= hour < 24:
+            cycle_starts = points.astype("datetime64[D]")
+            offset = numpy.timedelta64(hour, "h")
+            cycle = numpy.timedelta64(1, "D")
+        case (Unit.MINUTE, {"freq": dateutil.rrule.DAILY,
+                            "byhour": int(hour), "byminute": int(minute),
+                            **rest}) \
+                if not rest and 0 <= hour < 24 and 0 <= minute < 60:
+            cycle_starts = points.astype("datetime64[D]")
+            offset = numpy.timedelta64(hour * 60 + minute, "m")
+            cycle = numpy.timedelta64(1, "D")
+        case (Unit.DAY, {"freq": dateutil.rrule.DAILY | dateutil.rrule.WEEKLY,
+                         "byweekday": int(weekday), **rest}) \
+                if not rest and 0 <= weekday < 7:
+            days = points.astype("datetime64[D]")
+            # 1 Jan 1970 was a Thursday, i.e., weekday 3
+            cycle_starts = days - (days.astype(numpy.int64) + 3) % 7
+            offset = numpy.timedelta64(weekday, "D")
+            cycle = numpy.timedelta64(7, "D")
+        case (Unit.DAY, {"freq": dateutil.rrule.MONTHLY,
+                         "bymonthday": int(month_day), **rest}) \
+                if not rest and 1 <= month_day <= 31:
+            return _nearest_days_of_cycle("M", month_day, points, after)
+        case (Unit.DAY, {"freq": dateutil.rrule.YEARLY,
+                         "byyearday": int(year_day), **rest}) \
+                if not rest and 1 <= year_day <= 366:
+            return _nearest_days_of_cycle("Y", year_day, points, after)
+        case (Unit.MONTH, {"freq": dateutil.rrule.YEARLY,
+                           "bymonth": int(month), **rest}) \
+                if not rest and 1 <= month <= 12:
+            cycle_starts = points.astype("datetime64[Y]").astype(
+                "datetime64[M]")
+            offset = numpy.timedelta64(month - 1, "M")
+            cycle = numpy.timedelta64(12, "M")
+        case _:
+            return None
+    occurrences = cycle_starts + offset
+    if after:
+        occurrences = numpy.where(occurrences < points,
+                                  occurrences + cycle, occurrences)
+    else:
+        occurrences = numpy.where(occurrences > points,
+                                  occurrences - cycle, occurrences)
+    return occurrences.astype("datetime64[us]")
+
+
+def _nearest_days_of_cycle(cycle_code: str,
+                           day: int,
+                           points: numpy.ndarray,
+                           after: bool) -> numpy.ndarray:
+    """
+    Finds, for each of an array of time points, the nearest occurrence of the
+    nth day of a month or year, skipping months or years that are too short.
+
+    :param cycle_code: The numpy datetime64 code of the cycle, "M" or "Y"
+    :param day: The 1-based day of the month or year
+    :param points: The datetime64[us] array of time points
+    :param after: True to find occurrences at or after the points, False to
+        find occurrences at or before the points
+    :return: The datetime64[us] array of occurrences
+    """
+    cycles = points.astype(f"datetime64[{cycle_code}]")
+    occurrences = numpy.full(points.shape, _NAT)
+    todo = numpy.arange(len(points))
+    # at most eight cycles (e.g., day 366 from 1896 to 1904)
+    while len(todo):
+        first_days = cycles[todo].astype("datetime64[D]")
+        lengths = (cycles[todo] + 1).astype("datetime64[D]") - first_days
+        candidates = (first_days + (day - 1)).astype("datetime64[us]")
+        if after:
+            found = candidates >= points[todo]
+        else:
+            found = candidates <= points[todo]
+        found &= day <= lengths.astype(numpy.int64)
+        occurrences[todo[found]] = candidates[found]
+        todo = todo[~found]
+        cycles[todo] += 1 if after else -1
+    return occurrences
+
+
+# rrule arguments whose meaning does not depend on dtstart once the dtstart
+# defaults have been filled in; any others (e.g., count, interval) force the
+# backward search to use a single rrule starting at dtstart
+_WINDOWED_RRULE_ARGS = {
+    "freq", "wkst", "bymonth", "bymonthday", "byyearday", "byweekno",
+    "byweekday", "byhour", "byminute", "bysecond",
+}
+
+
+def _fill_rrule_defaults(rrule_kwargs: dict,
+                         dtstart: datetime.datetime) -> dict:
+    """
+    Makes explicit the rrule arguments that rrule would otherwise fill in from
+    dtstart, so that the occurrences are the same for any other dtstart
+    (except that there are no occurrences before dtstart).
+
+    :param rrule_kwargs: The rrule arguments, other than dtstart
+    :param dtstart: The dtstart from which rrule would take defaults
+    :return: A copy of rrule_kwargs with the defaults filled in
+    """
+    kwargs = dict(rrule_kwargs)
+    freq = kwargs["freq"]
+    # same logic as rrule.__init__
+    if all(kwargs.get(name) is None for name in [
+            "byweekno", "byyearday", "bymonthday", "byweekday", "byeaster"]):
+        match freq:
+            case dateutil.rrule.YEARLY:
+                if kwargs.get("bymonth") is None:
+                    kwargs["bymonth"] = dtstart.month
+                kwargs["bymonthday"] = dtstart.day
+            case dateutil.rrule.MONTHLY:
+                kwargs["bymonthday"] = dtstart.day
+            case dateutil.rrule.WEEKLY:
+                kwargs["byweekday"] = dtstart.weekday()
+    for name, min_freq, value in [("byhour", dateutil.rrule.HOURLY,
+                                   dtstart.hour),
+                                  ("byminute", dateutil.rrule.MINUTELY,
+                                   dtstart.minute),
+                                  ("bysecond", dateutil.rrule.SECONDLY,
+                                   dtstart.second)]:
+        if kwargs.get(name) is None and freq < min_freq:
+            kwargs[name] = value
+    return kwargs
+
+
+# the unit to which an rrule dtstart is aligned for caching; each is coarse
+# enough that nearby anchors share an rrule, but fine enough that an rrule
+# does not have to step through many occurrences to get to the anchor
+_RRULE_ALIGNMENT_UNITS = {
+    dateutil.rrule.YEARLY: Unit.YEAR,
+    dateutil.rrule.MONTHLY: Unit.YEAR,
+    dateutil.rrule.WEEKLY: Unit.MONTH,
+    dateutil.rrule.DAILY: Unit.MONTH,
+    dateutil.rrule.HOURLY: Unit.DAY,
+    dateutil.rrule.MINUTELY: Unit.HOUR,
+    dateutil.rrule.SECONDLY: Unit.MINUTE,
+}
+
+# the unit to which the search windows of _iter_rrule_before are aligned;
+# each is a multiple of the unit above, so the rrule of a window starts exactly
+# at the window, and yearly rules, whose occurrences may be years apart, get
+# windows of at least a decade, so that few windows have to scan forward past
+# their ends to the next occurrence
+_RRULE_WINDOW_UNITS = _RRULE_ALIGNMENT_UNITS | {
+    dateutil.rrule.YEARLY: Unit.DECADE,
+}
+
+
+def _rrule(rrule_kwargs: dict,
+           dtstart: datetime.datetime) -> dateutil.rrule.rrule:
+    """
+    Gets a compiled rrule from the rrule cache.
+
+    When the rrule arguments allow it, the dtstart is aligned to an earlier
+    time point so that nearby anchors share a single rrule.
+    The returned rrule has the same occurrences as one constructed from
+    dtstart, except that it may also have occurrences before dtstart.
+
+    :param rrule_kwargs: The rrule arguments, other than dtstart
+    :param dtstart: The rrule dtstart
+    :return: The compiled rrule
+    """
+    # rrule ignores microseconds of dtstart
+    dtstart = dtstart.replace(microsecond=0)
+    if rrule_kwargs.keys() <= _WINDOWED_RRULE_ARGS:
+        rrule_kwargs = _fill_rrule_defaults(rrule_kwargs, dtstart)
+        try:
+            dtstart = _RRULE_ALIGNMENT_UNITS[rrule_kwargs["freq"]].truncate(
+                dtstart)
+        except ValueError:
+            pass  # e.g., there is no year 0 to align to
+    frozen_kwargs = tuple(sorted(
+        (name, tuple(value) if isinstance(value, list) else value)
+        for name, value in rrule_kwargs.items()))
+    return _compile_rrule(frozen_kwargs, dtstart)
+
+
+@functools.lru_cache(maxsize=1024)
+def _compile_rrule(frozen_kwargs: tuple,
+                   dtstart: datetime.datetime) -> dateutil.rrule.rrule:
+    # not cache=True, which would make each rrule remember every occurrence
+    # it has generated, so that the memory of the cache would be unbounded;
+    # since dtstart is aligned near the anchors, regenerating is cheap
+    return dateutil.rrule.rrule(dtstart=dtstart, **dict(frozen_kwargs))
+
+
+def rrule_cache_info() -> typing.NamedTuple:
+    """
+    Reports statistics for the cache of compiled rrules used by
+    :class:`Repeating` and :class:`RepeatingIntersection`.
+
+    :return: A named tuple of hits, misses, maxsize and currsize, as for
+        :func:`functools.lru_cache`
+    """
+    return _compile_rrule.cache_info()
+
+
+def rrule_cache_clear():
+    """
+    Clears the cache of compiled rrules used by :class:`Repeating` and
+    :class:`RepeatingIntersection`, and resets its statistics.
+    """
+    _compile_rrule.cache_clear()
+
+
+def _iter_rrule_before(rrule_kwargs: dict,
+                       dtstart: datetime.datetime,
+                       point: datetime.datetime,
+                       unit: Unit) -> typing.Iterator[datetime.datetime]:
+    """
+    Iterates backwards over the occurrences of an rrule, starting from the
+    latest one at or before the point.
+
+    Rather than iterating forward from dtstart, occurrences are generated in
+    windows that start at the unit containing the point and double in size as
+    they move back toward dtstart, so the cost depends on how far back the
+    occurrences are rather than how far back dtstart is.
+
+    :param rrule_kwargs: The rrule arguments, other than dtstart
+    :param dtstart: The rrule dtstart; no occurrences before it are generated
+    :param point: The latest time point that may be generated
+    :param unit: The unit in which to measure the search windows, typically
+        the largest unit of the repeating intervals that defined the rrule
+    :return: An iterator over occurrences, from latest to earliest
+    """
+    # rrule ignores microseconds of dtstart
+    dtstart = dtstart.replace(microsecond=0)
+    if not rrule_kwargs.keys() <= _WINDOWED_RRULE_ARGS:
+        rrule = _rrule(rrule_kwargs, dtstart)
+        occurrence = rrule.before(point, inc=True)
+        while occurrence is not None:
+            yield occurrence
+            occurrence = rrule.before(occurrence)
+        return
+
+    kwargs = _fill_rrule_defaults(rrule_kwargs, dtstart)
+    # windows start on boundaries to which _rrule also aligns dtstart, so that
+    # searches from nearby points share the cached rrules of their windows
+    alignment_unit = _RRULE_WINDOW_UNITS[kwargs["freq"]]
+    window_start = unit.truncate(point)
+    window_end = point
+    end_included = True
+    n_units = 1
+    while True:
+        try:
+            window_start = alignment_unit.truncate(window_start)
+        except ValueError:
+            pass  # e.g., there is no year 0 to align to
+        window_start = max(window_start, dtstart)
+        occurrences = []
+        # NOTE: rrule can only stop at an occurrence, so each window also
+        # scans forward to the first occurrence after the window
+        for occurrence in _rrule(kwargs, window_start):
+            # the cached rrule may start before the window
+            if occurrence < window_start:
+                continue
+            if occurrence > window_end or \
+                    (occurrence == window_end and not end_included):
+                break
+            occurrences.append(occurrence)
+        else:
+            # the calendar repeats every 400 years, so if there was nothing
+            # from the window start through the end of the calendar, there is
+            # nothing before the window start either
+            if not occurrences and \
+                    window_start.year <= datetime.MAXYEAR - 400:
+                break
+        yield from reversed(occurrences)
+        if window_start == dtstart:
+            break
+        # the next window ends where this one started
+        window_end = window_start
+        end_included = False
+        try:
+            window_start -= unit.delta(n_units)
+        except (OverflowError, ValueError):
+            window_start = dtstart
+        n_units *= 2
+
+
+class _ReadOnlyDict(dict):
+    """
+    A dict that cannot be modified, so that a single instance can be shared.
+    """
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError(f"{self.__class__.__name__} cannot be modified")
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        return self.__class__, (dict(self),)
+
+
+# repeating intervals without rrule arguments share a single empty dict,
+# rather than allocating one each
+_NO_RRULE_KWARGS = _ReadOnlyDict()
+
+
+def _repeating_rrule_kwargs(unit: Unit, range: Unit, value: int) -> dict:
+    """
+    Determines the rrule arguments for the repeating interval with the given
+    unit and value within the given range.
+
+    :param unit: The unit of the repeating interval
+    :param range: The range within which the value selects the unit
+    :param value: The value of the unit within the range
+    :return: The rrule arguments
+    """
+    match range:
+        case Unit.SECOND:
+            rrule_freq = dateutil.rrule.SECONDLY
+        case Unit.MINUTE:
+            rrule_freq = dateutil.rrule.MINUTELY
+        case Unit.HOUR:
+            rrule_freq = dateutil.rrule.HOURLY
+        case Unit.DAY:
+            rrule_freq = dateutil.rrule.DAILY
+        case Unit.WEEK:
+            rrule_freq = dateutil.rrule.WEEKLY
+        case Unit.MONTH:
+            rrule_freq = dateutil.rrule.MONTHLY
+        case Unit.YEAR:
+            rrule_freq = dateutil.rrule.YEARLY
+        case _:
+            raise NotImplementedError
+
+    match (unit, range):
+        case (Unit.SECOND, Unit.MINUTE):
+            rrule_by = "bysecond"
+        case (Unit.MINUTE, Unit.HOUR):
+            rrule_by = "byminute"
+        case (Unit.HOUR, Unit.DAY):
+            rrule_by = "byhour"
+        case (Unit.DAY, Unit.WEEK):
+            rrule_by = "byweekday"
+        case (Unit.DAY, Unit.MONTH):
+            rrule_by = "bymonthday"
+        case (Unit.DAY, Unit.YEAR):
+            rrule_by = "byyearday"
+        case (Unit.WEEK, Unit.YEAR):
+            rrule_by = "byweekno"
+        case (Unit.MONTH, Unit.YEAR):
+            rrule_by = "bymonth"
+        case _:
+            raise NotImplementedError
+    return {"freq": rrule_freq, rrule_by: value}
+
+
+def _shared_period(unit: Unit, n: int) -> Period:
+    # a faster lookup of the Periods shared by repeating intervals, which
+    # checks only the fields of a Period rather than taking a snapshot
+    period = _shared_periods.get((unit, n))
+    if period is None or period.unit is not unit or period.n != n or \
+            period.span is not None:
+        if len(_shared_periods) >= _SHARED_SHIFTS_MAXSIZE:
+            _shared_periods.clear()
+        period = _shared_periods[unit, n] = Period.shared(unit, n)
+    return period
+
+
+# the Periods returned by _shared_period, keyed by unit and number of units
+_shared_periods = {}
+
+
+@functools.lru_cache(maxsize=1024)
+def _shared_rrule_kwargs(unit: Unit, range: Unit, value: int) -> _ReadOnlyDict:
+    # repeating intervals with the same unit, range and value share a single
+    # dict, and only determine its contents once
+    return _ReadOnlyDict(_repeating_rrule_kwargs(unit, range, value))
+
 
 @_dataclass
 class Repeating(Shift):
@@ -436,12 +1489,15 @@ class Repeating(Shift):
     range: Unit = None
     value: int = dataclasses.field(default=None, kw_only=True)
     n_units: int = dataclasses.field(default=1, kw_only=True)
-    rrule_kwargs: dict = dataclasses.field(default_factory=dict,
-                                           kw_only=True, repr=False)
+    rrule_kwargs: dict = dataclasses.field(
+        default_factory=lambda: _NO_RRULE_KWARGS, kw_only=True, repr=False)
     span: (int, int) = dataclasses.field(default=None, repr=False)
+    trigger_span: (int, int) = dataclasses.field(
+        default=None, repr=False, compare=False, kw_only=True)
+    period: Period = dataclasses.field(init=False, repr=False, compare=False)
 
     def __post_init__(self):
-        self.period = Period(self.unit, self.n_units)
+        self.period = _shared_period(self.unit, self.n_units)
         if self.range == self.unit:
             pass  # same as self.range is None
         elif self.range is None:
@@ -449,61 +1505,29 @@ class Repeating(Shift):
         elif self.value is None:
             raise ValueError(f"value=None is not allowed for unit={self.unit} "
                              f"and range={self.range}")
+        elif not self.rrule_kwargs and isinstance(self.value, int):
+            self.rrule_kwargs = _shared_rrule_kwargs(self.unit, self.range,
+                                                     self.value)
         else:
-            match self.range:
-                case Unit.SECOND:
-                    rrule_freq = dateutil.rrule.SECONDLY
-                case Unit.MINUTE:
-                    rrule_freq = dateutil.rrule.MINUTELY
-                case Unit.HOUR:
-                    rrule_freq = dateutil.rrule.HOURLY
-                case Unit.DAY:
-                    rrule_freq = dateutil.rrule.DAILY
-                case Unit.WEEK:
-                    rrule_freq = dateutil.rrule.WEEKLY
-                case Unit.MONTH:
-                    rrule_freq = dateutil.rrule.MONTHLY
-                case Unit.YEAR:
-                    rrule_freq = dateutil.rrule.YEARLY
-                case _:
-                    raise NotImplementedError
-            self.rrule_kwargs["freq"] = rrule_freq
-
-            match (self.unit, self.range):
-                case (Unit.SECOND, Unit.MINUTE):
-                    rrule_by = "bysecond"
-                case (Unit.MINUTE, Unit.HOUR):
-                    rrule_by = "byminute"
-                case (Unit.HOUR, Unit.DAY):
-                    rrule_by = "byhour"
-                case (Unit.DAY, Unit.WEEK):
-                    rrule_by = "byweekday"
-                case (Unit.DAY, Unit.MONTH):
-                    rrule_by = "bymonthday"
-                case (Unit.DAY, Unit.YEAR):
-                    rrule_by = "byyearday"
-                case (Unit.WEEK, Unit.YEAR):
-                    rrule_by = "byweekno"
-                case (Unit.MONTH, Unit.YEAR):
-                    rrule_by = "bymonth"
-                case _:
-                    raise NotImplementedError
-            self.rrule_kwargs[rrule_by] = self.value
+            self.rrule_kwargs = dict(self.rrule_kwargs) | \
+                _repeating_rrule_kwargs(self.unit, self.range, self.value)
 
     def __rsub__(self, other: datetime.datetime) -> Interval:
         if self.unit is None:
             return Interval(None, None)
         other = self.unit.truncate(other)
         if self.rrule_kwargs:
-            # HACK: rrule requires a starting point even when going backwards
-            # so use a big one
-            dtstart = other - Unit.YEAR.relativedelta(100)
-            min_end = other - self.period.unit.relativedelta(self.period.n)
-            rrule = dateutil.rrule.rrule(dtstart=dtstart, **self.rrule_kwargs)
-            start = rrule.before(min_end, inc=True)
+            min_end = other - self.period.unit.delta(self.period.n)
+            start = _previous_occurrence(self.unit, self.rrule_kwargs, min_end)
             if start is None:
-                raise ValueError(f"between {dtstart} and {min_end} there is "
-                                 f"no {self.rrule_kwargs}")
+                # rrule requires a starting point even when going backwards
+                # so use a big one; the search will usually stop well after it
+                dtstart = other - Unit.YEAR.delta(100)
+                start = next(_iter_rrule_before(
+                    self.rrule_kwargs, dtstart, min_end, self.range), None)
+                if start is None:
+                    raise ValueError(f"between {dtstart} and {min_end} there "
+                                     f"is no {self.rrule_kwargs}")
             interval = start + self.period
         else:
             interval = other - self.period
@@ -514,12 +1538,95 @@ class Repeating(Shift):
             return Interval(None, None)
         start = self.unit.truncate(other)
         if self.rrule_kwargs:
-            rrule = dateutil.rrule.rrule(dtstart=start, **self.rrule_kwargs)
-            start = rrule.after(other, inc=True)
+            start = _rrule(self.rrule_kwargs, start).after(other, inc=True)
         elif start < other:
-            start += self.period.unit.relativedelta(1)
+            start += self.period.unit.delta(1)
         return start + self.period
 
+    def _rsub_many(self, points: numpy.ndarray) -> \
+            tuple[numpy.ndarray, numpy.ndarray]:
+        if self.unit is None:
+            nats = numpy.full(points.shape, _NAT)
+            return nats, nats.copy()
+        if not self.rrule_kwargs:
+            return self.period._rsub_many(self.unit.truncate_many(points))
+        min_ends, _ = self.period._rsub_many(self.unit.truncate_many(points))
+        starts = _nearest_occurrences(self.unit, self.rrule_kwargs, min_ends,
+                                      after=False)
+        if starts is None:
+            return Shift._rsub_many(self, points)
+        return self.period._radd_many(starts)
+
+    def _radd_many(self, points: numpy.ndarray) -> \
+            tuple[numpy.ndarray, numpy.ndarray]:
+        if self.unit is None:
+            nats = numpy.full(points.shape, _NAT)
+            return nats, nats.copy()
+        if self.rrule_kwargs:
+            starts = _nearest_occurrences(self.unit, self.rrule_kwargs, points,
+                                          after=True)
+            if starts is None:
+                return Shift._radd_many(self, points)
+        else:
+            starts = self.unit.truncate_many(points)
+            later = starts < points
+            starts[later] = _add_many(self.period.unit, starts[later], 1)
+        return self.period._radd_many(starts)
+
+    def _step(self, interval: Interval) -> \
+            datetime.timedelta | dateutil.relativedelta.relativedelta | None:
+        # centuries are not contiguous, since the first century is only 99
+        # years
+        if self.unit in {None, Unit.MILLISECOND, Unit.CENTURY} or \
+                not isinstance(self.n_units, int):
+            return None
+        elif not self.rrule_kwargs:
+            # intervals are contiguous and aligned to the unit, so adding
+            # whole units never clips days
+            return self.unit.delta(self.n_units)
+        cycle = _occurrence_cycle(self.unit, self.rrule_kwargs)
+        # when intervals are longer than the cycle, they overlap, and
+        # occurrences that start within an interval are skipped
+        if cycle is not None and interval.end <= interval.start + cycle:
+            return cycle
+        return None
+
+    def _repeated(self,
+                  interval: Interval,
+                  n: int,
+                  forward: bool,
+                  limit: datetime.datetime | None = None) -> Interval | None:
+        if n <= 0 or self.unit is None or not self.rrule_kwargs or \
+                not self.rrule_kwargs.keys() <= _WINDOWED_RRULE_ARGS or \
+                self._step(interval) is not None:
+            return Shift._repeated(self, interval, n, forward, limit)
+        # count through the occurrences of the rrule, skipping any that start
+        # within the previous interval, as applying the shift again would
+        delta = self.period.unit.delta(self.period.n)
+        if forward:
+            bound = interval.end
+            occurrences = _rrule(self.rrule_kwargs, bound).xafter(bound,
+                                                                  inc=True)
+        else:
+            bound = interval.start - delta
+            # the occurrences of a unit-aligned dtstart are the same for any
+            # other unit-aligned dtstart, so use the earliest possible one
+            occurrences = _iter_rrule_before(
+                self.rrule_kwargs, datetime.datetime.min, bound, self.range)
+        for occurrence in occurrences:
+            if occurrence < bound if forward else occurrence > bound:
+                continue
+            interval = occurrence + self.period
+            if limit is not None and (interval.end > limit if forward
+                                      else interval.start < limit):
+                return None
+            n -= 1
+            if not n:
+                return interval
+            bound = interval.end if forward else occurrence - delta
+        raise ValueError(f"no {self.rrule_kwargs} "
+                         f"{'after' if forward else 'before'} {bound}")
+
 
 # Defined as "meterological seasons"
 # https://www.ncei.noaa.gov/news/meteorological-versus-astronomical-seasons
@@ -674,18 +1781,21 @@ class EveryNth(Shift):
     shift: Shift
     n: int
     span: (int, int) = dataclasses.field(default=None, repr=False)
+    trigger_span: (int, int) = dataclasses.field(
+        default=None, repr=False, compare=False, kw_only=True)
 
     def __rsub__(self, other: datetime.datetime) -> Interval:
-        interval = other - self.shift
-        for _ in range(self.n - 1):
-            interval -= self.shift
-        return interval
+        return self.shift.rsub_repeated(other, self.n)
 
     def __radd__(self, other: datetime.datetime) -> Interval:
-        interval = other + self.shift
-        for _ in range(self.n - 1):
-            interval += self.shift
-        return interval
+        return self.shift.radd_repeated(other, self.n)
+
+    def _repeated(self,
+                  interval: Interval,
+                  n: int,
+                  forward: bool,
+                  limit: datetime.datetime | None = None) -> Interval | None:
+        return self.shift._repeated(interval, self.n * n, forward, limit)
 
 
 @_dataclass
@@ -700,6 +1810,10 @@ class ShiftUnion(Shift):
     """
     shifts: typing.Iterable[Shift]
     span: (int, int) = dataclasses.field(default=None, repr=False)
+    trigger_span: (int, int) = dataclasses.field(
+        default=None, repr=False, compare=False, kw_only=True)
+    unit: Unit = dataclasses.field(init=False, repr=False, compare=False)
+    range: Unit = dataclasses.field(init=False, repr=False, compare=False)
 
     def __post_init__(self):
         self.unit = min(o.unit for o in self.shifts)
@@ -713,6 +1827,36 @@ class ShiftUnion(Shift):
         return min((other + shift for shift in self.shifts),
                    key=lambda i: (i.start, i.start - i.end))
 
+    def _rsub_many(self, points: numpy.ndarray) -> \
+            tuple[numpy.ndarray, numpy.ndarray]:
+        # like __rsub__, take the latest end, then the longest interval
+        best_starts = best_ends = None
+        for shift in self.shifts:
+            starts, ends = shift._rsub_many(points)
+            if best_starts is None:
+                best_starts, best_ends = starts, ends
+            else:
+                better = (ends > best_ends) | ((ends == best_ends) &
+                                              (starts < best_starts))
+                best_starts = numpy.where(better, starts, best_starts)
+                best_ends = numpy.where(better, ends, best_ends)
+        return best_starts, best_ends
+
+    def _radd_many(self, points: numpy.ndarray) -> \
+            tuple[numpy.ndarray, numpy.ndarray]:
+        # like __radd__, take the earliest start, then the longest interval
+        best_starts = best_ends = None
+        for shift in self.shifts:
+            starts, ends = shift._radd_many(points)
+            if best_starts is None:
+                best_starts, best_ends = starts, ends
+            else:
+                better = (starts < best_starts) | ((starts == best_starts) &
+                                                   (ends > best_ends))
+                best_starts = numpy.where(better, starts, best_starts)
+                best_ends = numpy.where(better, ends, best_ends)
+        return best_starts, best_ends
+
 
 @_dataclass
 class RepeatingIntersection(Shift):
@@ -726,6 +1870,19 @@ class RepeatingIntersection(Shift):
     """
     shifts: typing.Iterable[Repeating]
     span: (int, int) = dataclasses.field(default=None, repr=False)
+    trigger_span: (int, int) = dataclasses.field(
+        default=None, repr=False, compare=False, kw_only=True)
+    # derived from the shifts by __post_init__
+    rrule_kwargs: dict = dataclasses.field(init=False, repr=False,
+                                           compare=False)
+    min_period: Period = dataclasses.field(init=False, repr=False,
+                                           compare=False)
+    rrule_period: Period = dataclasses.field(init=False, repr=False,
+                                             compare=False)
+    non_rrule_period: Period = dataclasses.field(init=False, repr=False,
+                                                 compare=False)
+    unit: Unit = dataclasses.field(init=False, repr=False, compare=False)
+    range: Unit = dataclasses.field(init=False, repr=False, compare=False)
 
     def _iter_shifts(self) -> typing.Iterator[Repeating]:
         for shift in self.shifts:
@@ -767,17 +1924,12 @@ class RepeatingIntersection(Shift):
             return Interval(None, None)
         start = self.min_period.unit.truncate(other)
         if self.rrule_period is not None:
-            # HACK: rrule requires a starting point even when going backwards.
-            # So we use a big one, but this is inefficient
-            dtstart = start - Unit.YEAR.relativedelta(100)
-            while True:
-                # find the start and interval using the rrule
-                rrule = dateutil.rrule.rrule(dtstart=dtstart,
-                                             **self.rrule_kwargs)
-                start = rrule.before(start, inc=True)
-                if start is None:
-                    raise ValueError(f"no {self.rrule_kwargs} between "
-                                     f"{dtstart} and {start}")
+            # rrule requires a starting point even when going backwards.
+            # So we use a big one, but search backwards from the start, so that
+            # only the occurrences between the answer and the start are seen
+            dtstart = start - Unit.YEAR.delta(100)
+            for start in _iter_rrule_before(self.rrule_kwargs, dtstart,
+                                            start, self.range):
                 interval = start + self.rrule_period
 
                 # subtract off any non-rrule period
@@ -786,7 +1938,7 @@ class RepeatingIntersection(Shift):
 
                     # if outside the valid range of the rrule, move back in
                     if interval.start < self.rrule_period.unit.truncate(start):
-                        delta = self.rrule_period.unit.relativedelta
+                        delta = self.rrule_period.unit.delta
                         interval = Interval(
                             interval.start + delta(self.rrule_period.n),
                             interval.end + delta(self.rrule_period.n))
@@ -794,7 +1946,9 @@ class RepeatingIntersection(Shift):
                 # start is guaranteed to be before other by rrule; end is not
                 if interval.end <= other:
                     break
-                start -= Unit.MICROSECOND.relativedelta(1)
+            else:
+                raise ValueError(f"no {self.rrule_kwargs} between "
+                                 f"{dtstart} and {other}")
         elif self.non_rrule_period is not None:
             interval = start - self.non_rrule_period
         else:
@@ -807,15 +1961,29 @@ class RepeatingIntersection(Shift):
             return Interval(None, None)
         start = self.min_period.unit.truncate(other)
         if start < other:
-            start += self.min_period.unit.relativedelta(self.min_period.n)
+            start += self.min_period.unit.delta(self.min_period.n)
         if self.rrule_period is not None:
-            rrule = dateutil.rrule.rrule(dtstart=start, **self.rrule_kwargs)
-            start = rrule.after(start, inc=True)
+            start = _rrule(self.rrule_kwargs, start).after(start, inc=True)
             if start is None:
                 raise ValueError(f"no {self.rrule_kwargs} between "
                                  f"{start} and {other}")
         return start + self.min_period
 
+    def _radd_many(self, points: numpy.ndarray) -> \
+            tuple[numpy.ndarray, numpy.ndarray]:
+        if self.unit is None:
+            nats = numpy.full(points.shape, _NAT)
+            return nats, nats.copy()
+        starts = self.min_period.unit.truncate_many(points)
+        later = starts < points
+        starts[later] = _add_many(self.min_period.unit, starts[later],
+                                  self.min_period.n)
+        if self.rrule_period is None:
+            return self.min_period._radd_many(starts)
+        # the result depends only on the adjusted start, so only run the
+        # rrule once for all the points that share an adjusted start
+        return _scalar_many(self.__radd__, points, keys=starts)
+
 
 _RepeatingLike = Repeating | ShiftUnion | RepeatingIntersection
 _PeriodLike = Period | PeriodSum
@@ -840,7 +2008,8 @@ class Year(Interval):
     n_missing_digits: int = 0
     start: datetime.datetime | None = dataclasses.field(init=False, repr=False)
     end: datetime.datetime | None = dataclasses.field(init=False, repr=False)
-    span: (int, int) = dataclasses.field(default=None, repr=False)
+    span: (int, int) = dataclasses.field(default=None, repr=False,
+                                         kw_only=True)
 
     def __post_init__(self):
         duration_in_years = 10 ** self.n_missing_digits
@@ -872,18 +2041,236 @@ class YearSuffix(Interval):
     n_missing_digits: int = 0
     start: datetime.datetime | None = dataclasses.field(init=False, repr=False)
     end: datetime.datetime | None = dataclasses.field(init=False, repr=False)
-    span: (int, int) = dataclasses.field(default=None, repr=False)
+    span: (int, int) = dataclasses.field(default=None, repr=False,
+                                         kw_only=True)
+
+    def __post_init__(self):
+        if self.interval.start is None:
+            self.start = self.end = None
+        else:
+            n_digits = len(str(self.digits))
+            divider = 10 ** (n_digits + self.n_missing_digits)
+            multiplier = 10 ** n_digits
+            year = self.interval.start.year
+            digits = year // divider * multiplier + self.digits
+            self.start, self.end = Year(digits, self.n_missing_digits)
+
+
+_CacheInfo = collections.namedtuple(
+    "CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+class _EvaluationCache:
+    """
+    A bounded least-recently-used cache of operator starts and ends, keyed on
+    the structure of the operators.
+    """
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._results = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = self._misses = 0
+
+    def get(self, key: tuple):
+        with self._lock:
+            result = self._results.get(key)
+            if result is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+                self._results.move_to_end(key)
+            return result
+
+    def put(self, key: tuple, result: tuple):
+        with self._lock:
+            self._results[key] = result
+            self._results.move_to_end(key)
+            if len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+
+    def cache_info(self) -> _CacheInfo:
+        """
+        :return: A named tuple of hits, misses, maxsize and currsize, as for
+            :func:`functools.lru_cache`
+        """
+        with self._lock:
+            return _CacheInfo(self._hits, self._misses,
+                              self.maxsize, len(self._results))
+
+    def cache_clear(self):
+        """
+        Clears the cache and resets its statistics.
+        """
+        with self._lock:
+            self._results.clear()
+            self._hits = self._misses = 0
+
+
+# per context (e.g., per thread), so that a cache in one thread is not used by
+# another
+_evaluation_cache: contextvars.ContextVar[_EvaluationCache | None] = \
+    contextvars.ContextVar("_evaluation_cache", default=None)
+
+
+@contextlib.contextmanager
+def evaluation_cache(maxsize: int = 4096) -> \
+        typing.Iterator[_EvaluationCache]:
+    """
+    Caches the starts and ends calculated by operators such as :class:`Last`,
+    :class:`This` and :class:`Between` within a with-block, so that operators
+    with the same inputs are only evaluated once.
+    For example, when many documents share a document creation time::
+
+        with evaluation_cache() as cache:
+            for xml_path in xml_paths:
+                root = et.parse(xml_path).getroot()
+                objs = from_xml(root, known_intervals={(None, None): dct})
+        print(cache.cache_info())
+
+    Operators are matched on their classes, their parameters, their Shifts and
+    the starts and ends of their input intervals.
+    The cache is only used by the thread (or :mod:`contextvars` context) that
+    entered the with-block.
+
+    :param maxsize: The maximum number of evaluations to keep, after which the
+        least recently used is dropped
+    :return: A context manager that yields the cache, which supports
+        :code:`cache_info()` and :code:`cache_clear()` as for
+        :func:`functools.lru_cache`
+    """
+    cache = _EvaluationCache(maxsize)
+    token = _evaluation_cache.set(cache)
+    try:
+        yield cache
+    finally:
+        _evaluation_cache.reset(token)
+
+
+def _structural_key(obj: typing.Any) -> typing.Hashable:
+    """
+    Creates a hashable key that is equal for objects that are evaluated the
+    same way.
+    For intervals, only the start and end matter; for other objects (e.g.,
+    Shifts), their classes and all of their fields other than spans matter.
+    """
+    match obj:
+        case Interval():
+            return obj.start, obj.end
+        case list() | tuple():
+            return tuple(_structural_key(o) for o in obj)
+        case collections.abc.Mapping():
+            return tuple(sorted((k, _structural_key(v))
+                                for k, v in obj.items()))
+        case _ if dataclasses.is_dataclass(obj):
+            return _fields_key(obj)
+        case _:
+            return obj
+
+
+def _fields_key(obj: typing.Any) -> tuple:
+    """
+    Creates a hashable key from the class of a dataclass object and the
+    structural keys of all its fields other than its spans.
+    """
+    return (obj.__class__,) + tuple(
+        _structural_key(getattr(obj, field.name))
+        for field in dataclasses.fields(obj)
+        if field.init and field.name not in _SPAN_FIELDS)
+
+
+_SPAN_FIELDS = frozenset(["span", "trigger_span"])
+
+
+def _evaluate(op: "_EvaluatedInterval") -> \
+        tuple[datetime.datetime | None, datetime.datetime | None]:
+    """
+    Calculates the start and end of an operator, using the evaluation cache if
+    one is active.
+    """
+    cache = _evaluation_cache.get()
+    key = None
+    if cache is not None:
+        key = _fields_key(op)
+        try:
+            hash(key)
+        except TypeError:
+            key = None  # e.g., a field that is an unhashable custom object
+    if key is None:
+        start, end = op._evaluate()
+    else:
+        result = cache.get(key)
+        if result is None:
+            result = tuple(op._evaluate())
+            cache.put(key, result)
+        start, end = result
+    return start, end
+
+
+# per context (e.g., per thread), like _evaluation_cache
+_lazy_evaluation: contextvars.ContextVar[bool] = \
+    contextvars.ContextVar("_lazy_evaluation", default=False)
+
+
+@contextlib.contextmanager
+def lazy_evaluation() -> typing.Iterator[None]:
+    """
+    Defers the calculation of the starts and ends of operators such as
+    :class:`Last`, :class:`This` and :class:`Between` that are created within a
+    with-block until the start or end is first accessed.
+    For example, to read only the structure of the operators in an XML
+    document, without evaluating them::
+
+        with lazy_evaluation():
+            objs = from_xml(et.parse(xml_path).getroot())
+
+    Note that any errors in evaluating an operator are also deferred until the
+    start or end is first accessed.
+    Only operators created by the thread (or :mod:`contextvars` context) that
+    entered the with-block are deferred.
+    """
+    token = _lazy_evaluation.set(True)
+    try:
+        yield
+    finally:
+        _lazy_evaluation.reset(token)
+
+
+class _EvaluatedInterval(Interval):
+    """
+    A base class for intervals whose start and end are calculated from their
+    other fields.
+    """
+    __slots__ = ()
 
     def __post_init__(self):
-        n_digits = len(str(self.digits))
-        divider = 10 ** (n_digits + self.n_missing_digits)
-        multiplier = 10 ** n_digits
-        digits = self.interval.start.year // divider * multiplier + self.digits
-        self.start, self.end = Year(digits, self.n_missing_digits)
+        if not _lazy_evaluation.get():
+            self.start, self.end = _evaluate(self)
+
+    def __getattr__(self, name: str):
+        # only called when the start or end was deferred by lazy_evaluation
+        if name not in {"start", "end"}:
+            raise AttributeError(f"{self.__class__.__name__!r} object has no "
+                                 f"attribute {name!r}")
+        start, end = _evaluate(self)
+        # keep any start or end that was explicitly set since construction;
+        # object.__getattribute__ raises instead of calling __getattr__
+        for field_name, value in [("start", start), ("end", end)]:
+            try:
+                object.__getattribute__(self, field_name)
+            except AttributeError:
+                setattr(self, field_name, value)
+        return object.__getattribute__(self, name)
+
+    def _evaluate(self) -> tuple[datetime.datetime | None,
+                                 datetime.datetime | None]:
+        """
+        Calculates the start and end of the interval from its other fields.
+        """
+        raise NotImplementedError
 
 
 @_dataclass
-class _IntervalOp(Interval):
+class _IntervalOp(_EvaluatedInterval):
     """
     A base class for operators that take in an Interval and a Shift and produce
     an Interval.
@@ -920,21 +2307,21 @@ class Last(_IntervalOp):
              interval_included=True)
     """
     interval_included: bool = False
-    span: (int, int) = dataclasses.field(default=None, repr=False)
+    span: (int, int) = dataclasses.field(default=None, repr=False,
+                                         kw_only=True)
 
-    def __post_init__(self):
+    def _evaluate(self) -> tuple[datetime.datetime | None,
+                                 datetime.datetime | None]:
         if not self.interval.is_defined():
-            self.start = None
-            self.end = None
+            return None, None
         elif self.shift is None:
-            self.start = None
-            self.end = self.interval.start
+            return None, self.interval.start
         else:
             if self.interval_included:
                 start = self.interval.end
             else:
                 start = self.interval.start
-            self.start, self.end = start - self.shift
+            return start - self.shift
 
 
 @_dataclass
@@ -956,25 +2343,25 @@ class Next(_IntervalOp):
     interval to start as early as the start of the input interval.
     """
     interval_included: bool = False
-    span: (int, int) = dataclasses.field(default=None, repr=False)
+    span: (int, int) = dataclasses.field(default=None, repr=False,
+                                         kw_only=True)
 
-    def __post_init__(self):
+    def _evaluate(self) -> tuple[datetime.datetime | None,
+                                 datetime.datetime | None]:
         if not self.interval.is_defined():
-            self.start = None
-            self.end = None
+            return None, None
         elif self.shift is None:
-            self.start = self.interval.end
-            self.end = None
+            return self.interval.end, None
         else:
             if self.interval_included:
                 end = self.interval.start
                 # to allow repeating intervals to start with our start,
                 # subtract a tiny amount
                 if isinstance(self.shift, _RepeatingLike):
-                    end -= Unit.MICROSECOND.relativedelta(1)
+                    end -= Unit.MICROSECOND.delta(1)
             else:
                 end = self.interval.end
-            self.start, self.end = end + self.shift
+            return end + self.shift
 
 
 @_dataclass
@@ -998,31 +2385,30 @@ class Before(_IntervalOp):
     """
     n: int = 1
     interval_included: bool = False
-    span: (int, int) = dataclasses.field(default=None, repr=False)
+    span: (int, int) = dataclasses.field(default=None, repr=False,
+                                         kw_only=True)
 
-    def __post_init__(self):
+    def _evaluate(self) -> tuple[datetime.datetime | None,
+                                 datetime.datetime | None]:
         if not self.interval.is_defined():
-            self.start = None
-            self.end = None
+            return None, None
         elif isinstance(self.shift, _RepeatingLike):
             if self.interval_included:
                 start = self.interval.end
             else:
                 start = self.interval.start
-            for i in range(self.n - 1):
-                start = (start - self.shift).start
-            self.start, self.end = start - self.shift
+            return self.shift.rsub_repeated(start, self.n)
         elif isinstance(self.shift, _PeriodLike):
             if self.interval_included:
                 raise ValueError("interval_included=True cannot be used "
                                  "with Periods")
-            self.start, self.end = self.interval
-            for i in range(self.n):
-                self.start = (self.start - self.shift).start
-                self.end = (self.end - self.shift).start
+            start, end = self.interval
+            if self.n > 0:
+                start = self.shift.rsub_repeated(start, self.n).start
+                end = self.shift.rsub_repeated(end, self.n).start
+            return start, end
         elif self.shift is None:
-            self.start = None
-            self.end = self.interval.start
+            return None, self.interval.start
         else:
             raise NotImplementedError
 
@@ -1049,31 +2435,30 @@ class After(_IntervalOp):
     """
     n: int = 1
     interval_included: bool = False
-    span: (int, int) = dataclasses.field(default=None, repr=False)
+    span: (int, int) = dataclasses.field(default=None, repr=False,
+                                         kw_only=True)
 
-    def __post_init__(self):
+    def _evaluate(self) -> tuple[datetime.datetime | None,
+                                 datetime.datetime | None]:
         if not self.interval.is_defined():
-            self.start = None
-            self.end = None
+            return None, None
         elif isinstance(self.shift, _RepeatingLike):
             # to allow repeating intervals to overlap start with our start,
             # subtract a tiny amount
-            end = self.interval.start - Unit.MICROSECOND.relativedelta(
-                1) if self.interval_included else self.interval.end
-            for i in range(self.n - 1):
-                end = (end + self.shift).end
-            self.start, self.end = end + self.shift
+            end = self.interval.start - Unit.MICROSECOND.delta(1) \
+                if self.interval_included else self.interval.end
+            return self.shift.radd_repeated(end, self.n)
         elif isinstance(self.shift, _PeriodLike):
             if self.interval_included:
                 raise ValueError("interval_included=True cannot be used "
                                  "with Periods")
-            self.start, self.end = self.interval
-            for i in range(self.n):
-                self.start = (self.start + self.shift).end
-                self.end = (self.end + self.shift).end
+            start, end = self.interval
+            if self.n > 0:
+                start = self.shift.radd_repeated(start, self.n).end
+                end = self.shift.radd_repeated(end, self.n).end
+            return start, end
         elif self.shift is None:
-            self.start = self.interval.end
-            self.end = None
+            return self.interval.end, None
         else:
             raise NotImplementedError
 
@@ -1102,13 +2487,14 @@ class Nth(_IntervalOp):
     """
     index: int
     from_end: bool = False
-    span: (int, int) = dataclasses.field(default=None, repr=False)
+    span: (int, int) = dataclasses.field(default=None, repr=False,
+                                         kw_only=True)
 
-    def __post_init__(self):
+    def _evaluate(self) -> tuple[datetime.datetime | None,
+                                 datetime.datetime | None]:
         if self.shift is None or (self.from_end and self.interval.end is None) \
                 or (not self.from_end and self.interval.start is None):
-            self.start = None
-            self.end = None
+            return None, None
         else:
             point = self.interval.end if self.from_end else self.interval.start
             # to allow repeating intervals to overlap start with our start,
@@ -1116,23 +2502,34 @@ class Nth(_IntervalOp):
             if isinstance(self.shift, _RepeatingLike) \
                     and not self.from_end \
                     and not point == datetime.datetime.min:
-                point -= Unit.MICROSECOND.relativedelta(1)
-            for i in range(self.index - 1):
-                if self.from_end:
-                    point = (point - self.shift).start
-                else:
-                    point = (point + self.shift).end
+                point -= Unit.MICROSECOND.delta(1)
             if self.from_end:
-                interval = point - self.shift
+                interval = self.shift.rsub_repeated(point, self.index)
             else:
-                interval = point + self.shift
-            self.start, self.end = interval
-            if (self.start is not None and self.interval.start is not None and
-                self.start < self.interval.start) or \
-                    (self.end is not None and self.interval.end is not None and
-                     self.end > self.interval.end):
-                raise ValueError(f"{self.isoformat()} is not within "
-                                 f"{self.interval.isoformat()}:\n{self}")
+                interval = self.shift.radd_repeated(point, self.index)
+            return self._within(interval)
+
+    def _evaluate_at(self, point: datetime.datetime) -> \
+            tuple[datetime.datetime | None, datetime.datetime | None]:
+        """
+        Applies the shift once to the point reached after the repetitions
+        before the index, and checks that the result is within the interval.
+        """
+        if self.from_end:
+            return self._within(point - self.shift)
+        else:
+            return self._within(point + self.shift)
+
+    def _within(self, interval: Interval) -> \
+            tuple[datetime.datetime | None, datetime.datetime | None]:
+        start, end = interval
+        if (start is not None and self.interval.start is not None and
+            start < self.interval.start) or \
+                (end is not None and self.interval.end is not None and
+                 end > self.interval.end):
+            raise ValueError(f"{interval.isoformat()} is not within "
+                             f"{self.interval.isoformat()}:\n{self}")
+        return start, end
 
 
 @_dataclass
@@ -1156,34 +2553,35 @@ class This(_IntervalOp):
     shift: Shift
     start: datetime.datetime | None = dataclasses.field(init=False, repr=False)
     end: datetime.datetime | None = dataclasses.field(init=False, repr=False)
-    span: (int, int) = dataclasses.field(default=None, repr=False)
+    span: (int, int) = dataclasses.field(default=None, repr=False,
+                                         kw_only=True)
 
-    def __post_init__(self):
+    def _evaluate(self) -> tuple[datetime.datetime | None,
+                                 datetime.datetime | None]:
         if not self.interval.is_defined() or self.shift is None:
-            self.start = None
-            self.end = None
+            return None, None
         elif isinstance(self.shift, _RepeatingLike):
             if self.shift.range is None:
-                self.start = self.end = None
+                return None, None
             else:
                 start = self.shift.range.truncate(self.interval.start)
-                start -= Unit.MICROSECOND.relativedelta(1)
-                self.start, self.end = start + self.shift
-                if (self.end + self.shift).end < self.interval.end:
+                start -= Unit.MICROSECOND.delta(1)
+                start, end = start + self.shift
+                if (end + self.shift).end < self.interval.end:
                     raise ValueError(f"there is more than one {self.shift} in "
                                      f"{self.interval.isoformat()}")
+                return start, end
         elif isinstance(self.shift, _PeriodLike):
             if self.shift.unit is None or self.shift.n is None:
-                self.start = self.end = None
+                return None, None
             else:
-                interval = self.shift.unit.expand(self.interval, self.shift.n)
-                self.start, self.end = interval
+                return self.shift.unit.expand(self.interval, self.shift.n)
         else:
             raise NotImplementedError
 
 
 @_dataclass
-class Between(Interval):
+class Between(_EvaluatedInterval):
     """
     Selects the interval between a start and an end interval.
     For example, "since 1994" written on 09 Jan 2007 and interpreted as
@@ -1207,30 +2605,32 @@ class Between(Interval):
     end_included: bool = False
     start: datetime.datetime | None = dataclasses.field(init=False, repr=False)
     end: datetime.datetime | None = dataclasses.field(init=False, repr=False)
-    span: (int, int) = dataclasses.field(default=None, repr=False)
+    span: (int, int) = dataclasses.field(default=None, repr=False,
+                                         kw_only=True)
 
-    def __post_init__(self):
+    def _evaluate(self) -> tuple[datetime.datetime | None,
+                                 datetime.datetime | None]:
         if not self.start_interval.is_defined() or \
                 not self.end_interval.is_defined():
-            self.start = None
-            self.end = None
+            return None, None
         else:
             if self.start_included:
-                self.start = self.start_interval.start
+                start = self.start_interval.start
             else:
-                self.start = self.start_interval.end
+                start = self.start_interval.end
             if self.end_included:
-                self.end = self.end_interval.end
+                end = self.end_interval.end
             else:
-                self.end = self.end_interval.start
-            if self.end < self.start:
+                end = self.end_interval.start
+            if end < start:
                 start_iso = self.start_interval.isoformat()
                 end_iso = self.end_interval.isoformat()
                 raise ValueError(f"{start_iso} is not before {end_iso}")
+            return start, end
 
 
 @_dataclass
-class Intersection(Interval):
+class Intersection(_EvaluatedInterval):
     """
     Selects the interval in which all given intervals overlap.
     For example, "Earlier that day" in the context of "We met at 6:00 on 24 Jan
@@ -1243,29 +2643,55 @@ class Intersection(Interval):
     intervals: typing.Iterable[Interval]
     start: datetime.datetime | None = dataclasses.field(init=False, repr=False)
     end: datetime.datetime | None = dataclasses.field(init=False, repr=False)
-    span: (int, int) = dataclasses.field(default=None, repr=False)
+    span: (int, int) = dataclasses.field(default=None, repr=False,
+                                         kw_only=True)
 
-    def __post_init__(self):
+    def _evaluate(self) -> tuple[datetime.datetime | None,
+                                 datetime.datetime | None]:
         if any(i.start is None and i.end is None for i in self.intervals):
-            self.start = self.end = None
+            start = end = None
         else:
             starts = (i.start for i in self.intervals if i.start is not None)
             ends = (i.end for i in self.intervals if i.end is not None)
-            self.start = max(starts, default=None)
-            self.end = min(ends, default=None)
-        if self.start is not None and self.end is not None and \
-                self.start >= self.end:
-            raise ValueError(f"{self.start.isoformat()} is not before "
-                             f"{self.end.isoformat()}")
+            start = max(starts, default=None)
+            end = min(ends, default=None)
+        if start is not None and end is not None and start >= end:
+            raise ValueError(f"{start.isoformat()} is not before "
+                             f"{end.isoformat()}")
+        return start, end
 
 
 class Intervals(collections.abc.Iterable[Interval], abc.ABC):
     """
     A collection of intervals on the timeline.
     """
+    __slots__ = ()
+
     def isoformats(self) -> list[str]:
         return [interval.isoformat() for interval in self]
 
+    def islice(self, start: int, stop: int | None = None) -> \
+            typing.Iterator[Interval]:
+        """
+        Lazily iterates over the intervals with indexes from start up to, but
+        not including, stop, like :func:`itertools.islice`.
+        Where possible, this jumps directly to the interval at index start,
+        rather than generating all the intervals before it.
+
+        :param start: The index of the first interval to generate
+        :param stop: The index after the last interval to generate, or None to
+            generate all remaining intervals
+        :return: An iterator over the selected intervals
+        """
+        if start < 0 or (stop is not None and stop < 0):
+            raise ValueError(f"indexes must be non-negative, found "
+                             f"start={start} and stop={stop}")
+        n = None if stop is None else max(stop - start, 0)
+        return itertools.islice(self._iter_from(start), n)
+
+    def _iter_from(self, index: int) -> typing.Iterator[Interval]:
+        return itertools.islice(self, index, None)
+
 
 @_dataclass
 class _N(Intervals):
@@ -1306,6 +2732,8 @@ class LastN(_N):
     """
     base_class: type = Last
     span: (int, int) = dataclasses.field(default=None, repr=False)
+    trigger_span: (int, int) = dataclasses.field(
+        default=None, repr=False, compare=False, kw_only=True)
 
     def _adjust_for_n_none(self, interval: Interval):
         interval.start = None
@@ -1322,6 +2750,8 @@ class NextN(_N):
     """
     base_class: type = Next
     span: (int, int) = dataclasses.field(default=None, repr=False)
+    trigger_span: (int, int) = dataclasses.field(
+        default=None, repr=False, compare=False, kw_only=True)
 
     def _adjust_for_n_none(self, interval: Interval):
         interval.end = None
@@ -1342,13 +2772,29 @@ class NthN(Intervals):
     n: int
     from_end: bool = False
     span: (int, int) = dataclasses.field(default=None, repr=False)
+    trigger_span: (int, int) = dataclasses.field(
+        default=None, repr=False, compare=False, kw_only=True)
 
     def __iter__(self) -> typing.Iterator[Interval]:
+        return self._iter_from(0)
+
+    def _iter_from(self, index: int) -> typing.Iterator[Interval]:
         n = 2 if self.n is None else self.n
         start = 1 + (self.index - 1) * n
-        for index in range(start, start + n):
-            interval = Nth(self.interval, self.shift, index,
-                           from_end=self.from_end)
+        previous = None
+        for index in range(start + index, start + n):
+            with lazy_evaluation():
+                interval = Nth(self.interval, self.shift, index,
+                               from_end=self.from_end)
+            if previous is None or not previous.is_defined():
+                # skip to the first Nth (or any undefined one) from the
+                # interval start or end
+                interval.start, interval.end = _evaluate(interval)
+            else:
+                # continue each later Nth from the previous Nth
+                point = previous.start if self.from_end else previous.end
+                interval.start, interval.end = interval._evaluate_at(point)
+            previous = Interval(interval.start, interval.end)
             if self.n is None and index == start + 1:
                 if self.from_end:
                     interval.start = None
@@ -1372,6 +2818,8 @@ class These(Intervals):
     interval: Interval
     shift: Shift
     span: (int, int) = dataclasses.field(default=None, repr=False)
+    trigger_span: (int, int) = dataclasses.field(
+        default=None, repr=False, compare=False, kw_only=True)
 
     def __post_init__(self):
         if not self.interval.is_defined() or self.shift is None:
@@ -1385,18 +2833,30 @@ class These(Intervals):
             start = range_unit.truncate(self.interval.start)
             end = range_unit.truncate(self.interval.end)
             if end != self.interval.end:
-                _, end = end + Repeating(range_unit)
+                _, end = end + Repeating.shared(range_unit)
         self.interval = Interval(start, end)
 
     def __iter__(self) -> typing.Iterator[Interval]:
+        return self._iter_from(0)
+
+    def _iter_from(self, index: int) -> typing.Iterator[Interval]:
         # without a start, we can't find anything
         if self.interval.start is None:
-            yield Interval(None, None)
+            if index == 0:
+                yield Interval(None, None)
         # without an end, we would generate an infinite number of intervals
         elif self.interval.end is None:
-            yield Interval(None, None)
+            if index == 0:
+                yield Interval(None, None)
         else:
             interval = self.interval.start + self.shift
+            if index and interval.end is not None:
+                interval = self.shift._repeated(interval, index, forward=True,
+                                                limit=self.interval.end)
+                if interval is None:
+                    return
+            elif index:
+                return
             while True:
                 if interval.end is None:
                     yield Interval(None, None)
@@ -1407,6 +2867,599 @@ class These(Intervals):
                 interval = interval.end + self.shift
 
 
+class IntervalArray(Intervals):
+    """
+    A compact array of intervals, stored as a column of starts and a column of
+    ends, where NaT marks a missing start or end.
+    For example, the intervals for the days of 1 Jan 2000 and 1 Jan 2001 would
+    be represented as::
+
+        IntervalArray.from_intervals([Interval.of(2000, 1, 1),
+                                      Interval.of(2001, 1, 1)])
+
+    The operator methods (e.g., :meth:`last`, :meth:`next`) apply the operator
+    of the same name to every interval at once.
+    """
+    def __init__(self, starts: typing.Any, ends: typing.Any):
+        """
+        :param starts: An array-like of interval starts, None or NaT if missing
+        :param ends: An array-like of interval ends, None or NaT if missing
+        """
+        self.starts = numpy.asarray(starts, dtype="datetime64[us]")
+        self.ends = numpy.asarray(ends, dtype="datetime64[us]")
+        if self.starts.ndim != 1 or self.starts.shape != self.ends.shape:
+            raise ValueError(f"starts and ends must be one-dimensional arrays "
+                             f"of the same length, found shapes "
+                             f"{self.starts.shape} and {self.ends.shape}")
+
+    @classmethod
+    def from_intervals(cls, intervals: typing.Iterable[Interval]):
+        """
+        Creates an IntervalArray from Interval objects.
+
+        :param intervals: The intervals
+        :return: An IntervalArray with the starts and ends of the intervals
+        """
+        intervals = list(intervals)
+        return cls([interval.start for interval in intervals],
+                   [interval.end for interval in intervals])
+
+    @classmethod
+    def fromisoformats(cls, strings: typing.Iterable[str]):
+        """
+        Creates an IntervalArray from strings in the format of
+        :meth:`Interval.isoformat`, i.e., two dates in ISO 8601 format, where
+        "..." marks a missing start or end.
+        The dates are parsed by numpy, without creating datetime objects.
+
+        :param strings: The strings, e.g., as produced by :meth:`isoformats`
+        :return: An IntervalArray of the starts and ends
+        """
+        strings = list(strings)
+        # one join and split is much faster than splitting each string
+        points = " ".join(strings).replace("...", "NaT").split()
+        if len(points) != 2 * len(strings):
+            raise ValueError(f"expected a start and an end in each string, "
+                             f"found {len(points)} dates in "
+                             f"{len(strings)} strings")
+        points = numpy.array(points, dtype="datetime64[us]")
+        return cls(points[0::2], points[1::2])
+
+    @classmethod
+    def from_bytes(cls, data: bytes):
+        """
+        Creates an IntervalArray from the binary encoding of :meth:`to_bytes`.
+
+        :param data: The encoded intervals
+        :return: An IntervalArray of the starts and ends
+        """
+        points = numpy.frombuffer(data, dtype="<i8")
+        if len(points) % 2:
+            raise ValueError(f"expected a start and an end for each interval, "
+                             f"found {len(points)} time points")
+        points = points.astype("datetime64[us]")
+        return cls(points[0::2], points[1::2])
+
+    def to_bytes(self) -> bytes:
+        """
+        Encodes the intervals compactly in binary: for each interval, its
+        start and its end as little-endian 64-bit integers counting
+        microseconds since 1970-01-01T00:00:00, with the minimum 64-bit integer
+        for a missing start or end.
+
+        :return: The encoded intervals
+        """
+        points = numpy.empty(2 * len(self), dtype="<i8")
+        points[0::2] = self.starts.view("int64")
+        points[1::2] = self.ends.view("int64")
+        return points.tobytes()
+
+    def to_intervals(self) -> list[Interval]:
+        """
+        Converts the IntervalArray back into Interval objects.
+
+        :return: A list of Intervals, with None for any missing starts or ends
+        """
+        return list(self)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __iter__(self) -> typing.Iterator[Interval]:
+        for start, end in zip(self.starts.astype(object),
+                              self.ends.astype(object)):
+            yield Interval(start, end)
+
+    def __getitem__(self, index):
+        if isinstance(index, int | numpy.integer):
+            start = self.starts[index]
+            end = self.ends[index]
+            return Interval(None if numpy.isnat(start) else start.item(),
+                            None if numpy.isnat(end) else end.item())
+        return IntervalArray(self.starts[index], self.ends[index])
+
+    def __repr__(self):
+        return f"{self.__class__.__qualname__}.from_intervals({list(self)!r})"
+
+    def is_defined(self) -> numpy.ndarray:
+        """
+        :return: A boolean array that is True where both the start and the end
+            are present
+        """
+        return ~numpy.isnat(self.starts) & ~numpy.isnat(self.ends)
+
+    def argsort(self) -> numpy.ndarray:
+        """
+        :return: The indices that would sort the intervals by start, then by
+            end, with missing starts and ends sorted last
+        """
+        return numpy.lexsort((self.ends, self.starts))
+
+    def sort(self):
+        """
+        :return: A copy of the IntervalArray sorted by start, then by end
+        """
+        return self[self.argsort()]
+
+    def isoformats(self) -> list[str]:
+        strings = []
+        for points in [self.starts, self.ends]:
+            # like datetime.isoformat, only include microseconds if non-zero
+            has_micros = (points - points.astype("datetime64[s]")) != \
+                numpy.timedelta64(0, "us")
+            column = numpy.datetime_as_string(points, unit="s")
+            if has_micros.any():
+                column = column.astype(object)
+                column[has_micros] = numpy.datetime_as_string(
+                    points[has_micros], unit="us")
+            column[numpy.isnat(points)] = "..."
+            # iterating over a list is much faster than over a numpy array
+            strings.append(column.tolist())
+        return [f"{start} {end}" for start, end in zip(*strings)]
+
+    def _defined_points(self, points: numpy.ndarray) -> numpy.ndarray:
+        # operators give missing intervals for intervals that are not defined
+        return numpy.where(self.is_defined(), points, _NAT)
+
+    def last(self, shift: Shift, interval_included: bool = False):
+        """
+        Applies :class:`Last` to each interval.
+
+        :param shift: The Shift to apply
+        :param interval_included: See :class:`Last`
+        :return: The resulting IntervalArray
+        """
+        if shift is None:
+            return IntervalArray(numpy.full(len(self), _NAT),
+                                 self._defined_points(self.starts))
+        points = self.ends if interval_included else self.starts
+        return IntervalArray(*shift.rsub_many(self._defined_points(points)))
+
+    def next(self, shift: Shift, interval_included: bool = False):
+        """
+        Applies :class:`Next` to each interval.
+
+        :param shift: The Shift to apply
+        :param interval_included: See :class:`Next`
+        :return: The resulting IntervalArray
+        """
+        if shift is None:
+            return IntervalArray(self._defined_points(self.ends),
+                                 numpy.full(len(self), _NAT))
+        if interval_included:
+            points = self.starts
+            # to allow repeating intervals to start with our start,
+            # subtract a tiny amount
+            if isinstance(shift, _RepeatingLike):
+                points = points - numpy.timedelta64(1, "us")
+        else:
+            points = self.ends
+        return IntervalArray(*shift.radd_many(self._defined_points(points)))
+
+    def before(self, shift: Shift, n: int = 1,
+               interval_included: bool = False):
+        """
+        Applies :class:`Before` to each interval.
+
+        :param shift: The Shift to apply
+        :param n: See :class:`Before`
+        :param interval_included: See :class:`Before`
+        :return: The resulting IntervalArray
+        """
+        if isinstance(shift, _RepeatingLike):
+            points = self.ends if interval_included else self.starts
+            points = self._defined_points(points)
+            for i in range(n - 1):
+                points, _ = shift.rsub_many(points)
+            return IntervalArray(*shift.rsub_many(points))
+        elif isinstance(shift, _PeriodLike):
+            if interval_included:
+                raise ValueError("interval_included=True cannot be used "
+                                 "with Periods")
+            starts = self._defined_points(self.starts)
+            ends = self._defined_points(self.ends)
+            for i in range(n):
+                starts, _ = shift.rsub_many(starts)
+                ends, _ = shift.rsub_many(ends)
+            return IntervalArray(starts, ends)
+        elif shift is None:
+            return IntervalArray(numpy.full(len(self), _NAT),
+                                 self._defined_points(self.starts))
+        else:
+            raise NotImplementedError
+
+    def after(self, shift: Shift, n: int = 1,
+              interval_included: bool = False):
+        """
+        Applies :class:`After` to each interval.
+
+        :param shift: The Shift to apply
+        :param n: See :class:`After`
+        :param interval_included: See :class:`After`
+        :return: The resulting IntervalArray
+        """
+        if isinstance(shift, _RepeatingLike):
+            # to allow repeating intervals to overlap start with our start,
+            # subtract a tiny amount
+            if interval_included:
+                points = self.starts - numpy.timedelta64(1, "us")
+            else:
+                points = self.ends
+            points = self._defined_points(points)
+            for i in range(n - 1):
+                _, points = shift.radd_many(points)
+            return IntervalArray(*shift.radd_many(points))
+        elif isinstance(shift, _PeriodLike):
+            if interval_included:
+                raise ValueError("interval_included=True cannot be used "
+                                 "with Periods")
+            starts = self._defined_points(self.starts)
+            ends = self._defined_points(self.ends)
+            for i in range(n):
+                _, starts = shift.radd_many(starts)
+                _, ends = shift.radd_many(ends)
+            return IntervalArray(starts, ends)
+        elif shift is None:
+            return IntervalArray(self._defined_points(self.ends),
+                                 numpy.full(len(self), _NAT))
+        else:
+            raise NotImplementedError
+
+    def this(self, shift: Shift):
+        """
+        Applies :class:`This` to each interval.
+
+        :param shift: The Shift to apply
+        :return: The resulting IntervalArray
+        """
+        defined = self.is_defined()
+        starts = numpy.full(len(self), _NAT)
+        ends = numpy.full(len(self), _NAT)
+        if shift is None:
+            pass
+        elif isinstance(shift, _RepeatingLike):
+            if shift.range is not None:
+                points = shift.range.truncate_many(self.starts[defined])
+                points -= numpy.timedelta64(1, "us")
+                starts[defined], ends[defined] = shift.radd_many(points)
+                _, next_ends = shift.radd_many(ends[defined])
+                if (next_ends < self.ends[defined]).any():
+                    raise ValueError(f"there is more than one {shift} in "
+                                     f"some intervals")
+        elif isinstance(shift, _PeriodLike):
+            if shift.unit is not None and shift.n is not None:
+                starts[defined], ends[defined] = _expand_many(
+                    shift.unit, self.starts[defined], self.ends[defined],
+                    shift.n)
+        else:
+            raise NotImplementedError
+        return IntervalArray(starts, ends)
+
+
+class Plan:
+    """
+    An Interval or Intervals tree compiled by :func:`compile_plan` into a flat
+    list of evaluation steps, which can be cheaply re-executed with a different
+    interval in place of one of the tree's leaves, typically the document
+    creation time.
+
+    Subtrees that do not depend on the replaced leaf are evaluated only once,
+    at compile time.
+    Each remaining node is evaluated by a single step, after the steps that
+    compute its inputs.
+    For :class:`Last`, :class:`Next`, :class:`Before`, :class:`After`,
+    :class:`This`, :class:`Between` and :class:`Intersection`, the step is a
+    primitive operation chosen at compile time from the operator's parameters,
+    e.g., subtracting the operator's Shift from a point, so no operators are
+    constructed or dispatched on when the Plan is executed.
+    Other nodes are evaluated on a new copy for each execution.
+
+    Executing a Plan never modifies it or the compiled tree, so a Plan may be
+    executed by multiple threads at once.
+    """
+
+    def __init__(self,
+                 registers: list,
+                 steps: list[tuple[typing.Callable, list, int]],
+                 result: int):
+        self._registers = registers
+        self._steps = steps
+        self._result = result
+
+    def __len__(self):
+        return len(self._steps)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(<{len(self)} steps>)"
+
+    def __call__(self, anchor: Interval) -> Interval | list[Interval]:
+        """
+        Evaluates the compiled tree with the given interval in place of the
+        anchor that the tree was compiled with.
+
+        :param anchor: The interval to use in place of the compiled anchor
+        :return: For an Interval tree, a plain Interval with the evaluated
+            start and end; for an Intervals tree, a list of plain Intervals
+        """
+        registers = self._registers.copy()
+        registers[0] = anchor
+        for step, refs, target in self._steps:
+            registers[target] = step(*[
+                registers[ref] if isinstance(ref, int)
+                else [registers[r] for r in ref]
+                for ref in refs])
+        result = registers[self._result]
+        if isinstance(result, Intervals):
+            return [Interval(i.start, i.end) for i in result]
+        return Interval(result.start, result.end)
+
+
+def _lower(op: _EvaluatedInterval) -> \
+        tuple[tuple[str, ...], typing.Callable[..., Interval]] | None:
+    """
+    Selects the primitive operation that evaluates an operator for its current
+    parameters, as used by :class:`Plan` steps.
+    Each operation must give the same result as the operator's _evaluate.
+
+    :return: The names of the operator's interval fields and a function from
+        their values to the operator's interval, or None if the operator has
+        no primitive operation and must instead be copied and evaluated.
+    """
+    epsilon = Unit.MICROSECOND.delta(1)
+    shift = getattr(op, "shift", None)
+    repeating = isinstance(shift, _RepeatingLike)
+    period = isinstance(shift, _PeriodLike)
+    match op:
+        case Last(shift=Shift(), interval_included=included):
+            rsub = shift.__rsub__
+
+            def step(interval):
+                if not interval.is_defined():
+                    return Interval(None, None)
+                return rsub(interval.end if included else interval.start)
+
+        case Next(shift=Shift(), interval_included=included):
+            radd = shift.__radd__
+            offset = epsilon if included and repeating else datetime.timedelta()
+
+            def step(interval):
+                if not interval.is_defined():
+                    return Interval(None, None)
+                elif included:
+                    return radd(interval.start - offset)
+                else:
+                    return radd(interval.end)
+
+        case Before(n=n, interval_included=included) if repeating:
+            rsub_repeated = shift.rsub_repeated
+
+            def step(interval):
+                if not interval.is_defined():
+                    return Interval(None, None)
+                start = interval.end if included else interval.start
+                return rsub_repeated(start, n)
+
+        case After(n=n, interval_included=included) if repeating:
+            radd_repeated = shift.radd_repeated
+
+            def step(interval):
+                if not interval.is_defined():
+                    return Interval(None, None)
+                elif included:
+                    return radd_repeated(interval.start - epsilon, n)
+                else:
+                    return radd_repeated(interval.end, n)
+
+        case Before(n=n, interval_included=False) if period:
+            rsub_repeated = shift.rsub_repeated
+
+            def step(interval):
+                if not interval.is_defined():
+                    return Interval(None, None)
+                elif n <= 0:
+                    return interval
+                return Interval(rsub_repeated(interval.start, n).start,
+                                rsub_repeated(interval.end, n).start)
+
+        case After(n=n, interval_included=False) if period:
+            radd_repeated = shift.radd_repeated
+
+            def step(interval):
+                if not interval.is_defined():
+                    return Interval(None, None)
+                elif n <= 0:
+                    return interval
+                return Interval(radd_repeated(interval.start, n).end,
+                                radd_repeated(interval.end, n).end)
+
+        case This() if repeating and shift.range is not None:
+            truncate = shift.range.truncate
+            radd = shift.__radd__
+
+            def step(interval):
+                if not interval.is_defined():
+                    return Interval(None, None)
+                start, end = radd(truncate(interval.start) - epsilon)
+                if radd(end).end < interval.end:
+                    raise ValueError(f"there is more than one {shift} in "
+                                     f"{interval.isoformat()}")
+                return Interval(start, end)
+
+        case This() if period and None not in (shift.unit, shift.n):
+            expand = shift.unit.expand
+            n = shift.n
+
+            def step(interval):
+                if not interval.is_defined():
+                    return Interval(None, None)
+                return expand(interval, n)
+
+        case Between(start_included=start_included,
+                     end_included=end_included):
+            def step(start_interval, end_interval):
+                if not start_interval.is_defined() or \
+                        not end_interval.is_defined():
+                    return Interval(None, None)
+                if start_included:
+                    start = start_interval.start
+                else:
+                    start = start_interval.end
+                if end_included:
+                    end = end_interval.end
+                else:
+                    end = end_interval.start
+                if end < start:
+                    start_iso = start_interval.isoformat()
+                    end_iso = end_interval.isoformat()
+                    raise ValueError(f"{start_iso} is not before {end_iso}")
+                return Interval(start, end)
+
+            return ("start_interval", "end_interval"), step
+
+        case Intersection():
+            def step(intervals):
+                if any(i.start is None and i.end is None for i in intervals):
+                    start = end = None
+                else:
+                    starts = (i.start for i in intervals if i.start is not None)
+                    ends = (i.end for i in intervals if i.end is not None)
+                    start = max(starts, default=None)
+                    end = min(ends, default=None)
+                if start is not None and end is not None and start >= end:
+                    raise ValueError(f"{start.isoformat()} is not before "
+                                     f"{end.isoformat()}")
+                return Interval(start, end)
+
+            return ("intervals",), step
+
+        case _:
+            return None
+    return ("interval",), step
+
+
+def _copy_step(node: Interval | Intervals,
+               names: list[str]) -> typing.Callable:
+    """
+    Creates a :class:`Plan` step that evaluates a new copy of the node with the
+    given fields replaced.
+    """
+    if isinstance(node, _EvaluatedInterval):
+        cls = node.__class__
+        # read the fields without evaluating the node, which may be a template
+        init_values = [(field.name, getattr(node, field.name))
+                       for field in dataclasses.fields(node) if field.init]
+
+        def step(*values):
+            op = object.__new__(cls)
+            for name, value in init_values:
+                setattr(op, name, value)
+            for name, value in zip(names, values):
+                setattr(op, name, value)
+            op.start, op.end = _evaluate(op)
+            return op
+    else:
+        # e.g., YearSuffix or These, which need their __post_init__
+        def step(*values):
+            return dataclasses.replace(node, **dict(zip(names, values)))
+    return step
+
+
+def compile_plan(tree: Interval | Intervals, anchor: Interval) -> Plan:
+    """
+    Compiles an Interval or Intervals tree into a :class:`Plan` that can be
+    cheaply re-evaluated with different intervals in place of the anchor.
+    For example, the same parsed expression "the first of next March" can be
+    evaluated for many document creation times::
+
+        dct = Interval.of(2024, 5, 17)
+        first_of_next_march = This(Next(dct, Repeating(MONTH, YEAR, value=3)),
+                                   Repeating(DAY, MONTH, value=1))
+        plan = compile_plan(first_of_next_march, dct)
+        plan(Interval.of(1998, 2, 13))
+
+    The operators' parameters, including their Shifts, are read when the tree
+    is compiled, so later changes to them do not affect the Plan.
+
+    :param tree: The tree to compile
+    :param anchor: The leaf interval object (identified by identity, not
+        equality) that will be replaced when the Plan is executed.
+        It must be reachable through the operators' fields, so it may not,
+        e.g., be the interval of a These, which replaces its interval with the
+        range containing it.
+    :return: The compiled Plan
+    """
+    registers = [anchor]
+    steps = []
+    node_registers = {id(anchor): 0}
+
+    def constant(node: typing.Any) -> int:
+        registers.append(node)
+        return len(registers) - 1
+
+    def visit(node: typing.Any) -> int | list[int] | None:
+        # returns the register(s) of the node, or None if it does not depend
+        # on the anchor and can be used as is
+        if isinstance(node, list | tuple):
+            refs = [visit(v) for v in node]
+            if all(ref is None for ref in refs):
+                return None
+            return [constant(v) if ref is None else ref
+                    for v, ref in zip(node, refs)]
+        elif id(node) in node_registers:
+            return node_registers[id(node)]
+        elif not isinstance(node, Interval | Intervals) or \
+                not dataclasses.is_dataclass(node):
+            return None
+        bindings = {}
+        for field in dataclasses.fields(node):
+            if field.init:
+                ref = visit(getattr(node, field.name))
+                if ref is not None:
+                    bindings[field.name] = ref
+        if not bindings:
+            node_registers[id(node)] = None
+            return None
+        lowered = None
+        if isinstance(node, _EvaluatedInterval):
+            lowered = _lower(node)
+        if lowered is not None:
+            names, step = lowered
+            refs = [bindings[name] if name in bindings
+                    else constant(getattr(node, name)) for name in names]
+        else:
+            names = list(bindings)
+            refs = list(bindings.values())
+            step = _copy_step(node, names)
+        steps.append((step, refs, constant(None)))
+        node_registers[id(node)] = len(registers) - 1
+        return len(registers) - 1
+
+    result = visit(tree)
+    if result is None:
+        raise ValueError(f"{anchor} does not occur in {tree}")
+    return Plan(registers, steps, result)
+
+
 def flatten(shift_or_interval: Shift | Interval) -> Shift | Interval:
     """
     Flattens any nested RepeatingIntersection objects.
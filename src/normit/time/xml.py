@@ -1,283 +1,352 @@
 import collections
+import copy
 import dataclasses
 import datetime
 import dateutil.relativedelta
+import functools
+import os
 import re
+import typing
 import xml.etree.ElementTree as et
 
 from .ops import *
 
+try:
+    import lxml.etree as lxml_etree
+except ImportError:
+    lxml_etree = None
 
-__all__ = ['from_xml', 'AnaforaXMLParsingError']
+
+__all__ = ['parse_xml', 'from_xml', 'iterparse_xml', 'AnaforaParser',
+           'Template', 'AnaforaXMLParsingError']
+
+
+def parse_xml(source: "str | os.PathLike | bytes",
+              backend: str = "etree") -> et.Element:
+    """
+    Parses a SCATE Anafora XML document, e.g., for :func:`from_xml`.
+
+    :param source: The path of a SCATE Anafora XML file, or its contents.
+    :param backend: The XML parser to use: "etree" for the standard library's
+        ElementTree, or "lxml" for lxml, if it is installed. Both produce
+        elements from which :func:`from_xml` reads identical objects.
+        lxml parses faster, but accessing its elements is slower, so
+        :func:`from_xml` is faster overall with ElementTree.
+    :return: The root <data> element of the document.
+    """
+    match backend:
+        case "lxml":
+            if lxml_etree is None:
+                raise ImportError("the lxml backend requires lxml")
+            # drop comments, which lxml, unlike ElementTree, would otherwise
+            # keep as children with non-string tags
+            parser = lxml_etree.XMLParser(remove_comments=True,
+                                          remove_pis=True)
+            if isinstance(source, bytes):
+                return lxml_etree.fromstring(source, parser)
+            return lxml_etree.parse(os.fspath(source), parser).getroot()
+        case "etree":
+            if isinstance(source, bytes):
+                return et.fromstring(source)
+            return et.parse(source).getroot()
+        case other:
+            raise ValueError(f"unknown backend {other!r}")
 
 
 def from_xml(elem: et.Element,
-             known_intervals: dict[(int, int), Interval] = None
-             ) -> list[Shift | Interval | Intervals]:
+             known_intervals: dict[(int, int), Interval] = None,
+             as_template: bool = False
+             ) -> "list[Shift | Interval | Intervals] | Template":
     """
-    Reads Intervals and Shifts from SCATE Anafora XML.
+    Reads Intervals and Shifts from SCATE Anafora XML, using a shared
+    :class:`AnaforaParser`.
 
-    :param elem: The root <data> element of a SCATE Anafora XML document.
+    :param elem: The root <data> element of a SCATE Anafora XML document,
+        e.g., as parsed by :func:`parse_xml`.
     :param known_intervals: A mapping from character offset spans to Intervals,
         representing intervals that are already known before parsing begins. The
         document creation time should be specified with the span (None, None).
-    :return: Intervals and Shifts corresponding to the XML definitions.
+    :param as_template: If True, read the document creation time as a
+        placeholder (ignoring any in known_intervals), and return a Template
+        that can be evaluated against many document creation times.
+    :return: Intervals and Shifts corresponding to the XML definitions, or a
+        Template of them if as_template is True.
     """
-    if known_intervals is None:
-        known_intervals = {}
-
-    @dataclasses.dataclass
-    class Number:
-        value: int | float
-        shift: Shift = None
-        span: (int, int) = dataclasses.field(default=None, repr=False)
-
-    @dataclasses.dataclass
-    class AMPM:
-        value: str
-        span: (int, int) = dataclasses.field(default=None, repr=False)
-
-    id_to_entity = {}
-    id_to_children = {}
-    id_to_n_parents = collections.Counter()
-    for entity in elem.findall(".//entity"):
-        entity_id = entity.findtext("id")
-        if entity_id in id_to_entity:
-            other = id_to_entity[entity_id]
-            raise ValueError(f"duplicate id {entity_id} on "
-                             f"{et.tostring(entity)} and {et.tostring(other)}")
-        id_to_entity[entity_id] = entity
-        id_to_children[entity_id] = set()
-        for prop in entity.find("properties"):
-            if prop.text and '@' in prop.text:
-                id_to_children[entity_id].add(prop.text)
-                id_to_n_parents[prop.text] += 1
-
-    # to avoid infinite loops below, remove non-existent entities
-    # (i.e., values that are not keys)
-    for key in id_to_children:
-        id_to_children[key].intersection_update(id_to_children.keys())
-
-    # topological sort
-    sorted_ids = {}
-    while id_to_children:
-        for key in list(id_to_children):
-            if not id_to_children[key]:
-                id_to_children.pop(key)
-                sorted_ids[key] = True
-        for key, values in id_to_children.items():
-            id_to_children[key] -= sorted_ids.keys()
-
-    id_to_obj = {}
-    for entity_id in sorted_ids:
-        entity = id_to_entity[entity_id]
-        sub_interval_id = entity.findtext("properties/Sub-Interval")
-        super_interval_id = entity.findtext("properties/Super-Interval")
+    return _PARSER.from_xml(elem, known_intervals, as_template)
+
+
+def iterparse_xml(source: "str | os.PathLike | typing.IO",
+                  known_intervals: dict[(int, int), Interval] = None
+                  ) -> typing.Iterator[Shift | Interval | Intervals]:
+    """
+    Reads Intervals and Shifts from a SCATE Anafora XML file, without reading
+    the whole file into memory, using a shared :class:`AnaforaParser`.
+
+    The file is read twice: first to count the references to each entity, and
+    then to create the object for each entity as soon as all the entities that
+    it refers to have been read. Objects that no other entity refers to are
+    yielded as soon as they are created, and elements are discarded once their
+    objects are created, so memory use is bounded by the objects that are still
+    waiting to be created or referred to, not by the size of the file.
+
+    :param source: The path of a SCATE Anafora XML file, or a seekable binary
+        file object containing one.
+    :param known_intervals: As for :func:`from_xml`.
+    :return: The same Intervals and Shifts as :func:`from_xml`, in the order
+        that they are completed rather than in the order of their references.
+    """
+    return _PARSER.iterparse_xml(source, known_intervals)
+
+
+@dataclasses.dataclass
+class _Number:
+    value: int | float
+    shift: Shift = None
+    span: (int, int) = dataclasses.field(default=None, repr=False)
+
+
+@dataclasses.dataclass
+class _AMPM:
+    value: str
+    span: (int, int) = dataclasses.field(default=None, repr=False)
+
+
+class AnaforaParser:
+    """
+    Reads Intervals and Shifts from SCATE Anafora XML documents.
+
+    The table that maps each type of entity to the method that reads it is
+    built once, when the parser is created, so a parser should be created once
+    and then reused for many documents. A parser keeps no state between
+    documents, and the evaluation settings it changes while reading (see
+    :func:`lazy_evaluation`) apply only to the current thread, so it may also
+    be shared between threads.
+    """
+    def __init__(self):
+        self._entity_readers = {
+            "Period": self._read_period,
+            "Sum": self._read_sum,
+            "Year": self._read_year,
+            "Two-Digit-Year": self._read_two_digit_year,
+            "Month-Of-Year": self._read_month_of_year,
+            "Day-Of-Month": self._read_day_of_month,
+            "Day-Of-Week": self._read_day_of_week,
+            "AMPM-Of-Day": self._read_am_pm_of_day,
+            "Hour-Of-Day": self._read_hour_of_day,
+            "Minute-Of-Hour": self._read_minute_of_hour,
+            "Second-Of-Minute": self._read_second_of_minute,
+            "Season-Of-Year": self._read_named_repeating,
+            "Part-Of-Day": self._read_named_repeating,
+            "Part-Of-Week": self._read_named_repeating,
+            "Calendar-Interval": self._read_calendar_interval,
+            "Union": self._read_union,
+            "Every-Nth": self._read_every_nth,
+            "Last": self._read_offset_operator,
+            "Next": self._read_offset_operator,
+            "Before": self._read_offset_operator,
+            "After": self._read_offset_operator,
+            "NthFromEnd": self._read_offset_operator,
+            "NthFromStart": self._read_offset_operator,
+            "This": self._read_this,
+            "Between": self._read_between,
+            "Intersection": self._read_intersection,
+            "Number": self._read_number,
+            "Event": self._read_event,
+            # TODO: handle time zones, modifiers, and frequencies
+            "Time-Zone": self._read_unsupported,
+            "Modifier": self._read_unsupported,
+            "Frequency": self._read_unsupported,
+            "NotNormalizable": self._read_unsupported,
+            "PreAnnotation": self._read_unsupported,
+        }
+
+    def from_xml(self,
+                 elem: et.Element,
+                 known_intervals: dict[(int, int), Interval] = None,
+                 as_template: bool = False
+                 ) -> "list[Shift | Interval | Intervals] | Template":
+        """
+        Reads Intervals and Shifts from SCATE Anafora XML.
+
+        :param elem: As for :func:`from_xml`.
+        :param known_intervals: As for :func:`from_xml`.
+        :param as_template: As for :func:`from_xml`.
+        :return: As for :func:`from_xml`.
+        """
+        if known_intervals is None:
+            known_intervals = {}
+        if not as_template:
+            return self._from_xml(elem, known_intervals, None)
+        doc_time = Interval(None, None)
+        # the placeholder has no start or end, so defer evaluation until
+        # binding
+        with lazy_evaluation():
+            objects = self._from_xml(elem, known_intervals, doc_time)
+        return Template(objects, doc_time)
+
+    def iterparse_xml(self,
+                      source: "str | os.PathLike | typing.IO",
+                      known_intervals: dict[(int, int), Interval] = None
+                      ) -> typing.Iterator[Shift | Interval | Intervals]:
+        """
+        Reads Intervals and Shifts from a SCATE Anafora XML file, without
+        reading the whole file into memory.
+
+        :param source: As for :func:`iterparse_xml`.
+        :param known_intervals: As for :func:`from_xml`.
+        :return: As for :func:`iterparse_xml`.
+        """
+        if known_intervals is None:
+            known_intervals = {}
+        if hasattr(source, "read"):
+            position = source.tell()
+
+        # count how many entities refer to each entity
+        id_to_n_parents = collections.Counter()
+        for entity in _iter_entities(source):
+            for elem in entity.iterfind("properties/*"):
+                if elem.text and '@' in elem.text:
+                    id_to_n_parents[elem.text] += 1
+
+        if hasattr(source, "read"):
+            source.seek(position)
+
+        doc = _Document(id_to_n_parents, known_intervals, None)
+        # entities that are waiting for the entities they refer to, each with
+        # its properties and the number of entities it is still waiting for
+        id_to_pending = {}
+        id_to_waiting_parents = collections.defaultdict(list)
+        # referenced entities that were read as None, e.g., unsupported ones
+        none_ids = set()
+
+        def create(entity_id: str
+                   ) -> typing.Iterator[Shift | Interval | Intervals]:
+            entity, properties, _ = id_to_pending.pop(entity_id)
+            obj = self._read_entity(doc, entity, properties)
+            if obj is None:
+                if id_to_n_parents[entity_id]:
+                    none_ids.add(entity_id)
+            elif id_to_n_parents[entity_id]:
+                doc.id_to_obj[entity_id] = obj
+            elif not isinstance(obj, _Number):
+                yield obj
+
+        ready = collections.deque()
+        for entity in _iter_entities(source):
+            entity_id = entity.findtext("id")
+            if entity_id in id_to_pending or entity_id in doc.id_to_obj or \
+                    entity_id in none_ids:
+                raise ValueError(f"duplicate id {entity_id} on "
+                                 f"{_tostring(entity)}")
+            properties = _Properties(entity.find("properties"))
+            n_waiting = 0
+            for child_id in set(properties.references()):
+                if child_id not in doc.id_to_obj and child_id not in none_ids:
+                    id_to_waiting_parents[child_id].append(entity_id)
+                    n_waiting += 1
+            id_to_pending[entity_id] = [entity, properties, n_waiting]
+            if not n_waiting:
+                ready.append(entity_id)
+            while ready:
+                entity_id = ready.popleft()
+                yield from create(entity_id)
+                # the entity is resolved even if it was read as None, as
+                # from_xml also reads its parents after it
+                for parent_id in id_to_waiting_parents.pop(entity_id, []):
+                    pending = id_to_pending[parent_id]
+                    pending[2] -= 1
+                    if not pending[2]:
+                        ready.append(parent_id)
+
+        # entities still waiting refer to missing entities, or to each other,
+        # so create them in the order that from_xml would
+        id_to_children = {
+            entity_id: {child_id for child_id in properties.references()
+                        if child_id in id_to_pending}
+            for entity_id, (_, properties, _) in id_to_pending.items()}
+        for entity_id in _topological_sort(id_to_children):
+            yield from create(entity_id)
+
+        # objects whose parents did not consume them
+        for obj in doc.id_to_obj.values():
+            if not isinstance(obj, _Number):
+                yield obj
+
+    def _from_xml(self,
+                  elem: et.Element,
+                  known_intervals: dict[(int, int), Interval],
+                  doc_time_placeholder: Interval | None
+                  ) -> list[Shift | Interval | Intervals]:
+        id_to_entity = {}
+        id_to_properties = {}
+        id_to_children = {}
+        id_to_n_parents = collections.Counter()
+        for entity in elem.findall(".//entity"):
+            entity_id = entity.findtext("id")
+            if entity_id in id_to_entity:
+                other = id_to_entity[entity_id]
+                raise ValueError(f"duplicate id {entity_id} on "
+                                 f"{_tostring(entity)} and {_tostring(other)}")
+            id_to_entity[entity_id] = entity
+            properties = _Properties(entity.find("properties"))
+            id_to_properties[entity_id] = properties
+            references = properties.references()
+            id_to_children[entity_id] = set(references)
+            id_to_n_parents.update(references)
+
+        # to avoid infinite loops below, remove non-existent entities
+        # (i.e., values that are not keys)
+        # (checking each value, rather than intersecting with the set of all
+        # keys, which would take time proportional to the number of entities
+        # each time)
+        for key, children in id_to_children.items():
+            if children:
+                id_to_children[key] = {child for child in children
+                                       if child in id_to_children}
+
+        sorted_ids = _topological_sort(id_to_children)
+
+        doc = _Document(id_to_n_parents, known_intervals, doc_time_placeholder)
+        id_to_obj = doc.id_to_obj
+        for entity_id in sorted_ids:
+            obj = self._read_entity(doc, id_to_entity[entity_id],
+                                    id_to_properties[entity_id])
+            if obj is not None:
+                id_to_obj[entity_id] = obj
+
+        # remove any Number objects as they're internal implementation details
+        for key in list(id_to_obj):
+            if isinstance(id_to_obj[key], _Number):
+                del id_to_obj[key]
+
+        return list(id_to_obj.values())
+
+    def _read_entity(self,
+                     doc: "_Document",
+                     entity: et.Element,
+                     properties: "_Properties"
+                     ) -> Shift | Interval | Intervals | _Number | _AMPM | None:
+        # creates the object for a single <entity>, removing the objects of the
+        # entities that it refers to once they have no other parents, and
+        # returns None if the type of entity is not supported
         entity_type = entity.findtext("type")
-        prop_value = entity.findtext("properties/Value")
-        prop_type = entity.findtext("properties/Type")
-        prop_number = entity.findtext("properties/Number")
-        spans = []
 
         # TODO: revisit whether discontinuous spans need to be retained
         char_offsets = {int(x)
                         for start_end in entity.findtext("span").split(";")
                         for x in start_end.split(",")}
         trigger_span = (min(char_offsets), max(char_offsets))
-
-        # helper for managing access to id_to_obj
-        def pop(obj_id: str) -> \
-                Interval | Shift | Period | Repeating | Number | AMPM:
-            result = id_to_obj[obj_id]
-            id_to_n_parents[obj_id] -= 1
-            if not id_to_n_parents[obj_id]:
-                id_to_obj.pop(obj_id)
-            if result.__class__ is not Interval:  # raw Interval has no span
-                spans.append(result.span)
-            return result
-
-        # helper for ET.findall + text + pop
-        def pop_all_prop(prop_name: str) -> \
-                list[Interval | Shift | Period | Repeating | Number | AMPM]:
-            path = f"properties/{prop_name}"
-            return [pop(e.text) for e in entity.findall(path) if e.text]
-
-        # helper for managing the multiple interval properties
-        def get_interval(prop_name: str) -> Interval:
-            prop_interval_type = entity.findtext(f"properties/{prop_name}-Type")
-            prop_interval = entity.findtext(f"properties/{prop_name}")
-            match prop_interval_type:
-                case "Link":
-                    return pop(prop_interval)
-                case "DocTime" if (None, None) in known_intervals:
-                    return known_intervals.get((None, None))
-                case "DocTime-Year" if (None, None) in known_intervals:
-                    doc_time = known_intervals.get((None, None))
-                    return Year(doc_time.start.year)
-                case "DocTime" | "DocTime-Year":
-                    raise ValueError("known_intervals[(None, None)] required")
-                case "DocTime-Era":
-                    return Interval(datetime.datetime.min, None)
-                case "Unknown":
-                    return Interval(None, None)
-                case other_type:
-                    raise NotImplementedError(other_type)
-
-        # helper for managing the multiple shift properties
-        def get_shift() -> Shift:
-            prop_shift = entity.findtext("properties/Period") or \
-                         entity.findtext("properties/Repeating-Interval")
-            return pop(prop_shift) if prop_shift else None
-
-        # helper for managing Included properties
-        def get_included(prop_name: str) -> bool:
-            match entity.findtext(f"properties/{prop_name}"):
-                case "Included" | "Interval-Included":
-                    return True
-                case "Not-Included" | "Interval-Not-Included" | "Standard":
-                    return False
-                case other_type:
-                    raise NotImplementedError(other_type)
+        context = _Entity(doc, entity_type, properties, trigger_span)
+        spans = context.spans
 
         # create objects from <entity> elements
         try:
-            match entity_type:
-                case "Period":
-                    if prop_type == "Unknown":
-                        unit = None
-                    else:
-                        unit_name = prop_type.upper()
-                        unit_name = re.sub(r"IES$", r"Y", unit_name)
-                        unit_name = re.sub(r"S$", r"", unit_name)
-                        unit_name = re.sub("-", "_", unit_name)
-                        unit = globals()[unit_name]
-                    if prop_number:
-                        n = pop(prop_number).value
-                    else:
-                        n = None
-                    obj = Period(unit, n)
-                case "Sum":
-                    obj = PeriodSum(pop_all_prop("Periods"))
-                case "Year" | "Two-Digit-Year":
-                    digits_str = prop_value.rstrip('?')
-                    n_missing_digits = len(prop_value) - len(digits_str)
-                    digits = int(digits_str)
-                    match entity_type:
-                        case "Year":
-                            obj = Year(digits, n_missing_digits)
-                        case "Two-Digit-Year":
-                            obj = YearSuffix(get_interval("Interval"),
-                                             digits, n_missing_digits)
-                        case other:
-                            raise NotImplementedError(other)
-                case "Month-Of-Year":
-                    dt = datetime.datetime.strptime(prop_type, '%B')
-                    obj = Repeating(MONTH, YEAR, value=dt.month)
-                case "Day-Of-Month":
-                    obj = Repeating(DAY, MONTH, value=int(prop_value))
-                case "Day-Of-Week":
-                    day_str = prop_type.upper()[:2]
-                    day_int = getattr(dateutil.relativedelta, day_str).weekday
-                    obj = Repeating(DAY, WEEK, value=day_int)
-                case "AMPM-Of-Day":
-                    obj = AMPM(prop_type)
-                case "Hour-Of-Day":
-                    hour = int(prop_value)
-                    prop_am_pm = entity.findtext("properties/AMPM-Of-Day")
-                    if prop_am_pm:
-                        match pop(prop_am_pm).value:
-                            case "AM" if hour == 12:
-                                hour = 0
-                            case "PM" if hour != 12:
-                                hour += 12
-                            case "AM" | "PM":
-                                pass
-                            case other:
-                                raise NotImplementedError(other)
-                    obj = Repeating(HOUR, DAY, value=hour)
-                case "Minute-Of-Hour":
-                    obj = Repeating(MINUTE, HOUR, value=int(prop_value))
-                case "Second-Of-Minute":
-                    obj = Repeating(SECOND, MINUTE, value=int(prop_value))
-                case "Season-Of-Year" | \
-                     "Part-Of-Day" if prop_type in {"Unknown", "Dawn", "Dusk"}:
-                    # TODO: improve handling of location-dependent times
-                    obj = Repeating(None)
-                case "Part-Of-Day" | "Part-Of-Week" | "Season-Of-Year":
-                    obj = globals()[prop_type]()
-                case "Calendar-Interval":
-                    unit_name = prop_type.upper().replace("-", "_")
-                    obj = Repeating(globals()[unit_name])
-                case "Union":
-                    obj = ShiftUnion(pop_all_prop("Repeating-Intervals"))
-                case "Every-Nth":
-                    obj = EveryNth(get_shift(), int(prop_value))
-                case "Last" | "Next" | "Before" | "After" | \
-                     "NthFromEnd" | "NthFromStart":
-                    if entity_type.startswith("Nth"):
-                        cls_name = "Nth"
-                    else:
-                        cls_name = entity_type
-                    interval = get_interval("Interval")
-                    shift = get_shift()
-                    kwargs = {}
-                    match cls_name:
-                        case "Last" | "Next" | "Before" | "After":
-                            kwargs["interval_included"] = \
-                                get_included("Semantics")
-                        case "Nth":
-                            kwargs["index"] = int(prop_value)
-                            kwargs["from_end"] = entity_type == "NthFromEnd"
-                    if isinstance(shift, Number):
-                        kwargs["n"] = shift.value
-                        if cls_name not in {"Before", "After"}:
-                            cls_name += "N"
-                        shift = shift.shift
-                    cls = globals()[cls_name]
-                    obj = cls(interval=interval, shift=shift, **kwargs)
-                case "This":
-                    obj = This(get_interval("Interval"), get_shift())
-                case "Between":
-                    obj = Between(get_interval("Start-Interval"),
-                                  get_interval("End-Interval"),
-                                  start_included=get_included("Start-Included"),
-                                  end_included=get_included("End-Included"))
-                case "Intersection":
-                    match (pop_all_prop("Intervals"),
-                           pop_all_prop("Repeating-Intervals")):
-                        case intervals, []:
-                            obj = Intersection(intervals)
-                        case [], repeating_intervals:
-                            obj = RepeatingIntersection(repeating_intervals)
-                        case [interval], [repeating_interval]:
-                            obj = This(interval, repeating_interval)
-                        case [interval], repeating_intervals:
-                            obj = This(interval, RepeatingIntersection(
-                                repeating_intervals))
-                        case other:
-                            raise NotImplementedError(other)
-                case "Number":
-                    if prop_value == '?':
-                        value = None
-                    elif prop_value.isdigit():
-                        value = int(prop_value)
-                    else:
-                        try:
-                            value = float(prop_value)
-                        except ValueError:
-                            # TODO: handle ranges better
-                            value = None
-                    obj = Number(value)
-                case "Event":
-                    obj = known_intervals.get(trigger_span)
-                    if obj is None:
-                        obj = Interval(None, None)
-                case "Time-Zone" | "Modifier" | "Frequency" | \
-                     "NotNormalizable" | "PreAnnotation":
-                    # TODO: handle time zones, modifiers, and frequencies
-                    continue
-                case other:
-                    raise NotImplementedError(other)
+            reader = self._entity_readers.get(entity_type)
+            if reader is None:
+                raise NotImplementedError(entity_type)
+            obj = reader(context)
+            if obj is None:
+                return None
 
             # add spans to objects
             obj.span = obj.trigger_span = trigger_span
@@ -285,14 +354,16 @@ def from_xml(elem: et.Element,
 
             # if Number property present, wrap shift with number for later use
             # skip this for Periods, which directly consume their Number above
+            prop_number = properties.get("Number")
             if prop_number and not isinstance(obj, Period):
-                repeating_n = pop(prop_number)
+                repeating_n = self._pop(context, prop_number)
                 repeating_n.shift = obj
                 obj = repeating_n
 
             # create additional objects as necessary for sub-intervals
+            sub_interval_id = properties.get("Sub-Interval")
             if sub_interval_id:
-                sub_interval = pop(sub_interval_id)
+                sub_interval = self._pop(context, sub_interval_id)
                 match entity_type:
                     case "Year" | "Two-Digit-Year":
                         obj = This(obj, sub_interval)
@@ -304,8 +375,9 @@ def from_xml(elem: et.Element,
                         raise NotImplementedError(other)
 
             # create additional objects as necessary for super-intervals
+            super_interval_id = properties.get("Super-Interval")
             if super_interval_id:
-                super_interval = pop(super_interval_id)
+                super_interval = self._pop(context, super_interval_id)
                 match super_interval:
                     case Year() | YearSuffix() | This():
                         obj = This(super_interval, obj)
@@ -320,15 +392,491 @@ def from_xml(elem: et.Element,
         except Exception as ex:
             raise AnaforaXMLParsingError(entity, trigger_span) from ex
 
-        # add the object to the mapping
-        id_to_obj[entity_id] = obj
+        return obj
+
+    # helper for managing access to id_to_obj
+    @staticmethod
+    def _pop(entity: "_Entity", obj_id: str) -> \
+            Interval | Shift | Period | Repeating | _Number | _AMPM:
+        doc = entity.doc
+        result = doc.id_to_obj[obj_id]
+        doc.id_to_n_parents[obj_id] -= 1
+        if not doc.id_to_n_parents[obj_id]:
+            doc.id_to_obj.pop(obj_id)
+        if result.__class__ is not Interval:  # an Event's span is not included
+            entity.spans.append(result.span)
+        return result
+
+    # helper for getting all texts of a property + pop
+    def _pop_all_prop(self, entity: "_Entity", prop_name: str) -> \
+            list[Interval | Shift | Period | Repeating | _Number | _AMPM]:
+        return [self._pop(entity, text)
+                for text in entity.properties.get_all(prop_name) if text]
+
+    # helper for managing the multiple interval properties
+    def _get_interval(self, entity: "_Entity", prop_name: str) -> Interval:
+        prop_interval_type = entity.properties.get(f"{prop_name}-Type")
+        prop_interval = entity.properties.get(prop_name)
+        doc_time_placeholder = entity.doc.doc_time_placeholder
+        known_intervals = entity.doc.known_intervals
+        match prop_interval_type:
+            case "Link":
+                return self._pop(entity, prop_interval)
+            case "DocTime" if doc_time_placeholder is not None:
+                return doc_time_placeholder
+            case "DocTime-Year" if doc_time_placeholder is not None:
+                return This(doc_time_placeholder, Repeating(YEAR))
+            case "DocTime" if (None, None) in known_intervals:
+                return known_intervals.get((None, None))
+            case "DocTime-Year" if (None, None) in known_intervals:
+                doc_time = known_intervals.get((None, None))
+                return Year(doc_time.start.year)
+            case "DocTime" | "DocTime-Year":
+                raise ValueError("known_intervals[(None, None)] required")
+            case "DocTime-Era":
+                return Interval(datetime.datetime.min, None)
+            case "Unknown":
+                return Interval(None, None)
+            case other_type:
+                raise NotImplementedError(other_type)
+
+    # helper for managing the multiple shift properties
+    def _get_shift(self, entity: "_Entity") -> Shift:
+        prop_shift = entity.properties.get("Period") or \
+                     entity.properties.get("Repeating-Interval")
+        return self._pop(entity, prop_shift) if prop_shift else None
+
+    # helper for managing Included properties
+    @staticmethod
+    def _get_included(entity: "_Entity", prop_name: str) -> bool:
+        match entity.properties.get(prop_name):
+            case "Included" | "Interval-Included":
+                return True
+            case "Not-Included" | "Interval-Not-Included" | "Standard":
+                return False
+            case other_type:
+                raise NotImplementedError(other_type)
+
+    # readers for each type of <entity>, which all take the entity being read
+
+    def _read_period(self, entity: "_Entity") -> Period:
+        unit = _period_unit(entity.properties.get("Type"))
+        prop_number = entity.properties.get("Number")
+        if prop_number:
+            n = self._pop(entity, prop_number).value
+        else:
+            n = None
+        return Period(unit, n)
+
+    def _read_sum(self, entity: "_Entity") -> PeriodSum:
+        return PeriodSum(self._pop_all_prop(entity, "Periods"))
+
+    def _read_year(self, entity: "_Entity") -> Year:
+        digits, n_missing_digits = _year_digits(entity.properties.get("Value"))
+        return Year(digits, n_missing_digits)
+
+    def _read_two_digit_year(self, entity: "_Entity") -> YearSuffix:
+        digits, n_missing_digits = _year_digits(entity.properties.get("Value"))
+        interval = self._get_interval(entity, "Interval")
+        return YearSuffix(interval, digits, n_missing_digits)
+
+    def _read_month_of_year(self, entity: "_Entity") -> Repeating:
+        month = _month(entity.properties.get("Type"))
+        return Repeating(MONTH, YEAR, value=month)
+
+    def _read_day_of_month(self, entity: "_Entity") -> Repeating:
+        day = int(entity.properties.get("Value"))
+        return Repeating(DAY, MONTH, value=day)
+
+    def _read_day_of_week(self, entity: "_Entity") -> Repeating:
+        weekday = _weekday(entity.properties.get("Type"))
+        return Repeating(DAY, WEEK, value=weekday)
+
+    def _read_am_pm_of_day(self, entity: "_Entity") -> _AMPM:
+        return _AMPM(entity.properties.get("Type"))
+
+    def _read_hour_of_day(self, entity: "_Entity") -> Repeating:
+        hour = int(entity.properties.get("Value"))
+        prop_am_pm = entity.properties.get("AMPM-Of-Day")
+        if prop_am_pm:
+            match self._pop(entity, prop_am_pm).value:
+                case "AM" if hour == 12:
+                    hour = 0
+                case "PM" if hour != 12:
+                    hour += 12
+                case "AM" | "PM":
+                    pass
+                case other:
+                    raise NotImplementedError(other)
+        return Repeating(HOUR, DAY, value=hour)
+
+    def _read_minute_of_hour(self, entity: "_Entity") -> Repeating:
+        minute = int(entity.properties.get("Value"))
+        return Repeating(MINUTE, HOUR, value=minute)
+
+    def _read_second_of_minute(self, entity: "_Entity") -> Repeating:
+        second = int(entity.properties.get("Value"))
+        return Repeating(SECOND, MINUTE, value=second)
+
+    def _read_named_repeating(self, entity: "_Entity") -> Repeating:
+        prop_type = entity.properties.get("Type")
+        if entity.entity_type in {"Season-Of-Year", "Part-Of-Day"} and \
+                prop_type in {"Unknown", "Dawn", "Dusk"}:
+            # TODO: improve handling of location-dependent times
+            return Repeating(None)
+        return globals()[prop_type]()
+
+    def _read_calendar_interval(self, entity: "_Entity") -> Repeating:
+        unit_name = entity.properties.get("Type").upper().replace("-", "_")
+        return Repeating(globals()[unit_name])
+
+    def _read_union(self, entity: "_Entity") -> ShiftUnion:
+        return ShiftUnion(self._pop_all_prop(entity, "Repeating-Intervals"))
+
+    def _read_every_nth(self, entity: "_Entity") -> EveryNth:
+        return EveryNth(self._get_shift(entity),
+                        int(entity.properties.get("Value")))
+
+    def _read_offset_operator(self, entity: "_Entity") -> Interval | Intervals:
+        entity_type = entity.entity_type
+        if entity_type.startswith("Nth"):
+            cls_name = "Nth"
+        else:
+            cls_name = entity_type
+        interval = self._get_interval(entity, "Interval")
+        shift = self._get_shift(entity)
+        kwargs = {}
+        match cls_name:
+            case "Last" | "Next" | "Before" | "After":
+                kwargs["interval_included"] = \
+                    self._get_included(entity, "Semantics")
+            case "Nth":
+                kwargs["index"] = int(entity.properties.get("Value"))
+                kwargs["from_end"] = entity_type == "NthFromEnd"
+        if isinstance(shift, _Number):
+            kwargs["n"] = shift.value
+            if cls_name not in {"Before", "After"}:
+                cls_name += "N"
+            shift = shift.shift
+        cls = globals()[cls_name]
+        return cls(interval=interval, shift=shift, **kwargs)
+
+    def _read_this(self, entity: "_Entity") -> This:
+        return This(self._get_interval(entity, "Interval"),
+                    self._get_shift(entity))
+
+    def _read_between(self, entity: "_Entity") -> Between:
+        start = self._get_interval(entity, "Start-Interval")
+        end = self._get_interval(entity, "End-Interval")
+        return Between(
+            start, end,
+            start_included=self._get_included(entity, "Start-Included"),
+            end_included=self._get_included(entity, "End-Included"))
+
+    def _read_intersection(self, entity: "_Entity") -> \
+            Intersection | RepeatingIntersection | This:
+        match (self._pop_all_prop(entity, "Intervals"),
+               self._pop_all_prop(entity, "Repeating-Intervals")):
+            case intervals, []:
+                return Intersection(intervals)
+            case [], repeating_intervals:
+                return RepeatingIntersection(repeating_intervals)
+            case [interval], [repeating_interval]:
+                return This(interval, repeating_interval)
+            case [interval], repeating_intervals:
+                return This(interval,
+                            RepeatingIntersection(repeating_intervals))
+            case other:
+                raise NotImplementedError(other)
+
+    def _read_number(self, entity: "_Entity") -> _Number:
+        prop_value = entity.properties.get("Value")
+        if prop_value == '?':
+            value = None
+        elif prop_value.isdigit():
+            value = int(prop_value)
+        else:
+            try:
+                value = float(prop_value)
+            except ValueError:
+                # TODO: handle ranges better
+                value = None
+        return _Number(value)
+
+    def _read_event(self, entity: "_Entity") -> Interval:
+        obj = entity.doc.known_intervals.get(entity.trigger_span)
+        if obj is None:
+            return Interval(None, None)
+        # a copy, since the caller's interval must not be given our spans
+        return copy.copy(obj)
+
+    def _read_unsupported(self, entity: "_Entity") -> None:
+        return None
+
+
+_PARSER = AnaforaParser()
+
+
+class _Document:
+    """
+    The state of reading a single document.
+    """
+    __slots__ = ("id_to_obj", "id_to_n_parents", "known_intervals",
+                 "doc_time_placeholder")
+
+    def __init__(self,
+                 id_to_n_parents: collections.Counter,
+                 known_intervals: dict[(int, int), Interval],
+                 doc_time_placeholder: Interval | None):
+        """
+        :param id_to_n_parents: A mapping from entity ids to the number of
+            entities that refer to them and have not yet been created.
+        :param known_intervals: As for :func:`from_xml`.
+        :param doc_time_placeholder: The placeholder for the document creation
+            time, or None if the document creation time is in known_intervals.
+        """
+        self.id_to_obj = {}
+        self.id_to_n_parents = id_to_n_parents
+        self.known_intervals = known_intervals
+        self.doc_time_placeholder = doc_time_placeholder
+
+
+class _Entity:
+    """
+    The state of reading a single <entity>, which is passed to the reader for
+    its type of entity.
+    """
+    __slots__ = ("doc", "entity_type", "properties", "trigger_span", "spans")
+
+    def __init__(self,
+                 doc: _Document,
+                 entity_type: str,
+                 properties: "_Properties",
+                 trigger_span: (int, int)):
+        """
+        :param doc: The document that the entity is in.
+        :param entity_type: The <type> of the entity.
+        :param properties: The <properties> of the entity.
+        :param trigger_span: The character offsets of the <span> of the entity.
+        """
+        self.doc = doc
+        self.entity_type = entity_type
+        self.properties = properties
+        self.trigger_span = trigger_span
+        # the spans of the entity and of the objects it refers to
+        self.spans = []
+
+
+@functools.lru_cache(maxsize=1024)
+def _period_unit(prop_type: str) -> Unit | None:
+    # the unit of a Period from its Type, e.g., "Centuries" -> CENTURY
+    if prop_type == "Unknown":
+        return None
+    unit_name = prop_type.upper()
+    unit_name = re.sub(r"IES$", r"Y", unit_name)
+    unit_name = re.sub(r"S$", r"", unit_name)
+    unit_name = re.sub("-", "_", unit_name)
+    return globals()[unit_name]
+
+
+@functools.lru_cache(maxsize=1024)
+def _month(prop_type: str) -> int:
+    # the month of a Month-Of-Year from its Type, e.g., "March" -> 3
+    return datetime.datetime.strptime(prop_type, '%B').month
+
+
+@functools.lru_cache(maxsize=1024)
+def _weekday(prop_type: str) -> int:
+    # the weekday of a Day-Of-Week from its Type, e.g., "Monday" -> 0
+    day_str = prop_type.upper()[:2]
+    return getattr(dateutil.relativedelta, day_str).weekday
+
+
+def _year_digits(prop_value: str) -> (int, int):
+    # the digits of a Year or Two-Digit-Year, and the number of missing digits
+    digits_str = prop_value.rstrip('?')
+    return int(digits_str), len(prop_value) - len(digits_str)
+
+
+def _iter_entities(source: "str | os.PathLike | typing.IO"
+                   ) -> typing.Iterator[et.Element]:
+    # yields each <entity> once it has been parsed, then detaches it from its
+    # parent, so that it is discarded once the caller no longer refers to it
+    parents = []
+    for event, elem in et.iterparse(source, events=("start", "end")):
+        if event == "start":
+            parents.append(elem)
+        else:
+            parents.pop()
+            if elem.tag == "entity":
+                yield elem
+                if parents:
+                    del parents[-1][:]
+
+
+def _tostring(elem: et.Element, **kwargs) -> bytes | str:
+    # elements may come from either backend of parse_xml
+    if lxml_etree is not None and isinstance(elem, lxml_etree._Element):
+        return lxml_etree.tostring(elem, **kwargs)
+    return et.tostring(elem, **kwargs)
+
+
+class _Properties:
+    """
+    The texts of the children of a <properties> element, read in a single pass
+    so that each property lookup is a dictionary lookup rather than an
+    ElementPath query.
+    """
+    __slots__ = ("tag_to_texts",)
+
+    def __init__(self, elem: et.Element):
+        """
+        :param elem: The <properties> element of an <entity>.
+        """
+        self.tag_to_texts = {}
+        for child in elem:
+            # like findtext, an element without text has the text ""
+            text = child.text or ""
+            texts = self.tag_to_texts.get(child.tag)
+            if texts is None:
+                self.tag_to_texts[child.tag] = [text]
+            else:
+                texts.append(text)
+
+    def get(self, tag: str) -> str | None:
+        """
+        :param tag: The tag of the property.
+        :return: The text of the first property with the tag, like findtext, or
+            None if there is no such property.
+        """
+        texts = self.tag_to_texts.get(tag)
+        return None if texts is None else texts[0]
+
+    def get_all(self, tag: str) -> list[str]:
+        """
+        :param tag: The tag of the property.
+        :return: The texts of all properties with the tag.
+        """
+        return self.tag_to_texts.get(tag, [])
+
+    def references(self) -> list[str]:
+        """
+        :return: The texts of all properties that are references to other
+            entities, once for each property.
+        """
+        return [text for texts in self.tag_to_texts.values() for text in texts
+                if '@' in text]
+
+
+def _topological_sort(id_to_children: dict[str, set[str]]) -> list[str]:
+    """
+    Sorts entity ids so that each entity comes after all the entities that it
+    refers to, using Kahn's algorithm.
+    Entities are ordered first by their depth (0 for entities that refer to no
+    other entities, otherwise one more than the deepest entity they refer to),
+    then by their order in id_to_children.
+
+    :param id_to_children: A mapping from each entity id to the ids of the
+        entities that it refers to, all of which must be keys in the mapping.
+    :return: The sorted entity ids.
+    """
+    id_to_parents = {key: [] for key in id_to_children}
+    id_to_n_unsorted = {}
+    for key, children in id_to_children.items():
+        id_to_n_unsorted[key] = len(children)
+        for child in children:
+            id_to_parents[child].append(key)
+
+    # entities are queued once all the entities they refer to are sorted
+    queue = [key for key, n in id_to_n_unsorted.items() if not n]
+    id_to_depth = dict.fromkeys(queue, 0)
+    for key in queue:
+        depth = id_to_depth[key] + 1
+        for parent in id_to_parents[key]:
+            if id_to_depth.get(parent, 0) < depth:
+                id_to_depth[parent] = depth
+            id_to_n_unsorted[parent] -= 1
+            if not id_to_n_unsorted[parent]:
+                queue.append(parent)
+
+    # every unsorted entity refers to another unsorted entity, so following
+    # those references from any unsorted entity must lead to a cycle
+    if len(queue) < len(id_to_children):
+        key = next(key for key, n in id_to_n_unsorted.items() if n)
+        path = {}
+        while key not in path:
+            path[key] = len(path)
+            key = min(child for child in id_to_children[key]
+                      if id_to_n_unsorted[child])
+        cycle = list(path)[path[key]:] + [key]
+        raise ValueError(f"cyclic references: {' -> '.join(cycle)}")
+
+    depths = [[] for _ in range(max(id_to_depth.values(), default=-1) + 1)]
+    for key in id_to_children:
+        depths[id_to_depth[key]].append(key)
+    return [key for keys in depths for key in keys]
+
+
+class Template:
+    """
+    Intervals and Shifts read by :func:`from_xml` with a placeholder for the
+    document creation time, which can be evaluated against many document
+    creation times without re-reading the XML or re-creating the objects.
+    """
+    def __init__(self,
+                 objects: list[Shift | Interval | Intervals],
+                 doc_time: Interval):
+        """
+        :param objects: The objects read from the XML, with spans.
+        :param doc_time: The placeholder for the document creation time used
+            in the objects.
+        """
+        self.objects = objects
+        self._plans = []
+        self._values = []
+        for obj in objects:
+            plan = value = None
+            match obj:
+                case Shift():
+                    value = obj
+                case Interval() | Intervals():
+                    try:
+                        plan = compile_plan(obj, doc_time)
+                    except ValueError:
+                        value = _plain(obj)
+                case other:
+                    raise NotImplementedError(other)
+            self._plans.append(plan)
+            self._values.append(value)
+
+    def bind(self, doc_time: Interval) -> \
+            list[Shift | Interval | list[Interval]]:
+        """
+        Evaluates the objects with the given document creation time.
+
+        :param doc_time: The document creation time.
+        :return: One value for each of the template's objects: Shifts as they
+            are, each Interval as a plain Interval with the evaluated start and
+            end, and each Intervals as a list of plain Intervals.
+        """
+        return [value if plan is None else plan(doc_time)
+                for plan, value in zip(self._plans, self._values)]
+
+    def bind_many(self, doc_times: typing.Iterable[Interval]) -> \
+            list[list[Shift | Interval | list[Interval]]]:
+        """
+        Evaluates the objects with each of the given document creation times.
+
+        :param doc_times: The document creation times.
+        :return: The result of :meth:`bind` for each document creation time.
+        """
+        return [self.bind(doc_time) for doc_time in doc_times]
 
-    # remove any Number objects as they're internal implementation details
-    for key in list(id_to_obj):
-        if isinstance(id_to_obj[key], Number):
-            del id_to_obj[key]
 
-    return list(id_to_obj.values())
+def _plain(obj: Interval | Intervals) -> Interval | list[Interval]:
+    if isinstance(obj, Intervals):
+        return [Interval(i.start, i.end) for i in obj]
+    return Interval(obj.start, obj.end)
 
 
 class AnaforaXMLParsingError(RuntimeError):
@@ -339,5 +887,5 @@ class AnaforaXMLParsingError(RuntimeError):
     def __init__(self, entity: et.Element, trigger_span: (int, int)):
         self.entity = entity
         self.trigger_span = trigger_span
-        xml_str = et.tostring(entity, encoding="unicode")
+        xml_str = _tostring(entity, encoding="unicode")
         super().__init__(re.sub(r"\s+", "", xml_str))
@@ -3,15 +3,21 @@ import pathlib
 import pytest
 import shapely.geometry.base
 import shapely.ops
+import sys
+import timeit
+import tracemalloc
 
 
 GEOJSON_OPTION = "--geojson-dir"
 LLM_OPTION = "--llm"
+BENCHMARK_OPTION = "--benchmark"
 
 
 def pytest_addoption(parser):
     parser.addoption(GEOJSON_OPTION, help="Directory containing GeoJson files")
     parser.addoption(LLM_OPTION, nargs='+', help="LLM options, e.g., `model=llama3.2:3b call-style=chat`")
+    parser.addoption(BENCHMARK_OPTION, action="store_true",
+                     help="Run microbenchmarks")
 
 
 @pytest.fixture
@@ -30,6 +36,37 @@ def llm_options(request):
     return dict(option.split('=') for option in option_strs)
 
 
+@pytest.fixture
+def microbenchmark(request):
+    if not request.config.getoption(BENCHMARK_OPTION):
+        pytest.skip("Benchmarks not enabled")
+
+    def best_time(func, number=1000, repeat=5):
+        # seconds per call, best of several repeats to reduce noise
+        return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+    return best_time
+
+
+@pytest.fixture
+def memory_benchmark(request):
+    if not request.config.getoption(BENCHMARK_OPTION):
+        pytest.skip("Benchmarks not enabled")
+
+    def bytes_per_object(func, number=10000):
+        # memory retained by the objects created, not counting the list that
+        # holds them, averaged over many objects to reduce noise
+        func()
+        tracemalloc.start()
+        try:
+            before, _ = tracemalloc.get_traced_memory()
+            objects = [func() for _ in range(number)]
+            after, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return (after - before - sys.getsizeof(objects)) / number
+    return bytes_per_object
+
+
 class ScoreLogger:
     def __init__(self):
         self.precisions = []
@@ -0,0 +1,172 @@
+import argparse
+import inspect
+import json
+import os
+import pathlib
+import subprocess
+import sys
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from normit.time import *
+from normit.time.__main__ import json_record, process_xml
+
+
+_SUFFIX = ".TimeNorm.gold.completed.xml"
+
+_XML = inspect.cleandoc("""
+    <data>
+        <annotations>
+            <entity>
+                <id>1@e@Doc9@gold</id>
+                <span>6,14</span>
+                <type>Day-Of-Month</type>
+                <parentsType>Repeating-Interval</parentsType>
+                <properties>
+                    <Value>15</Value>
+                    <Number></Number>
+                    <Modifier></Modifier>
+                </properties>
+            </entity>
+            <entity>
+                <id>2@e@Doc9@gold</id>
+                <span>1,5</span>
+                <type>Next</type>
+                <parentsType>Operator</parentsType>
+                <properties>
+                    <Semantics>Interval-Not-Included</Semantics>
+                    <Interval-Type>DocTime</Interval-Type>
+                    <Interval></Interval>
+                    <Period></Period>
+                    <Repeating-Interval>1@e@Doc9@gold</Repeating-Interval>
+                </properties>
+            </entity>
+            <entity>
+                <id>3@e@Doc9@gold</id>
+                <span>20,22</span>
+                <type>Two-Digit-Year</type>
+                <parentsType>Operator</parentsType>
+                <properties>
+                    <Interval-Type>DocTime</Interval-Type>
+                    <Interval></Interval>
+                    <Value>{year}</Value>
+                </properties>
+            </entity>
+            <entity>
+                <id>4@e@Doc9@gold</id>
+                <span>30,34</span>
+                <type>Year</type>
+                <parentsType>Interval</parentsType>
+                <properties>
+                    <Value>1887</Value>
+                </properties>
+            </entity>
+        </annotations>
+    </data>""")
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    # several documents, so that --jobs 2 splits them across workers, and one
+    # with an unparseable year, so that errors are reported with their context
+    for i, year in enumerate(["96", "07", "x6", "55", "23", "81"]):
+        (tmp_path / f"doc{i}{_SUFFIX}").write_text(_XML.format(year=year))
+        (tmp_path / f"doc{i}.dct").write_text(f"20{i}{i}-0{i + 1}-1{i}")
+        (tmp_path / f"doc{i}").write_text("x" * 20 + f"{year}" + "x" * 20)
+    return tmp_path
+
+
+def _run_cli(*args: str) -> subprocess.CompletedProcess:
+    src_dir = pathlib.Path(__file__).parent.parent / "src"
+    python_path = os.pathsep.join(
+        [str(src_dir)] + os.environ.get("PYTHONPATH", "").split(os.pathsep))
+    return subprocess.run(
+        [sys.executable, "-m", "normit.time", "xml", *args],
+        capture_output=True, text=True, check=True,
+        env=dict(os.environ, PYTHONPATH=python_path))
+
+
+def _args(corpus: pathlib.Path, **kwargs) -> argparse.Namespace:
+    defaults = dict(xml_suffix=_SUFFIX, text_dir=None, dct_dir=str(corpus),
+                    silent=False, flatten=False, output_format="repr",
+                    xml_backend="etree")
+    return argparse.Namespace(**(defaults | kwargs))
+
+
+def test_json_record():
+    dct = Interval.of(2024, 2, 2)
+    path = pathlib.Path("doc0.xml")
+    obj = Next(dct, Repeating(DAY, MONTH, value=15), span=(1, 14))
+    assert json_record(path, obj) == {
+        "path": "doc0.xml",
+        "span": [1, 14],
+        "type": "Next",
+        "start": "2024-02-15T00:00:00",
+        "end": "2024-02-16T00:00:00",
+        "intervals": None}
+    obj = NextN(dct, Repeating(DAY, MONTH, value=15), n=2)
+    assert json_record(path, obj) == {
+        "path": "doc0.xml",
+        "span": None,
+        "type": "NextN",
+        "start": None,
+        "end": None,
+        "intervals": [["2024-02-15T00:00:00", "2024-02-16T00:00:00"],
+                      ["2024-03-15T00:00:00", "2024-03-16T00:00:00"]]}
+    assert json_record(path, Interval(None, dct.end))["start"] is None
+    assert json.loads(json.dumps(json_record(path, Summer())))["type"] == \
+           "Summer"
+
+
+def test_process_xml(corpus):
+    xml_path = corpus / f"doc0{_SUFFIX}"
+    known_intervals = {(None, None): Interval.of(2000, 1, 10)}
+    objects = from_xml(ET.parse(xml_path).getroot(), known_intervals)
+    out_text, err_text, n_errors = process_xml(xml_path, _args(corpus))
+    assert out_text == "".join(f"{obj}\n" for obj in objects)
+    assert (err_text, n_errors) == ("", 0)
+
+    out_text, _, _ = process_xml(xml_path, _args(corpus, output_format="jsonl"))
+    records = [json.loads(line) for line in out_text.splitlines()]
+    assert records == [json_record(xml_path, obj) for obj in objects]
+
+    out_text, _, _ = process_xml(xml_path, _args(corpus, silent=True))
+    assert out_text == ""
+
+    # errors are reported with the text around the entity
+    xml_path = corpus / f"doc2{_SUFFIX}"
+    out_text, err_text, n_errors = process_xml(xml_path, _args(corpus))
+    assert n_errors == 1
+    assert "[[x6]]" in err_text
+    assert str(xml_path) in err_text
+
+
+def test_cli(corpus):
+    serial = _run_cli(str(corpus), "--dct-dir", str(corpus))
+    assert serial.stdout
+    assert serial.stderr.endswith("Errors: 1\n")
+    parallel = _run_cli(str(corpus), "--dct-dir", str(corpus), "--jobs", "2")
+    assert parallel.stdout == serial.stdout
+    assert parallel.stderr == serial.stderr
+
+    serial = _run_cli(str(corpus), "--dct-dir", str(corpus),
+                      "--output-format", "jsonl")
+    parallel = _run_cli(str(corpus), "--dct-dir", str(corpus),
+                        "--output-format", "jsonl", "--jobs", "2")
+    assert parallel.stdout == serial.stdout
+    records = [json.loads(line) for line in serial.stdout.splitlines()]
+    # the Next, the Two-Digit-Year and the Year of the 5 documents without
+    # errors
+    assert len(records) == 15
+    assert {pathlib.Path(r["path"]).name for r in records} == \
+           {f"doc{i}{_SUFFIX}" for i in [0, 1, 3, 4, 5]}
+
+
+def test_cli_xml_backend(corpus):
+    pytest.importorskip("lxml")
+    etree = _run_cli(str(corpus), "--dct-dir", str(corpus))
+    lxml = _run_cli(str(corpus), "--dct-dir", str(corpus),
+                    "--xml-backend", "lxml")
+    assert lxml.stdout == etree.stdout
+    assert lxml.stderr.endswith("Errors: 1\n")
@@ -1,4 +1,9 @@
+import concurrent.futures
 import datetime
+import dateutil.relativedelta
+import dateutil.rrule
+import numpy
+import pickle
 import pytest
 
 import normit.time
@@ -41,6 +46,73 @@ def test_unit_truncate():
     date = datetime.datetime.fromisoformat("2005-01-01 00:00:00")
     assert WEEK.truncate(date).isoformat() == "2004-12-27T00:00:00"
 
+    # weeks start on Mondays, even after 29 Feb in a leap year
+    date = datetime.datetime.fromisoformat("2024-03-10 12:00:00")
+    assert WEEK.truncate(date).isoformat() == "2024-03-04T00:00:00"
+
+    dates = [datetime.datetime(2026, 5, 3, 1, 7, 35, 1111),
+             datetime.datetime(2024, 3, 10, 12),
+             datetime.datetime(1969, 12, 31, 23, 59, 59, 999999),
+             datetime.datetime(1, 1, 1)]
+    for unit in Unit:
+        # the decade and quarter century of 1 Jan 0001 start in year 0
+        if unit is not DECADE and unit is not QUARTER_CENTURY:
+            assert unit.truncate_many(dates).astype(object).tolist() == \
+                   [unit.truncate(date) for date in dates]
+
+
+def test_unit_truncate_benchmark(microbenchmark):
+    def match_truncate(unit: Unit, dt: datetime.datetime):
+        # the original implementation of Unit.truncate
+        match unit:
+            case Unit.SECOND:
+                dt = dt.replace(microsecond=0)
+            case Unit.MINUTE:
+                dt = dt.replace(second=0, microsecond=0)
+            case Unit.HOUR:
+                dt = dt.replace(minute=0, second=0, microsecond=0)
+            case Unit.DAY:
+                dt = dt.replace(hour=0, minute=0, second=0, microsecond=0)
+            case Unit.WEEK:
+                timetuple = dt.timetuple()
+                diff = timetuple.tm_yday - timetuple.tm_wday
+                ordinal = diff if diff >= 1 else diff + 7
+                start = datetime.date.fromordinal(ordinal)
+                dt = datetime.datetime(dt.year, start.month, start.day)
+                if diff < 1:
+                    dt = dt + dateutil.relativedelta.relativedelta(days=-7)
+            case Unit.MONTH:
+                dt = datetime.datetime(dt.year, dt.month, 1)
+            case Unit.YEAR:
+                dt = datetime.datetime(dt.year, 1, 1)
+        return dt
+
+    date = datetime.datetime(2026, 5, 3, 1, 7, 35, 1111)
+    dates = numpy.array([date] * 100000, dtype="datetime64[us]")
+    for unit in [SECOND, MINUTE, HOUR, DAY, WEEK, MONTH, YEAR]:
+        old = microbenchmark(lambda: match_truncate(unit, date))
+        new = microbenchmark(lambda: unit.truncate(date))
+        many = microbenchmark(lambda: unit.truncate_many(dates), number=10)
+        many /= len(dates)
+        print(f"{unit!r:>6}: match {old * 1e9:.0f}ns, "
+              f"truncate {new * 1e9:.0f}ns, truncate_many {many * 1e9:.0f}ns")
+        assert new < old
+        assert many < new
+
+
+def test_unit_delta():
+    assert DAY.delta(3) == datetime.timedelta(days=3)
+    assert WEEK.delta(2) == datetime.timedelta(weeks=2)
+    assert MONTH.delta(2) == dateutil.relativedelta.relativedelta(months=2)
+    assert CENTURY.delta(1) == dateutil.relativedelta.relativedelta(years=100)
+    assert HOUR.delta(5) is HOUR.delta(5)
+    assert YEAR.relativedelta(5) is YEAR.relativedelta(5)
+    date = datetime.datetime(2024, 2, 29, 12, 30)
+    for unit in Unit:
+        if unit is not MILLISECOND:
+            assert date + unit.delta(3) == date + unit.relativedelta(3)
+            assert date - unit.delta(3) == date - unit.relativedelta(3)
+
 
 def test_period():
     date = datetime.datetime(2000, 1, 1, 0, 0, 0, 0)
@@ -182,6 +254,113 @@ def test_repeating_field():
            "2024-10-26T00:00:00 2024-10-27T00:00:00"
 
 
+def test_repeating_preceding_matches_rrule():
+    # preceding repeating intervals are found without rrule where possible,
+    # so check them against an rrule search over the preceding decade
+    # pair each shift with how far back the rrule search must start
+    years = dateutil.relativedelta.relativedelta(years=10)
+    days = dateutil.relativedelta.relativedelta(days=10)
+    shift_lookbacks = [(Repeating(SECOND, MINUTE, value=0), days),
+                       (Repeating(MINUTE, HOUR, value=59), days),
+                       (Repeating(HOUR, DAY, value=13), days),
+                       (Repeating(DAY, WEEK, value=3), years),
+                       (Repeating(DAY, MONTH, value=31), years),
+                       (Repeating(DAY, MONTH, value=29), years),
+                       (Repeating(DAY, YEAR, value=366), years),
+                       (Repeating(MONTH, YEAR, value=2), years),
+                       (Repeating(WEEK, YEAR, value=53), years),
+                       (Winter(), years),
+                       (Weekend(), years),
+                       (Evening(), years),
+                       (Noon(), days)]
+    points = [datetime.datetime(2000, 3, 1),
+              datetime.datetime(1904, 2, 29, 23, 59, 59, 999999),
+              datetime.datetime(1899, 12, 31, 12, 30),
+              datetime.datetime(2021, 1, 3, 5, 6, 7)]
+    for shift, lookback in shift_lookbacks:
+        for point in points:
+            other = shift.unit.truncate(point)
+            min_end = (other - shift.period).start
+            rrule = dateutil.rrule.rrule(dtstart=other - lookback,
+                                         **shift.rrule_kwargs)
+            start = rrule.before(min_end, inc=True)
+            assert (point - shift) == start + shift.period
+
+
+def test_rrule_cache():
+    normit.time.rrule_cache_clear()
+    assert normit.time.rrule_cache_info().currsize == 0
+    mar_fri = RepeatingIntersection([Repeating(DAY, WEEK, value=4),
+                                     Repeating(MONTH, YEAR, value=3)])
+    assert (datetime.datetime(2024, 1, 1) + mar_fri).isoformat() == \
+           "2024-03-01T00:00:00 2024-03-02T00:00:00"
+    misses = normit.time.rrule_cache_info().misses
+    assert misses > 0
+    # nearby anchors share the compiled rrule
+    assert (datetime.datetime(2024, 2, 1) + mar_fri).isoformat() == \
+           "2024-03-01T00:00:00 2024-03-02T00:00:00"
+    assert (datetime.datetime(2024, 3, 2) + mar_fri).isoformat() == \
+           "2024-03-08T00:00:00 2024-03-09T00:00:00"
+    info = normit.time.rrule_cache_info()
+    assert info.misses == misses
+    assert info.hits == 2
+    # searches back from nearby points share the rrules of their windows
+    sat_110 = RepeatingIntersection([Repeating(DAY, WEEK, value=5),
+                                     Repeating(DAY, YEAR, value=110)])
+    assert (datetime.datetime(2024, 5, 17) - sat_110).isoformat() == \
+           "2019-04-20T00:00:00 2019-04-21T00:00:00"
+    misses = normit.time.rrule_cache_info().misses
+    assert (datetime.datetime(2022, 8, 1) - sat_110).isoformat() == \
+           "2019-04-20T00:00:00 2019-04-21T00:00:00"
+    assert normit.time.rrule_cache_info().misses == misses
+    normit.time.rrule_cache_clear()
+    assert normit.time.rrule_cache_info().currsize == 0
+
+
+def test_many():
+    points = [datetime.datetime(2000, 2, 29),
+              datetime.datetime(1969, 12, 31, 23, 59, 59, 999999),
+              datetime.datetime(2024, 3, 10, 12, 30),
+              datetime.datetime(1900, 1, 31),
+              datetime.datetime(2023, 12, 31, 18, 1)]
+    array = numpy.array(points + [None], dtype="datetime64[us]")
+    for shift in [Period(MONTH, 1),
+                  Period(CENTURY, 2),
+                  Period(DAY, None),
+                  PeriodSum([Period(YEAR, 1), Period(DAY, 3)]),
+                  Repeating(WEEK),
+                  Repeating(QUARTER_YEAR),
+                  Repeating(DAY, WEEK, value=4),
+                  Repeating(DAY, MONTH, value=31),
+                  Repeating(DAY, YEAR, value=366),
+                  Repeating(WEEK, YEAR, value=1),
+                  Winter(),
+                  Noon(),
+                  Evening(),
+                  ShiftUnion([Repeating(DAY, WEEK, value=1),
+                              Repeating(MONTH, YEAR, value=3)]),
+                  RepeatingIntersection([Repeating(DAY, WEEK, value=4),
+                                         Repeating(DAY, MONTH, value=13)]),
+                  EveryNth(Repeating(DAY), 2)]:
+        for op, op_many in [(lambda p: p + shift, shift.radd_many),
+                            (lambda p: p - shift, shift.rsub_many)]:
+            starts, ends = op_many(array)
+            assert numpy.isnat(starts[-1]) and numpy.isnat(ends[-1])
+            for point, start, end in zip(points, starts, ends):
+                interval = op(point)
+                start = None if numpy.isnat(start) else start.item()
+                end = None if numpy.isnat(end) else end.item()
+                assert Interval(start, end) == interval, (shift, point)
+
+    # shapes are preserved
+    starts, ends = Repeating(DAY).radd_many(array.reshape(2, 3))
+    assert starts.shape == ends.shape == (2, 3)
+
+    # errors are the same as for single time points
+    with pytest.raises(OverflowError):
+        Period(YEAR, 1).radd_many([datetime.datetime(9999, 6, 1)])
+
+
 def test_every_nth():
     interval = Interval.of(2000, 1, 1)
     second_day = EveryNth(Repeating(DAY), 2)
@@ -206,6 +385,30 @@ def test_every_nth():
            "2000-02-08T00:00:00 2000-02-09T00:00:00"
 
 
+def test_repeated():
+    point = datetime.datetime(2000, 1, 31, 12)
+    for shift in [Period(MONTH, 1), Period(DAY, 3), Repeating(DAY),
+                  Repeating(DAY, WEEK, value=4),
+                  Repeating(DAY, MONTH, value=31), Summer(), Weekend(),
+                  EveryNth(Repeating(MONTH, YEAR, value=2), 2)]:
+        for n in [1, 2, 7, 40]:
+            after = point + shift
+            before = point - shift
+            for _ in range(n - 1):
+                after += shift
+                before -= shift
+            assert shift.radd_repeated(point, n) == after
+            assert shift.rsub_repeated(point, n) == before
+
+    # the first week after 1 Jan 2000 starts on Mon 3 Jan 2000
+    every_52nd_week = EveryNth(Repeating(WEEK), 52)
+    assert (Interval.of(2000, 1, 1) + every_52nd_week).isoformat() == \
+           "2000-12-25T00:00:00 2001-01-01T00:00:00"
+    assert Before(Interval.of(2000, 1, 1), Repeating(MONTH, YEAR, value=2),
+                  n=300).isoformat() == \
+           "1700-02-01T00:00:00 1700-03-01T00:00:00"
+
+
 def test_seasons():
     interval = Interval.fromisoformat("2002-03-22T11:30:30 2003-05-10T22:10:20")
     assert (interval + Spring()).isoformat() == \
@@ -387,6 +590,19 @@ def test_repeating_intersection():
     ])
     with pytest.raises(ValueError):
         date + apr31
+    with pytest.raises(ValueError):
+        date - apr31
+
+    # the search backwards must skip over many non-matching candidates
+    mar_fri_13 = RepeatingIntersection([
+        Repeating(DAY, WEEK, value=4),
+        Repeating(DAY, MONTH, value=13),
+        Repeating(MONTH, YEAR, value=3),
+    ])
+    assert (Interval.of(2020, 3, 13) - mar_fri_13).isoformat() == \
+           "2015-03-13T00:00:00 2015-03-14T00:00:00"
+    assert (Interval.of(2015, 3, 13) - mar_fri_13).isoformat() == \
+           "2009-03-13T00:00:00 2009-03-14T00:00:00"
 
     i20120301 = Interval.of(2012, 3, 1)
     eve31 = RepeatingIntersection([
@@ -812,6 +1028,238 @@ def test_these():
     assert len(list(These(interval_week_thu, day))) == 7
 
 
+def test_interval_array():
+    intervals = [Interval.of(2000, 2, 29),
+                 Interval.fromisoformat("1969-12-31T23:59 1970-01-02T00:00"),
+                 Interval(None, datetime.datetime(2000, 1, 1)),
+                 Interval.fromisoformat("1955-11-05T06:00:00.000001 "
+                                        "1955-11-05T07:00:00")]
+    array = IntervalArray.from_intervals(intervals)
+    assert len(array) == 4
+    assert array.to_intervals() == intervals
+    assert array[1] == intervals[1]
+    assert array[1:3].to_intervals() == intervals[1:3]
+    assert array.is_defined().tolist() == [True, True, False, True]
+    assert array.isoformats() == [i.isoformat() for i in intervals]
+    assert array.sort().to_intervals() == [intervals[i] for i in [3, 1, 0, 2]]
+
+    # codecs
+    isoformats = array.isoformats()
+    assert IntervalArray.fromisoformats(isoformats).to_intervals() == intervals
+    data = array.to_bytes()
+    assert len(data) == 16 * len(intervals)
+    assert data[32:40] == (-2 ** 63).to_bytes(8, "little", signed=True)
+    assert IntervalArray.from_bytes(data).to_intervals() == intervals
+    assert IntervalArray.fromisoformats([]).to_intervals() == []
+    assert IntervalArray.from_bytes(b"").to_intervals() == []
+    nth_n = NthN(Year(1997), Repeating(DAY, WEEK, value=0), index=2, n=6)
+    assert IntervalArray.from_bytes(
+        IntervalArray.from_intervals(nth_n).to_bytes()).to_intervals() == \
+           [Interval(*i) for i in nth_n]
+    with pytest.raises(ValueError):
+        IntervalArray.fromisoformats(["2000-01-01 2000-01-02", "2000-01-01"])
+    with pytest.raises(ValueError):
+        IntervalArray.from_bytes(data[:-8])
+
+    # operators give the same results as on each interval
+    friday = Repeating(DAY, WEEK, value=4)
+    three_months = Period(MONTH, 3)
+    for shift in [friday, three_months, Summer(), None]:
+        assert array.last(shift).to_intervals() == \
+               [Interval(*Last(i, shift)) for i in intervals]
+        assert array.next(shift).to_intervals() == \
+               [Interval(*Next(i, shift)) for i in intervals]
+        assert array.this(shift).to_intervals() == \
+               [Interval(*This(i, shift)) for i in intervals]
+    for shift in [friday, three_months, None]:
+        assert array.before(shift, n=2).to_intervals() == \
+               [Interval(*Before(i, shift, n=2)) for i in intervals]
+        assert array.after(shift, n=2).to_intervals() == \
+               [Interval(*After(i, shift, n=2)) for i in intervals]
+    assert array.last(friday, interval_included=True).to_intervals() == \
+           [Interval(*Last(i, friday, interval_included=True))
+            for i in intervals]
+    assert array.next(friday, interval_included=True).to_intervals() == \
+           [Interval(*Next(i, friday, interval_included=True))
+            for i in intervals]
+    with pytest.raises(ValueError):
+        array.before(three_months, interval_included=True)
+    with pytest.raises(ValueError):
+        array.this(Repeating(HOUR))
+
+    with pytest.raises(ValueError):
+        IntervalArray([datetime.datetime(2000, 1, 1)], [])
+
+
+def test_interval_array_codecs_benchmark(microbenchmark):
+    intervals = [Interval.of(2000, 1, 1) + Period(HOUR, i)
+                 for i in range(1000)]
+    array = IntervalArray.from_intervals(intervals)
+    isoformats = array.isoformats()
+    data = array.to_bytes()
+    for name, old, new in [
+            ("parse",
+             lambda: [Interval.fromisoformat(s) for s in isoformats],
+             lambda: IntervalArray.fromisoformats(isoformats)),
+            ("format",
+             lambda: [i.isoformat() for i in intervals],
+             lambda: array.isoformats()),
+            ("decode",
+             lambda: [Interval.fromisoformat(s) for s in isoformats],
+             lambda: IntervalArray.from_bytes(data))]:
+        old_time = microbenchmark(old, number=10) / len(intervals)
+        new_time = microbenchmark(new, number=10) / len(intervals)
+        print(f"{name}: per interval {old_time * 1e9:.0f}ns, "
+              f"IntervalArray {new_time * 1e9:.0f}ns")
+        assert new_time < old_time
+
+
+def test_evaluation_cache():
+    dct = Interval.of(2024, 5, 17)
+    march = Repeating(MONTH, YEAR, value=3)
+    with evaluation_cache(maxsize=2) as cache:
+        this_march = This(dct, march)
+        assert this_march.isoformat() == Interval.of(2024, 3).isoformat()
+        assert cache.cache_info().misses == 1
+        # the same structure, with new objects, is found in the cache
+        this_march = This(Interval.of(2024, 5, 17), Repeating(MONTH, YEAR,
+                                                              value=3))
+        assert this_march.isoformat() == Interval.of(2024, 3).isoformat()
+        assert cache.cache_info().hits == 1
+        # spans do not matter, but flags and values do
+        assert Last(dct, march, span=(0, 5)).isoformat() == \
+               Interval.of(2024, 3).isoformat()
+        assert Last(dct, march, interval_included=True).isoformat() == \
+               Interval.of(2024, 3).isoformat()
+        assert Last(dct, Repeating(MONTH, YEAR, value=6)).isoformat() == \
+               Interval.of(2023, 6).isoformat()
+        assert cache.cache_info() == (1, 4, 2, 2)
+        # errors are not cached
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                Between(dct, Interval.of(2020))
+        assert cache.cache_info().currsize == 2
+        cache.cache_clear()
+        assert cache.cache_info() == (0, 0, 2, 0)
+        # nested operators see the starts and ends of their inputs
+        last_march = Last(This(dct, Repeating(YEAR)), march)
+        assert last_march.isoformat() == Interval.of(2023, 3).isoformat()
+        assert cache.cache_info().misses == 2
+    # outside the with-block, nothing is cached
+    This(dct, march)
+    assert cache.cache_info().misses == 2
+
+
+def test_lazy_evaluation():
+    dct = Interval.of(2024, 5, 17)
+    march = Repeating(MONTH, YEAR, value=3)
+    with evaluation_cache() as cache:
+        with lazy_evaluation():
+            last_march = Last(dct, march)
+            between = Between(dct, Interval.of(2020))
+            last_two = list(LastN(dct, march, n=None))
+        assert cache.cache_info().misses == 0
+        # the start and end are evaluated together on first access
+        assert last_march.end == datetime.datetime(2024, 4, 1)
+        assert last_march.start == datetime.datetime(2024, 3, 1)
+        assert cache.cache_info().misses == 1
+    # errors are raised on first access
+    with pytest.raises(ValueError):
+        _ = between.start
+    # explicitly set starts and ends are kept
+    assert last_two[1].start is None
+    assert last_two[1].end == datetime.datetime(2023, 4, 1)
+    # outside the with-block, evaluation is immediate
+    with evaluation_cache() as cache:
+        Last(dct, march)
+        assert cache.cache_info().misses == 1
+    # other threads are not affected by the with-blocks
+    with evaluation_cache() as cache, lazy_evaluation():
+        with concurrent.futures.ThreadPoolExecutor(1) as executor:
+            with pytest.raises(ValueError):
+                executor.submit(Between, dct, Interval.of(2020)).result()
+            executor.submit(Last, dct, march).result()
+        assert cache.cache_info().misses == 0
+
+
+def test_islice():
+    year = Year(1997)
+    mondays = Repeating(DAY, WEEK, value=0)
+    nthn = NthN(year, mondays, index=2, n=6)
+    assert list(nthn) == [Nth(year, mondays, index=i) for i in range(7, 13)]
+    assert list(nthn.islice(2, 4)) == list(nthn)[2:4]
+    days = These(year, Repeating(DAY))
+    assert list(days.islice(364)) == [Interval.of(1997, 12, 31)]
+    assert list(days.islice(365)) == []
+    fridays = These(year, Repeating(DAY, WEEK, value=4))
+    assert list(fridays.islice(10, 12)) == list(fridays)[10:12]
+    last_n = LastN(Interval.of(2000, 1, 1), Repeating(MONTH), n=5)
+    assert list(last_n.islice(1, 3)) == list(last_n)[1:3]
+    with pytest.raises(ValueError):
+        days.islice(-1)
+
+
+def test_slots():
+    for obj in [Period(DAY, 3), Repeating(MONTH, YEAR, value=2), Summer(),
+                Year(1997), Last(Year(2000), Summer()),
+                NthN(Year(1997), Repeating(DAY), index=2, n=3)]:
+        assert not hasattr(obj, "__dict__")
+        with pytest.raises(AttributeError):
+            obj.unknown = None
+        assert pickle.loads(pickle.dumps(obj)) == obj
+    # identical repeating intervals share their internal objects
+    assert Summer().period is Summer().period
+    assert Summer().rrule_kwargs is Summer().rrule_kwargs
+    assert Repeating(DAY).rrule_kwargs is Repeating(WEEK).rrule_kwargs
+    with pytest.raises(TypeError):
+        Summer().rrule_kwargs["bymonth"] = 7
+
+
+def test_shared():
+    assert Summer.shared() is Summer.shared()
+    friday = Repeating.shared(DAY, WEEK, value=4)
+    assert friday is Repeating.shared(DAY, WEEK, value=4)
+    assert friday == Repeating(DAY, WEEK, value=4)
+    assert friday is not Repeating.shared(DAY, WEEK, value=3)
+    assert Repeating(DAY).period is Period.shared(DAY, 1)
+    with pytest.raises(ValueError):
+        Summer.shared(span=(0, 6))
+    with pytest.raises(TypeError):
+        Repeating.shared(DAY, WEEK, value=[0, 4])
+    # shared shifts are cached by their fields, like other shifts
+    dct = Interval.of(2024, 5, 17)
+    with evaluation_cache() as cache:
+        assert Last(dct, friday) == Last(dct, Repeating.shared(DAY, WEEK,
+                                                                value=4))
+        assert cache.cache_info().hits == 1
+        # a modified shared shift is neither found in the cache nor handed
+        # out again
+        three_days = Period.shared(DAY, 3)
+        assert Last(dct, three_days).start == datetime.datetime(2024, 5, 14)
+        three_days.n = 2
+        assert Last(dct, three_days).start == datetime.datetime(2024, 5, 15)
+        assert cache.cache_info().hits == 1
+    assert Period.shared(DAY, 3).n == 3
+    Repeating(DAY).period.n = 2
+    assert Repeating(DAY).period == Period(DAY, 1)
+    # only the most recently requested instances are kept
+    for n in range(2000):
+        Period.shared(DAY, n)
+    assert len(normit.time.ops._shared_shifts) <= 1024
+
+
+def test_slots_benchmark(memory_benchmark):
+    for make, max_bytes in [
+            (lambda: Period(DAY, 3), 96),
+            (lambda: Repeating(MONTH, YEAR, value=2), 128),
+            (lambda: Summer(), 128),
+            (lambda: Year(1997), 192),
+            (lambda: Last(Year(2000), Repeating(MONTH, YEAR, value=3)), 512)]:
+        n_bytes = memory_benchmark(make)
+        print(f"{make()!r}: {n_bytes:.0f} bytes")
+        assert n_bytes <= max_bytes
+
+
 def test_repr():
     for obj in [
             Repeating(DAY),
@@ -823,11 +1271,60 @@ def test_repr():
                  Repeating(DAY, MONTH, value=13)),
             Between(Year(1000), Interval.of(2000, 10, 5)),
             Summer(),
-            LastN(Interval.of(1907, 3), Period(QUARTER_YEAR, 3), n=2)
+            LastN(Interval.of(1907, 3), Period(QUARTER_YEAR, 3), n=2),
+            Interval.fromisoformat("2020-03-15T00:00:00 2021-03-15T00:00:00"),
+            Interval.fromisoformat("2020-01-01T00:00:00.5 "
+                                   "2020-01-02T00:00:00.5"),
     ]:
         assert obj == eval(repr(obj), vars(normit.time))
 
 
+def test_interval_granularity():
+    for args, unit in [((1990,), YEAR),
+                       ((1990, 2), MONTH),
+                       ((2024, 2, 29), DAY),
+                       ((1990, 6, 1, 13), HOUR),
+                       ((1990, 6, 1, 13, 0), MINUTE),
+                       ((1990, 6, 1, 13, 45, 0), SECOND),
+                       ((1990, 6, 1, 13, 45, 0, 1), None)]:
+        interval = Interval.of(*args)
+        assert interval.granularity() is unit
+        assert repr(interval) == f"Interval.of({', '.join(map(str, args))})" \
+               or unit is None
+    for iso in ["2020-03-01 2021-03-01",
+                "2020-01-15 2020-02-15",
+                "2020-01-01 2020-01-08",
+                "2020-01-01T12:00 2020-01-02T12:00",
+                "2020-01-01T00:30 2020-01-01T01:30",
+                "2020-01-01T00:00:30 2020-01-01T00:01:30"]:
+        interval = Interval.fromisoformat(iso)
+        assert interval.granularity() is None
+        assert repr(interval).startswith("Interval.fromisoformat")
+    assert Interval(None, None).granularity() is None
+
+
+def test_interval_granularity_benchmark(microbenchmark):
+    def relativedelta_repr(interval):
+        # the original implementation of Interval.__repr__
+        delta = dateutil.relativedelta.relativedelta(
+            interval.end, interval.start)
+        for i, name in enumerate(
+                ["years", "months", "days", "hours", "minutes", "seconds"]):
+            if delta == dateutil.relativedelta.relativedelta(**{name: 1}):
+                tup = interval.start.timetuple()[:i + 1]
+                return f"Interval.of({', '.join(map(repr, tup))})"
+        return f"Interval(start={interval.start}, end={interval.end})"
+
+    for interval in [Interval.of(2024), Interval.of(2024, 5, 17),
+                     Interval.of(2024, 5, 17, 9, 30, 15)]:
+        assert repr(interval) == relativedelta_repr(interval)
+        old = microbenchmark(lambda: relativedelta_repr(interval))
+        new = microbenchmark(lambda: repr(interval))
+        print(f"{interval!r}: relativedelta {old * 1e9:.0f}ns, "
+              f"granularity {new * 1e9:.0f}ns")
+        assert new < old
+
+
 def test_flatten():
     for obj, obj_flat in [
         (Interval.of(2022, 8, 13),
@@ -858,6 +1355,115 @@ def test_flatten():
         assert flatten(obj) == obj_flat
 
 
+def test_compile_plan():
+    def first_of_next_march(dct):
+        return This(Next(dct, Repeating(MONTH, YEAR, value=3)),
+                    Repeating(DAY, MONTH, value=1))
+
+    dct = Interval.of(2024, 5, 17)
+    plan = normit.time.compile_plan(first_of_next_march(dct), dct)
+    assert len(plan) == 2
+    for anchor in [Interval.of(1998, 2, 13), Interval.of(1998, 3, 13),
+                   Interval.of(2024, 3), Interval(None, None)]:
+        tree = first_of_next_march(anchor)
+        assert plan(anchor) == Interval(tree.start, tree.end)
+    assert plan(Interval.of(1998, 2, 13)) == Interval.of(1998, 3, 1)
+
+    # the Year is evaluated only once, at compile time
+    plan = normit.time.compile_plan(Between(Year(1994), dct), dct)
+    assert len(plan) == 1
+    assert plan(Interval.of(1995, 6)) == Interval.fromisoformat(
+        "1995-01-01T00:00:00 1995-06-01T00:00:00")
+
+    # anchors inside lists and anchors shared by several operators
+    plan = normit.time.compile_plan(
+        Intersection([Next(dct, Period(DAY, 10)), Next(dct, Period(WEEK, 1))]),
+        dct)
+    assert len(plan) == 3
+    assert plan(Interval.of(2000, 1, 5)) == Interval.fromisoformat(
+        "2000-01-06T00:00:00 2000-01-13T00:00:00")
+
+    interval = Year(1997)
+    plan = normit.time.compile_plan(
+        NthN(interval, Repeating(DAY, WEEK, value=0), index=2, n=6), interval)
+    assert plan(Year(1998)) == [Interval.of(1998, 2, d) for d in [16, 23]] \
+           + [Interval.of(1998, 3, d) for d in [2, 9, 16, 23]]
+
+    with pytest.raises(ValueError):
+        normit.time.compile_plan(
+            Next(Interval.of(2024, 5, 17), Period(DAY, 1)), dct)
+
+
+def test_compile_plan_operators():
+    friday = Repeating(DAY, WEEK, value=4)
+    builders = [
+        lambda a: Last(a, Period(DAY, 3)),
+        lambda a: Last(a, friday, interval_included=True),
+        lambda a: Last(a, None),
+        lambda a: Next(a, friday),
+        lambda a: Next(a, friday, interval_included=True),
+        lambda a: Next(a, Period(WEEK, 2), interval_included=True),
+        lambda a: Before(a, friday, n=2),
+        lambda a: Before(a, friday, interval_included=True),
+        lambda a: Before(a, PeriodSum([Period(DAY, 1), Period(HOUR, 3)])),
+        lambda a: Before(a, Period(YEAR, 2), n=0),
+        lambda a: After(a, friday, n=3, interval_included=True),
+        lambda a: After(a, Period(MONTH, 1), n=2),
+        lambda a: After(a, None),
+        lambda a: This(a, Repeating(MONTH, YEAR, value=4)),
+        lambda a: This(a, Period(DAY, 5)),
+        lambda a: This(a, Period(DAY, None)),
+        lambda a: This(a, Repeating(DAY)),
+        lambda a: Between(a, Year(2030), start_included=True),
+        lambda a: Intersection([This(a, Period(DAY, 5)),
+                                Next(a, Period(DAY, 3))]),
+    ]
+    dct = Interval.of(2024, 5, 17)
+    for build in builders:
+        plan = normit.time.compile_plan(build(dct), dct)
+        for anchor in [Interval.of(2000, 2, 29), Interval.of(2024, 3, 1, 7),
+                       Interval.of(2031), Interval(None, None)]:
+            try:
+                tree = build(anchor)
+            except ValueError:
+                with pytest.raises(ValueError):
+                    plan(anchor)
+            else:
+                assert plan(anchor) == Interval(tree.start, tree.end)
+
+    # executing a plan does not modify the compiled tree
+    tree = This(Last(dct, friday), Repeating(HOUR, DAY, value=9))
+    plan = normit.time.compile_plan(tree, dct)
+    plan(Interval.of(1999, 9, 9))
+    assert tree == This(Last(dct, friday), Repeating(HOUR, DAY, value=9))
+    assert (tree.start, tree.end) == (datetime.datetime(2024, 5, 10, 9),
+                                      datetime.datetime(2024, 5, 10, 10))
+
+    # a plan may be executed by several threads at once
+    anchors = [Interval.of(2000, 1, 1) + Period(DAY, i) for i in range(200)]
+    expected = [plan(anchor) for anchor in anchors]
+    with concurrent.futures.ThreadPoolExecutor(4) as executor:
+        for _ in range(5):
+            assert list(executor.map(plan, anchors)) == expected
+
+
+def test_compile_plan_benchmark(microbenchmark):
+    dct = Interval.of(2024, 5, 17)
+    anchors = [Interval.of(2000, 1, 1) + Period(DAY, i) for i in range(100)]
+
+    def build(anchor):
+        return Between(Year(1994), This(Next(
+            anchor, Repeating(MONTH, YEAR, value=3)),
+            Repeating(DAY, MONTH, value=1)))
+
+    plan = normit.time.compile_plan(build(dct), dct)
+    rebuild = microbenchmark(lambda: [build(a) for a in anchors], number=10)
+    compiled = microbenchmark(lambda: [plan(a) for a in anchors], number=10)
+    print(f"rebuild {rebuild * 1e6 / len(anchors):.1f}us, "
+          f"compiled {compiled * 1e6 / len(anchors):.1f}us")
+    assert compiled < rebuild
+
+
 def test_none_values():
     date = Interval.of(2016, 10, 18)
     undef = Interval(None, None)
@@ -883,6 +1489,7 @@ def test_none_values():
     assert After(undef, d08).isoformat() == "... ..."
     assert Nth(undef, d08, index=5).isoformat() == "... ..."
     assert This(undef, d08).isoformat() == "... ..."
+    assert YearSuffix(undef, 96).isoformat() == "... ..."
     assert Between(undef, undef).isoformat() == "... ..."
     assert Intersection([undef, undef]).isoformat() == "... ..."
     assert LastN(undef, d08, n=3).isoformats() == \
@@ -1,8 +1,11 @@
+import copy
 import datetime
 import inspect
+import pytest
 import xml.etree.ElementTree as ET
 
 from normit.time import *
+import normit.time.xml
 
 
 def _isoformats(objects: list[Shift | Interval | Intervals]):
@@ -662,6 +665,89 @@ def test_doc_time():
             (None, None): doc_time})
         assert objects == [op]
         assert _isoformats(objects) == [iso]
+        template = from_xml(ET.fromstring(xml_str), as_template=True)
+        assert template.bind(doc_time) == [Interval.fromisoformat(iso)]
+
+
+def test_template():
+    xml_str = inspect.cleandoc("""
+        <data>
+            <annotations>
+                <entity>
+                    <id>1@e@Doc9@gold</id>
+                    <span>6,14</span>
+                    <type>Day-Of-Month</type>
+                    <parentsType>Repeating-Interval</parentsType>
+                    <properties>
+                        <Value>15</Value>
+                        <Number></Number>
+                        <Modifier></Modifier>
+                    </properties>
+                </entity>
+                <entity>
+                    <id>2@e@Doc9@gold</id>
+                    <span>1,5</span>
+                    <type>Next</type>
+                    <parentsType>Operator</parentsType>
+                    <properties>
+                        <Semantics>Interval-Not-Included</Semantics>
+                        <Interval-Type>DocTime</Interval-Type>
+                        <Interval></Interval>
+                        <Period></Period>
+                        <Repeating-Interval>1@e@Doc9@gold</Repeating-Interval>
+                    </properties>
+                </entity>
+                <entity>
+                    <id>3@e@Doc9@gold</id>
+                    <span>20,22</span>
+                    <type>Two-Digit-Year</type>
+                    <parentsType>Operator</parentsType>
+                    <properties>
+                        <Interval-Type>DocTime</Interval-Type>
+                        <Interval></Interval>
+                        <Value>96</Value>
+                    </properties>
+                </entity>
+                <entity>
+                    <id>4@e@Doc9@gold</id>
+                    <span>30,34</span>
+                    <type>Year</type>
+                    <parentsType>Interval</parentsType>
+                    <properties>
+                        <Value>1887</Value>
+                    </properties>
+                </entity>
+                <entity>
+                    <id>5@e@Doc9@gold</id>
+                    <span>40,44</span>
+                    <type>Day-Of-Month</type>
+                    <parentsType>Repeating-Interval</parentsType>
+                    <properties>
+                        <Value>1</Value>
+                        <Number></Number>
+                        <Modifier></Modifier>
+                    </properties>
+                </entity>
+            </annotations>
+        </data>""")
+    elem = ET.fromstring(xml_str)
+    template = from_xml(elem, as_template=True)
+    spans = [obj.span for obj in template.objects]
+    assert sorted(spans) == [(1, 14), (20, 22), (30, 34), (40, 44)]
+    doc_times = [Interval.of(2024, 2, 2), Interval.of(1803, 12, 20),
+                 Interval(None, None)]
+    for doc_time, values in zip(doc_times, template.bind_many(doc_times)):
+        objects = from_xml(elem, known_intervals={(None, None): doc_time})
+        assert [obj.span for obj in objects] == spans
+        assert values == [obj if isinstance(obj, Shift)
+                          else Interval(obj.start, obj.end)
+                          for obj in objects]
+    span_values = dict(zip(spans, template.bind(doc_times[0])))
+    assert span_values[(1, 14)] == Interval.of(2024, 2, 15)
+    assert span_values[(20, 22)] == Interval.of(2096)
+    assert span_values[(30, 34)] == Interval.of(1887)
+    assert span_values[(40, 44)] == \
+           Repeating(DAY, MONTH, value=1, span=(40, 44))
 
 
 def test_discontinuous_span():
@@ -1442,6 +1528,18 @@ def test_earlier_sunday():
     assert objects == [intersection]
     assert _isoformats(objects) == ["1998-03-22T00:00:00 1998-03-22T12:00:00"]
 
+    # each object keeps the span of its own trigger, and the event interval is
+    # a copy, so the caller's interval is not given spans
+    [intersection] = objects
+    [before, last] = intersection.intervals
+    assert intersection.trigger_span == (3918, 3925)
+    assert before.trigger_span == (3918, 3925)
+    assert last.span == last.trigger_span == (3926, 3932)
+    assert before.interval == event
+    assert before.interval is not event
+    assert before.interval.span == before.interval.trigger_span == (3750, 3759)
+    assert event.span is None and event.trigger_span is None
+
 
 def test_20th_century():
     # bbc_20130322_1150 (1969,1981) 20th Century
@@ -1519,3 +1617,319 @@ def test_every_other_day():
         (None, None): doc_time})
     assert objects == [every_other_day]
     assert _isoformats(objects) == [None]
+
+
+def test_cyclic_references():
+    xml_str = inspect.cleandoc("""
+        <data>
+            <annotations>
+                <entity>
+                    <id>1@e@Doc9@gold</id>
+                    <span>1,5</span>
+                    <type>This</type>
+                    <parentsType>Operator</parentsType>
+                    <properties>
+                        <Interval-Type>Link</Interval-Type>
+                        <Interval>2@e@Doc9@gold</Interval>
+                        <Period></Period>
+                        <Repeating-Interval></Repeating-Interval>
+                    </properties>
+                </entity>
+                <entity>
+                    <id>2@e@Doc9@gold</id>
+                    <span>6,10</span>
+                    <type>This</type>
+                    <parentsType>Operator</parentsType>
+                    <properties>
+                        <Interval-Type>Link</Interval-Type>
+                        <Interval>1@e@Doc9@gold</Interval>
+                        <Period></Period>
+                        <Repeating-Interval></Repeating-Interval>
+                    </properties>
+                </entity>
+            </annotations>
+        </data>""")
+    with pytest.raises(ValueError, match="1@e@Doc9@gold -> 2@e@Doc9@gold"):
+        from_xml(ET.fromstring(xml_str))
+
+
+def _synthetic_xml(n_entities: int) -> str:
+    # pairs of a Day-Of-Month and a Next operator over it, where the Next
+    # operators form chains of 10, starting from the document creation time
+    entities = []
+    for i in range(0, n_entities, 2):
+        interval_type, interval = "DocTime", ""
+        if i % 20:
+            interval_type, interval = "Link", f"{i - 1}@e@Doc@gold"
+        entities.append(f"""
+            <entity>
+                <id>{i}@e@Doc@gold</id>
+                <span>{i * 10},{i * 10 + 2}</span>
+                <type>Day-Of-Month</type>
+                <properties><Value>{i % 28 + 1}</Value></properties>
+            </entity>
+            <entity>
+                <id>{i + 1}@e@Doc@gold</id>
+                <span>{i * 10 + 3},{i * 10 + 7}</span>
+                <type>Next</type>
+                <properties>
+                    <Semantics>Interval-Not-Included</Semantics>
+                    <Interval-Type>{interval_type}</Interval-Type>
+                    <Interval>{interval}</Interval>
+                    <Repeating-Interval>{i}@e@Doc@gold</Repeating-Interval>
+                </properties>
+            </entity>""")
+    return f"<data><annotations>{''.join(entities)}</annotations></data>"
+
+
+def test_topological_sort_benchmark(microbenchmark):
+    def pass_sort(id_to_children):
+        # the original implementation of the topological sort
+        id_to_children = copy.deepcopy(id_to_children)
+        sorted_ids = {}
+        while id_to_children:
+            for key in list(id_to_children):
+                if not id_to_children[key]:
+                    id_to_children.pop(key)
+                    sorted_ids[key] = True
+            for key, values in id_to_children.items():
+                id_to_children[key] -= sorted_ids.keys()
+        return list(sorted_ids)
+
+    elem = ET.fromstring(_synthetic_xml(10000))
+    id_to_children = {}
+    for entity in elem.findall(".//entity"):
+        id_to_children[entity.findtext("id")] = {
+            prop.text for prop in entity.find("properties")
+            if prop.text and "@" in prop.text}
+    # chains are the worst case for the original, so also test a flat document
+    flat_id_to_children = {key: {child for child in children
+                                 if int(child.split("@")[0]) % 2 == 0}
+                           for key, children in id_to_children.items()}
+    for name, graph in [("chained", id_to_children),
+                        ("flat", flat_id_to_children)]:
+        sort = normit.time.xml._topological_sort
+        assert sort(graph) == pass_sort(graph)
+        old = microbenchmark(lambda: pass_sort(graph), number=1, repeat=1)
+        new = microbenchmark(lambda: sort(graph), number=1)
+        print(f"{name}: passes {old * 1e3:.0f}ms, Kahn {new * 1e3:.1f}ms")
+        assert new < old
+
+    doc_time = Interval.of(2010, 8, 5)
+    objects = from_xml(elem, known_intervals={(None, None): doc_time})
+    assert len(objects) == 500
+    assert objects[-1].span == (99800, 99987)
+
+
+def test_properties_benchmark(microbenchmark):
+    elem = ET.fromstring(_synthetic_xml(2))
+    entity = elem.findall(".//entity")[1]
+    names = ["Sub-Interval", "Super-Interval", "Value", "Type", "Number",
+             "Interval-Type", "Interval", "Period", "Repeating-Interval",
+             "Semantics"]
+
+    def findtexts():
+        return [entity.findtext(f"properties/{name}") for name in names]
+
+    def properties_get():
+        properties = normit.time.xml._Properties(entity.find("properties"))
+        return [properties.get(name) for name in names]
+
+    assert properties_get() == findtexts()
+    old = microbenchmark(findtexts)
+    new = microbenchmark(properties_get)
+    print(f"findtext {old * 1e9:.0f}ns, _Properties {new * 1e9:.0f}ns")
+    assert new < old
+
+
+def test_iterparse_xml(tmp_path):
+    def by_span(objects):
+        return sorted(objects, key=lambda obj: obj.span)
+
+    known_intervals = {(None, None): Interval.of(2010, 8, 5)}
+    elem = ET.fromstring(_synthetic_xml(200))
+    expected = by_span(from_xml(elem, known_intervals))
+    assert len(expected) == 10
+
+    # from a path, with each object yielded as soon as its chain is complete
+    xml_path = tmp_path / "doc.xml"
+    xml_path.write_text(_synthetic_xml(200))
+    objects = iterparse_xml(xml_path, known_intervals)
+    first = next(objects)
+    assert first.span == (0, 187)
+    assert by_span([first] + list(objects)) == expected
+
+    # from a file object, with every reference to a later entity
+    annotations = elem.find("annotations")
+    annotations[:] = reversed(annotations)
+    with open(xml_path, "wb") as xml_file:
+        xml_file.write(b"<!-- reversed -->" + ET.tostring(elem))
+    with open(xml_path, "rb") as xml_file:
+        xml_file.read(len(b"<!-- reversed -->"))
+        objects = list(iterparse_xml(xml_file, known_intervals))
+    assert by_span(objects) == expected
+
+    # entities that are never created are reported as from_xml reports them
+    annotations[:] = [entity for entity in annotations
+                      if entity.findtext("id") != "10@e@Doc@gold"]
+    xml_path.write_bytes(ET.tostring(elem))
+    with pytest.raises(AnaforaXMLParsingError, match="11@e@Doc@gold"):
+        list(iterparse_xml(xml_path, known_intervals))
+
+
+def test_iterparse_xml_unsupported(tmp_path):
+    entities = {
+        "modifier": """
+            <entity>
+                <id>1@e@Doc@gold</id>
+                <span>1,5</span>
+                <type>Modifier</type>
+                <parentsType>Other</parentsType>
+                <properties>
+                    <Type>Approx</Type>
+                </properties>
+            </entity>""",
+        "day": """
+            <entity>
+                <id>2@e@Doc@gold</id>
+                <span>6,14</span>
+                <type>Day-Of-Month</type>
+                <parentsType>Repeating-Interval</parentsType>
+                <properties>
+                    <Value>15</Value>
+                    <Modifier>1@e@Doc@gold</Modifier>
+                </properties>
+            </entity>""",
+        "next": """
+            <entity>
+                <id>3@e@Doc@gold</id>
+                <span>1,14</span>
+                <type>Next</type>
+                <parentsType>Operator</parentsType>
+                <properties>
+                    <Semantics>Interval-Not-Included</Semantics>
+                    <Interval-Type>DocTime</Interval-Type>
+                    <Interval></Interval>
+                    <Repeating-Interval>2@e@Doc@gold</Repeating-Interval>
+                </properties>
+            </entity>""",
+        "year": """
+            <entity>
+                <id>4@e@Doc@gold</id>
+                <span>30,34</span>
+                <type>Year</type>
+                <parentsType>Interval</parentsType>
+                <properties>
+                    <Value>1887</Value>
+                </properties>
+            </entity>""",
+    }
+    known_intervals = {(None, None): Interval.of(2024, 2, 2)}
+    xml_path = tmp_path / "doc.xml"
+    # the unsupported Modifier before and after the Day-Of-Month that refers
+    # to it; either way, the Modifier is resolved, so the Next is yielded as
+    # soon as it is read, rather than waiting for the end of the file
+    for order in [["modifier", "day", "next", "year"],
+                  ["day", "next", "modifier", "year"]]:
+        xml_str = "<data><annotations>{}</annotations></data>".format(
+            "".join(entities[name] for name in order))
+        xml_path.write_text(xml_str)
+        objects = list(iterparse_xml(xml_path, known_intervals))
+        assert [obj.__class__ for obj in objects] == [Next, Year]
+        expected = from_xml(ET.fromstring(xml_str), known_intervals)
+        assert sorted(objects, key=lambda obj: obj.span) == \
+               sorted(expected, key=lambda obj: obj.span)
+
+
+def test_anafora_parser():
+    parser = AnaforaParser()
+    known_intervals = {(None, None): Interval.of(2010, 8, 5)}
+    bad_xml_str = _synthetic_xml(2).replace("Day-Of-Month", "Day-Of-Eternity")
+    # a parser keeps no state between documents, even after an error
+    for n_entities in [2, 40, 20]:
+        with pytest.raises(AnaforaXMLParsingError):
+            parser.from_xml(ET.fromstring(bad_xml_str), known_intervals)
+        elem = ET.fromstring(_synthetic_xml(n_entities))
+        objects = parser.from_xml(elem, known_intervals)
+        assert objects == from_xml(elem, known_intervals)
+        assert len(objects) == (n_entities + 19) // 20
+
+
+def test_parse_xml(tmp_path):
+    xml_str = inspect.cleandoc("""
+        <?xml version="1.0" encoding="UTF-8"?>
+        <!-- an Anafora document -->
+        <data>
+            <annotations>
+                <entity>
+                    <id>1@e@Doc9@gold</id>
+                    <span>6,14</span>
+                    <type>Day-Of-Month</type>
+                    <parentsType>Repeating-Interval</parentsType>
+                    <properties>
+                        <!-- the day -->
+                        <Value>15</Value>
+                        <Number></Number>
+                    </properties>
+                </entity>
+                <entity>
+                    <id>2@e@Doc9@gold</id>
+                    <span>1,5</span>
+                    <type>Next</type>
+                    <parentsType>Operator</parentsType>
+                    <properties>
+                        <Semantics>Interval-Not-Included</Semantics>
+                        <Interval-Type>DocTime</Interval-Type>
+                        <Interval></Interval>
+                        <Repeating-Interval>1@e@Doc9@gold</Repeating-Interval>
+                    </properties>
+                </entity>
+            </annotations>
+        </data>""")
+    known_intervals = {(None, None): Interval.of(2024, 2, 2)}
+    expected = from_xml(ET.fromstring(xml_str), known_intervals)
+    xml_path = tmp_path / "doc.xml"
+    xml_path.write_text(xml_str)
+    backends = ["etree"]
+    if normit.time.xml.lxml_etree is not None:
+        backends.append("lxml")
+    for backend in backends:
+        for source in [xml_str.encode(), xml_path, str(xml_path)]:
+            elem = parse_xml(source, backend=backend)
+            assert from_xml(elem, known_intervals) == expected
+
+    # errors report the XML in the same way with every backend
+    bad_xml_str = xml_str.replace("Day-Of-Month", "Day-Of-Eternity")
+    messages = set()
+    for backend in backends:
+        with pytest.raises(AnaforaXMLParsingError) as exc_info:
+            from_xml(parse_xml(bad_xml_str.encode(), backend=backend))
+        messages.add(str(exc_info.value))
+    assert len(messages) == 1
+
+    with pytest.raises(ValueError, match="expat"):
+        parse_xml(xml_path, backend="expat")
+
+
+def test_parse_xml_benchmark(microbenchmark, tmp_path):
+    pytest.importorskip("lxml.etree")
+    xml_path = tmp_path / "doc.xml"
+    xml_path.write_text(_synthetic_xml(10000))
+    known_intervals = {(None, None): Interval.of(2010, 8, 5)}
+    objects = from_xml(parse_xml(xml_path, backend="etree"), known_intervals)
+    assert from_xml(parse_xml(xml_path, backend="lxml"),
+                    known_intervals) == objects
+    parse_times = {}
+    total_times = {}
+    for backend in ["etree", "lxml"]:
+        parse_times[backend] = microbenchmark(
+            lambda: parse_xml(xml_path, backend=backend), number=10)
+        total_times[backend] = microbenchmark(
+            lambda: from_xml(parse_xml(xml_path, backend=backend),
+                             known_intervals), number=1)
+        print(f"{backend}: parse {parse_times[backend] * 1e3:.1f}ms, "
+              f"parse and from_xml {total_times[backend] * 1e3:.0f}ms")
+    # lxml parses faster, but from_xml accesses its elements more slowly,
+    # which is why ElementTree is the default backend
+    assert parse_times["lxml"] < parse_times["etree"]
+    assert total_times["etree"] < total_times["lxml"]